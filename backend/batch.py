@@ -0,0 +1,351 @@
+"""
+batch.py — offline batch analysis of many transaction files.
+
+    python batch.py INPUT [INPUT ...] --out DIR [--workers W] [--memory-mb MB]
+                    [--set KEY=VALUE ...] [--timings] [--force] [--verbose]
+
+Each INPUT is a CSV / Parquet file, a directory (its *.csv, *.parquet and
+*.pq files) or a glob (`"data/2024-*/*.csv"`, `**` recurses). Every file is
+analysed with run_full_analysis and its result — the GET /analysis response —
+written to DIR/<name>.json; DIR/summary.json collects the per-file summaries
+and totals.
+
+Files run on a process pool of --workers processes, but only while the
+estimated peak memory of the running files (rows × BATCH_ROW_BYTES) stays
+within --memory-mb (default BATCH_MEMORY_MB, else 75% of available memory);
+a file that alone exceeds the budget waits for the pool to drain and is then
+analysed with run_sharded_analysis in this process, sharded to fit.
+
+Completed files are journalled in DIR/batch.jsonl as they finish, and result
+files are written atomically. A rerun skips every file whose result exists
+and whose size, mtime and Config fingerprint match the journal, so an
+interrupted batch resumes where it stopped; failed files are retried and
+--force reruns everything. --set overrides Config constants for the batch
+(e.g. --set SMURF_MIN_COUNTERPARTIES=5). Exits 1 if any file failed.
+"""
+
+import argparse
+import concurrent.futures
+import concurrent.futures.process
+import glob
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import main
+from main import (
+    CFG, Config, RunContext, _config_fingerprint, _config_values, _sync_config, read_transaction_chunks,
+    read_transactions, run_full_analysis, run_sharded_analysis, use_config,
+)
+
+SUFFIXES: Tuple[str, ...] = (".csv", ".parquet", ".pq")
+JOURNAL = "batch.jsonl"
+SUMMARY = "summary.json"
+
+# =============================================================================
+# Inputs and memory estimates
+# =============================================================================
+
+def find_inputs(patterns: List[str]) -> List[str]:
+    """Files named by `patterns` (files, directories or globs), sorted, without duplicates."""
+    found: Dict[str, None] = {}
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+        elif os.path.isfile(pattern):
+            paths = [pattern]
+        else:
+            paths = glob.glob(pattern, recursive=True)
+        for path in sorted(paths):
+            if os.path.isfile(path) and path.lower().endswith(SUFFIXES):
+                found.setdefault(os.path.abspath(path), None)
+    return list(found)
+
+
+def output_names(paths: List[str]) -> Dict[str, str]:
+    """Result file name per input: <stem>.json, with parent directories added until unique."""
+    names: Dict[str, str] = {}
+    for depth in range(1, max((p.count(os.sep) for p in paths), default=1) + 1):
+        for path in paths:
+            if path not in names:
+                parts = path.split(os.sep)[-depth:]
+                parts[-1] = os.path.splitext(parts[-1])[0]
+                names[path] = "__".join(parts) + ".json"
+        taken = list(names.values())
+        clashes = {name for name in taken if taken.count(name) > 1} | {SUMMARY}
+        names = {path: name for path, name in names.items() if name not in clashes}
+        if len(names) == len(paths):
+            break
+    return names
+
+
+def estimate_rows(path: str) -> int:
+    """Row count of a Parquet file from its footer; for a CSV, extrapolated from the first MiB."""
+    if not path.lower().endswith(".csv"):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        head = f.read(1 << 20)
+    lines = head.count(b"\n")
+    if len(head) == size or not lines:
+        return max(lines - 1, 0)
+    return int(size * lines / len(head))
+
+
+def memory_budget_mb(cfg: Config) -> int:
+    """BATCH_MEMORY_MB, or 75% of the memory available right now when it is 0."""
+    if cfg.BATCH_MEMORY_MB > 0:
+        return cfg.BATCH_MEMORY_MB
+    try:
+        with open("/proc/meminfo") as f:
+            info = dict(line.split(":", 1) for line in f)
+        available_kb = int(info["MemAvailable"].split()[0])
+    except (OSError, KeyError, ValueError):    # not Linux
+        available_kb = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_AVPHYS_PAGES") // 1024
+    return int(available_kb / 1024 * 0.75)
+
+# =============================================================================
+# Per-file analysis — runs in a pool worker (or, sharded, in this process)
+# =============================================================================
+
+def _write_json(path: str, payload: Any) -> None:
+    """Write `payload` to `path` atomically: a temp file in the same directory, then rename."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(payload, f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _entry(path: str, output: str, fingerprint: str, started: float) -> Dict[str, Any]:
+    stat = os.stat(path)
+    return {
+        "input": path, "output": output, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+        "config": fingerprint, "seconds": round(time.perf_counter() - started, 4),
+    }
+
+
+def analyse_file(
+    path: str, output: str, cfg: Dict[str, Any], fingerprint: str, timings: bool, log_level: int,
+) -> Dict[str, Any]:
+    """Pool task: analyse one file in thread mode and write its result; returns its journal entry."""
+    started = time.perf_counter()
+    main.logger.setLevel(log_level)
+    _sync_config({**cfg, "EXECUTION_MODE": "thread"})
+    try:
+        df = read_transactions(path)
+        result = run_full_analysis(df, RunContext())
+        if not timings:
+            result.pop("timings")
+        _write_json(output, result)
+    except Exception as exc:
+        return {**_entry(path, output, fingerprint, started), "status": "failed", "error": f"{type(exc).__name__}: {exc}"}
+    return {
+        **_entry(path, output, fingerprint, started), "status": "done",
+        "transactions": len(df), **result["summary"],
+    }
+
+
+def analyse_file_sharded(
+    path: str, output: str, cfg: Config, fingerprint: str, timings: bool, budget_mb: int, workers: int,
+) -> Dict[str, Any]:
+    """A file too large for the memory budget: streamed through run_sharded_analysis here."""
+    started = time.perf_counter()
+    try:
+        # DETECTOR_WORKERS shards are analysed at a time, so each gets a share of the budget
+        with use_config(cfg.replace(SHARD_MEMORY_MB=max(budget_mb // workers, 1), DETECTOR_WORKERS=workers)):
+            result = run_sharded_analysis(read_transaction_chunks(path), RunContext())
+        transactions = result["timings"]["counters"].get("transactions")
+        if not timings:
+            result.pop("timings")
+        _write_json(output, result)
+    except Exception as exc:
+        return {**_entry(path, output, fingerprint, started), "status": "failed", "error": f"{type(exc).__name__}: {exc}"}
+    return {
+        **_entry(path, output, fingerprint, started), "status": "done", "sharded": True,
+        "transactions": transactions, **result["summary"],
+    }
+
+# =============================================================================
+# Batch driver — scheduling, journal and summary
+# =============================================================================
+
+def read_journal(out_dir: str) -> Dict[str, Dict[str, Any]]:
+    """Latest journal entry per input file."""
+    entries: Dict[str, Dict[str, Any]] = {}
+    try:
+        with open(os.path.join(out_dir, JOURNAL)) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:    # a line cut short by the interruption
+                    continue
+                entries[entry["input"]] = entry
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def is_complete(entry: Optional[Dict[str, Any]], path: str, fingerprint: str) -> bool:
+    """Whether `entry` records a finished run of the file as it is now, under this Config."""
+    if entry is None or entry.get("status") != "done" or entry.get("config") != fingerprint:
+        return False
+    if not os.path.exists(entry["output"]):
+        return False
+    stat = os.stat(path)
+    return entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns
+
+
+def run_batch(
+    inputs: List[str], out_dir: str, cfg: Config, workers: int, budget_mb: int,
+    timings: bool = False, force: bool = False,
+) -> Dict[str, Any]:
+    """
+    Analyse `inputs` into `out_dir` as described in the module docstring and
+    return the combined summary (also written to out_dir/summary.json).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    fingerprint = _config_fingerprint(cfg)
+    journal = {} if force else read_journal(out_dir)
+    names = output_names(inputs)
+    outputs = {path: os.path.join(os.path.abspath(out_dir), names[path]) for path in inputs}
+    todo = [path for path in inputs if not is_complete(journal.get(path), path, fingerprint)]
+    resumed = len(inputs) - len(todo)
+    print(f"{len(inputs)} files, {resumed} already done; {workers} workers, {budget_mb} MB budget", flush=True)
+
+    estimate_mb: Dict[str, float] = {}
+    for path in todo:
+        try:
+            estimate_mb[path] = estimate_rows(path) * cfg.BATCH_ROW_BYTES / 2**20
+        except Exception:       # unreadable — the analysis itself reports why
+            estimate_mb[path] = 0.0
+
+    values = _config_values(cfg)
+    finished = 0
+
+    def record(entry: Dict[str, Any]) -> None:
+        nonlocal finished
+        finished += 1
+        journal[entry["input"]] = entry
+        with open(os.path.join(out_dir, JOURNAL), "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        detail = (
+            f"{entry['transactions']} rows, {entry['suspicious_accounts_flagged']} flagged"
+            if entry["status"] == "done" else entry["error"]
+        )
+        print(f"[{finished}/{len(todo)}] {entry['status']:<6} {entry['input']} "
+              f"({entry['seconds']:.2f}s) {detail}", flush=True)
+
+    pending = list(todo)
+    running: Dict[concurrent.futures.Future, Tuple[str, float]] = {}
+    pool = main._process_pool(workers)
+    try:
+        while pending or running:
+            # Start every pending file that fits next to the running ones
+            for path in list(pending):
+                in_use = sum(mb for _, mb in running.values())
+                if estimate_mb[path] > budget_mb:
+                    if running:
+                        continue
+                    pending.remove(path)
+                    record(analyse_file_sharded(path, outputs[path], cfg, fingerprint, timings, budget_mb, workers))
+                elif len(running) < workers and (not running or in_use + estimate_mb[path] <= budget_mb):
+                    pending.remove(path)
+                    future = pool.submit(
+                        analyse_file, path, outputs[path], values, fingerprint, timings, main.logger.level,
+                    )
+                    running[future] = (path, estimate_mb[path])
+            if running:
+                done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    path, _ = running.pop(future)
+                    try:
+                        record(future.result())
+                    except concurrent.futures.process.BrokenProcessPool as exc:
+                        # a worker died (e.g. killed for memory); the pool restarts for the rest
+                        record({**_entry(path, outputs[path], fingerprint, time.perf_counter()),
+                                "status": "failed", "error": f"worker died: {exc}"})
+                        pool = main._process_pool(workers)
+    finally:
+        main.shutdown_process_pool()
+
+    summary = combined_summary([journal[path] for path in inputs if path in journal], resumed)
+    _write_json(os.path.join(out_dir, SUMMARY), summary)
+    return summary
+
+
+def combined_summary(entries: List[Dict[str, Any]], resumed: int) -> Dict[str, Any]:
+    done = [e for e in entries if e["status"] == "done"]
+    return {
+        "files": entries,
+        "totals": {
+            "files": len(entries),
+            "done": len(done),
+            "failed": len(entries) - len(done),
+            "resumed": resumed,
+            "transactions": sum(e.get("transactions") or 0 for e in done),
+            "suspicious_accounts_flagged": sum(e["suspicious_accounts_flagged"] for e in done),
+            "fraud_rings_detected": sum(e["fraud_rings_detected"] for e in done),
+        },
+    }
+
+
+def _parse_setting(text: str, base: Config) -> Tuple[str, Any]:
+    """KEY=VALUE → (KEY, VALUE cast to the type of the setting)."""
+    name, sep, raw = text.partition("=")
+    if not sep or not name.isupper() or not hasattr(Config, name):
+        raise argparse.ArgumentTypeError(f"not a Config setting: {text}")
+    current = getattr(base, name)
+    if isinstance(current, bool):
+        return name, raw.lower() in ("1", "true", "yes")
+    if isinstance(current, (int, float)):
+        return name, type(current)(raw)
+    return name, raw
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="files, directories or globs of CSV / Parquet files")
+    parser.add_argument("--out", required=True, help="directory for result files, journal and summary")
+    parser.add_argument("--workers", type=int, default=CFG.DETECTOR_WORKERS)
+    parser.add_argument("--memory-mb", type=int, default=None, help="memory budget (default: BATCH_MEMORY_MB)")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="Config override")
+    parser.add_argument("--timings", action="store_true", help="include the timings block in each result")
+    parser.add_argument("--force", action="store_true", help="ignore the journal and rerun every file")
+    parser.add_argument("--verbose", action="store_true", help="log every analysis stage")
+    args = parser.parse_args()
+    main.logger.setLevel("INFO" if args.verbose else "WARNING")
+
+    try:
+        cfg = CFG.replace(**dict(_parse_setting(text, CFG) for text in args.set))
+    except (argparse.ArgumentTypeError, ValueError) as exc:
+        parser.error(str(exc))
+    inputs = find_inputs(args.inputs)
+    if not inputs:
+        parser.error("no CSV or Parquet files found")
+    budget_mb = args.memory_mb if args.memory_mb is not None else memory_budget_mb(cfg)
+
+    try:
+        summary = run_batch(inputs, args.out, cfg, max(args.workers, 1), budget_mb, args.timings, args.force)
+    except KeyboardInterrupt:
+        print(f"interrupted — rerun the same command to resume from {os.path.join(args.out, JOURNAL)}")
+        sys.exit(130)
+    totals = summary["totals"]
+    print(f"{totals['done']} done, {totals['failed']} failed ({totals['resumed']} resumed); "
+          f"{totals['suspicious_accounts_flagged']} accounts flagged, {totals['fraud_rings_detected']} rings "
+          f"→ {os.path.join(args.out, SUMMARY)}")
+    if totals["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_cli()
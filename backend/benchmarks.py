@@ -0,0 +1,625 @@
+"""
+benchmarks.py — timing harness for the detection engine.
+
+    python benchmarks.py cycles   [--nodes N] [--edges E] [--clusters K] [--seed S]
+    python benchmarks.py scaling  [--nodes N] [--edges E] [--workers 1,2,4,8,16]
+    python benchmarks.py suite    [--sizes 10k,100k,1M,10M] [--seed S] [--json OUT]
+    python benchmarks.py generate --rows N --out data.csv [--truth truth.json]
+    python benchmarks.py sharded  [--rows N] [--shard-mb MB] [--workers W]
+    python benchmarks.py temporal [--nodes N] [--edges E] [--days D] [--window-hours H]
+    python benchmarks.py rings    [--nodes N] [--edges E] [--clusters K] [--cluster-size M]
+    python benchmarks.py sweep    [--rows N] [--check K]
+
+`cycles` compares detect_circular_routing against the previous whole-graph
+`nx.simple_cycles` implementation on a random sparse graph with a few dense
+mule clusters planted in it, and checks both return the same cycle set.
+
+`scaling` times the full pipeline in "process" execution mode for each
+worker count (after one warm-up run that starts the pool), reports speedup
+and parallel efficiency against the in-process thread mode, and checks
+every run returns exactly the thread-mode result.
+
+`suite` generates a synthetic dataset per size (see synthetic_transactions)
+and records, for the graph build, each detector and the full pipeline, the
+wall time and peak RSS growth, plus recall of the planted cycles, smurfs and
+shell chains and how many planted merchants were (wrongly) flagged.
+`generate` writes the same data as CSV, with the planted patterns as JSON.
+
+`sharded` writes a synthetic CSV, analyses it once in memory (ingest_csv +
+run_full_analysis) and once with run_sharded_analysis streaming the file,
+and reports wall time and the parent process' peak RSS growth for both —
+shard workers are separate processes — and whether the results match.
+
+`temporal` runs detect_circular_routing in both CYCLE_MODEs on the `cycles`
+graph (timestamps spread over --days) and reports, per mode, the wall time,
+cycles found, DFS paths explored and hops pruned by time, and checks every
+temporal cycle is also a structural one.
+
+`rings` analyses the same kind of graph with RING_MODE "paths" and
+"grouped" and reports ring count, JSON size and serialisation time of each
+result, and checks both flag the same accounts with the same scores.
+
+`sweep` times one analysis of a synthetic dataset against run_parameter_sweep
+over a 100-point grid (smurf threshold and window, merchant percentile,
+cycle weight), and checks --check points spread over the grid
+against a full analysis under that point's Config.
+"""
+
+import argparse
+import ctypes
+import json
+import random
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+
+import main
+from main import (
+    CFG, CompactGraph, _canonical_cycle, _merchant_mask, detect_circular_routing,
+    detect_layered_shells, detect_smurfing, read_csv_chunks, run_full_analysis, run_parameter_sweep,
+    run_sharded_analysis, use_config,
+)
+
+# =============================================================================
+# Reference implementations
+# =============================================================================
+
+def legacy_detect_circular_routing(G: nx.MultiDiGraph) -> List[List[str]]:
+    """Pre-SCC implementation: enumerate every simple cycle, then filter by length."""
+    simple_G = nx.DiGraph(G)
+
+    changed = True
+    while changed:
+        low = [n for n in simple_G if simple_G.degree(n) < 2]
+        simple_G.remove_nodes_from(low)
+        changed = bool(low)
+
+    cycles: List[List[str]] = []
+    seen: Set[Tuple[str, ...]] = set()
+    for cycle in nx.simple_cycles(simple_G):
+        if CFG.CYCLE_MIN_LEN <= len(cycle) <= CFG.CYCLE_MAX_LEN:
+            key = _canonical_cycle(cycle)
+            if key not in seen:
+                seen.add(key)
+                cycles.append(cycle)
+    return cycles
+
+# =============================================================================
+# Graph generation
+# =============================================================================
+
+def random_transactions(
+    nodes: int, edges: int, clusters: int, cluster_size: int, seed: int, days: int = 30,
+) -> pd.DataFrame:
+    """
+    Sparse random background plus `clusters` dense, heavily cyclic mule groups,
+    with timestamps spread uniformly over `days`.
+    """
+    rng = random.Random(seed)
+    names = [f"ACC_{i:07d}" for i in range(nodes)]
+    pairs = [tuple(rng.sample(names, 2)) for _ in range(edges)]
+    for _ in range(clusters):
+        members = rng.sample(names, cluster_size)
+        for u in members:
+            for v in rng.sample(members, max(2, cluster_size // 2)):
+                if u != v:
+                    pairs.append((u, v))
+    return pd.DataFrame({
+        "transaction_id": [f"TX_{i}" for i in range(len(pairs))],
+        "sender_id": [u for u, _ in pairs],
+        "receiver_id": [v for _, v in pairs],
+        "amount": 100.0,
+        "timestamp": pd.Timestamp("2024-01-01", tz="UTC") + pd.to_timedelta(
+            [rng.randrange(days * 86_400) for _ in pairs], unit="s",
+        ),
+    })
+
+
+def synthetic_transactions(
+    rows: int,
+    seed: int = 7,
+    cycles: int = 0,
+    smurfs: int = 0,
+    shells: int = 0,
+    merchants: int = 0,
+    days: int = 90,
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """
+    About `rows` transactions: background noise with known patterns planted.
+
+    Background accounts (~16 transactions each) only pay accounts of higher
+    rank, so the noise is acyclic and — at that activity level — has no shell
+    interiors or 72 h fan-in/out bursts; every detection should come from a
+    planted pattern. Planted on fresh accounts:
+
+    * `cycles` rings of 3–5 accounts, one transfer per hop, an hour apart;
+    * `smurfs` hubs (alternating fan-in / fan-out) with SMURF_MIN_COUNTERPARTIES
+      + 0–5 distinct counterparties inside SMURF_WINDOW_HOURS;
+    * `shells` chains of 3–5 hops whose interiors have exactly 2 transactions;
+    * `merchants` receivers of 10% of the background payments, which the
+      merchant whitelist must keep unflagged.
+
+    Returns (frame, planted) where `planted` lists the accounts of each
+    pattern. Account IDs are categoricals, timestamps datetime64[ns, UTC].
+    """
+    rng = np.random.default_rng(seed)
+    hour = 3_600                        # timestamps are whole seconds
+    window = CFG.SMURF_WINDOW_HOURS * hour
+    start = pd.Timestamp("2024-01-01", tz="UTC").value // 10**9
+    span = days * 24 * hour
+
+    names: List[str] = []
+    parts: Dict[str, List[np.ndarray]] = {"src": [], "dst": [], "ts": [], "amount": []}
+    planted: Dict[str, Any] = {"cycles": [], "fan_in": [], "fan_out": [], "shells": [], "merchants": []}
+
+    def accounts(prefix: str, n: int) -> np.ndarray:
+        first = len(names)
+        names.extend(f"{prefix}_{i:08d}" for i in range(first, first + n))
+        return np.arange(first, first + n)
+
+    def add(src: np.ndarray, dst: np.ndarray, ts: np.ndarray, amount: np.ndarray) -> None:
+        parts["src"].append(src)
+        parts["dst"].append(dst)
+        parts["ts"].append(np.asarray(ts, dtype=np.int64) * 10**9)
+        parts["amount"].append(np.round(amount, 2))
+
+    def some_time(margin: int) -> int:
+        return start + int(rng.integers(0, span - margin))
+
+    # ── Planted patterns ──────────────────────────────────────────────────────
+    for _ in range(cycles):
+        ring = accounts("CYC", int(rng.integers(3, 6)))
+        add(ring, np.roll(ring, -1), some_time(window) + np.arange(len(ring)) * hour,
+            rng.uniform(9_000, 9_900, len(ring)))
+        planted["cycles"].append([names[i] for i in ring])
+
+    for k in range(smurfs):
+        hub = accounts("SMF", 1)
+        others = accounts("SMF", CFG.SMURF_MIN_COUNTERPARTIES + int(rng.integers(0, 6)))
+        ts = some_time(window) + rng.integers(0, window // 2, len(others))
+        hubs = np.repeat(hub, len(others))
+        fan_in = k % 2 == 0
+        add(others if fan_in else hubs, hubs if fan_in else others, ts, rng.uniform(500, 9_500, len(others)))
+        planted["fan_in" if fan_in else "fan_out"].append(names[hub[0]])
+
+    for _ in range(shells):
+        chain = accounts("SHL", int(rng.integers(3, 6)) + 1)
+        hops = np.arange(len(chain) - 1)
+        add(chain[:-1], chain[1:], some_time(10 * 24 * hour) + hops * 24 * hour, 25_000.0 - hops * 50)
+        planted["shells"].append([names[i] for i in chain])
+
+    # ── Background: rank-ordered (hence acyclic) payments ─────────────────────
+    n_background = max(rows - sum(len(a) for a in parts["src"]), 0)
+    people = accounts("ACC", max(n_background // 8, 2))
+    shops = accounts("MER", merchants)
+    planted["merchants"] = [names[i] for i in shops]
+
+    payer = people[rng.integers(0, len(people), n_background)]
+    payee = people[rng.integers(0, len(people), n_background)]
+    to_shop = rng.random(n_background) < (0.10 if merchants else 0.0)
+    if merchants:
+        payee[to_shop] = shops[rng.integers(0, merchants, int(to_shop.sum()))]
+    keep = payer != payee
+    payer, payee = payer[keep], payee[keep]
+    # People rank by id and merchants (highest ids) above everyone: pay upwards only
+    low, high = np.minimum(payer, payee), np.maximum(payer, payee)
+    add(low, high, start + rng.integers(0, span, len(low)), rng.lognormal(6.5, 1.2, len(low)))
+
+    order = rng.permutation(sum(len(a) for a in parts["src"]))
+    cols = {key: np.concatenate(chunks)[order] for key, chunks in parts.items()}
+    categories = pd.Index(names)
+    df = pd.DataFrame({
+        "transaction_id": np.arange(len(order)),
+        "sender_id": pd.Categorical.from_codes(cols["src"], categories=categories),
+        "receiver_id": pd.Categorical.from_codes(cols["dst"], categories=categories),
+        "amount": cols["amount"],
+        "timestamp": pd.to_datetime(cols["ts"], utc=True),
+    })
+    return df, planted
+
+
+def recall(results: Dict[str, Any], planted: Dict[str, Any]) -> Dict[str, Any]:
+    """Share of each planted pattern found in run_full_analysis output."""
+    rings = {(r["pattern_type"], tuple(r["member_accounts"])) for r in results["fraud_rings"]}
+    cycle_rings = {_canonical_cycle(list(members)) for kind, members in rings if kind == "cycle"}
+    patterns = {a["account_id"]: set(a["detected_patterns"]) for a in results["suspicious_accounts"]}
+
+    def share(hits: List[bool]) -> float:
+        return round(sum(hits) / len(hits), 4) if hits else 1.0
+
+    return {
+        "cycles": share([_canonical_cycle(c) in cycle_rings for c in planted["cycles"]]),
+        "fan_in": share(["high_velocity" in patterns.get(h, ()) for h in planted["fan_in"]]),
+        "fan_out": share(["fan_out" in patterns.get(h, ()) for h in planted["fan_out"]]),
+        "shells": share([("layered_shells", tuple(c)) in rings for c in planted["shells"]]),
+        "merchants_flagged": sum(m in patterns for m in planted["merchants"]),
+    }
+
+
+def to_networkx(df: pd.DataFrame) -> nx.MultiDiGraph:
+    G = nx.MultiDiGraph()
+    G.add_edges_from(zip(df["sender_id"], df["receiver_id"]))
+    return G
+
+
+def _timed(fn: Callable, *args) -> Tuple[float, object]:
+    start = time.perf_counter()
+    out = fn(*args)
+    return time.perf_counter() - start, out
+
+
+def _pin_mmap_threshold() -> None:
+    """
+    Make glibc serve every allocation over 128 KiB with its own mmap and
+    unmap it on free. By default the threshold adapts upwards and freed
+    numpy buffers stay mapped, so RSS would under-report later stages.
+    """
+    try:
+        libc = ctypes.CDLL("libc.so.6")
+    except OSError:     # not glibc — RSS growth is then only approximate
+        return
+    M_MMAP_THRESHOLD = -3
+    libc.mallopt(M_MMAP_THRESHOLD, 128 * 1024)
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * 4096 / 2**20
+
+
+class PeakMemory:
+    """
+    Peak resident-set growth (MB) over a `with` block, sampled from
+    /proc/self/statm every few ms. Unlike tracemalloc it does not slow the
+    measured code down, and it counts numpy and pandas buffers alike.
+    """
+
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = interval
+        self.peak_mb = 0.0
+
+    def __enter__(self) -> "PeakMemory":
+        self._base = self._peak = _rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._peak = max(self._peak, _rss_mb())
+
+    def __exit__(self, *exc: Any) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak_mb = round(max(self._peak, _rss_mb()) - self._base, 1)
+
+
+def _measured(fn: Callable, *args) -> Tuple[float, float, Any]:
+    """(wall seconds, peak RSS growth in MB, result)"""
+    with PeakMemory() as mem:
+        elapsed, out = _timed(fn, *args)
+    return elapsed, mem.peak_mb, out
+
+# =============================================================================
+# Benchmarks
+# =============================================================================
+
+def bench_cycles(args: argparse.Namespace) -> None:
+    df = random_transactions(args.nodes, args.edges, args.clusters, args.cluster_size, args.seed)
+
+    build_s, graph = _timed(CompactGraph.from_frame, df)
+    print(f"graph: {graph.n_nodes} nodes, {graph.n_edges} edges  (built in {build_s:.3f}s)")
+
+    new_s, new_cycles = _timed(detect_circular_routing, graph)
+    new_cycles = [[graph.labels[n] for n in c] for c in new_cycles]
+    print(f"bounded SCC engine : {new_s:8.3f}s  {len(new_cycles)} cycles")
+
+    if args.skip_legacy:
+        return
+    old_s, old_cycles = _timed(legacy_detect_circular_routing, to_networkx(df))
+    print(f"legacy simple_cycles: {old_s:8.3f}s  {len(old_cycles)} cycles")
+
+    same = {_canonical_cycle(c) for c in new_cycles} == {_canonical_cycle(c) for c in old_cycles}
+    print(f"speedup: {old_s / max(new_s, 1e-9):.1f}x   identical cycle sets: {same}")
+    if not same:
+        raise SystemExit(1)
+
+
+def _comparable(result: Dict[str, Any]) -> str:
+    summary = dict(result["summary"], processing_time_seconds=0)
+    result = {k: v for k, v in result.items() if k != "timings"}
+    return json.dumps(dict(result, summary=summary), sort_keys=True)
+
+
+def bench_scaling(args: argparse.Namespace) -> None:
+    df = random_transactions(args.nodes, args.edges, args.clusters, args.cluster_size, args.seed)
+    print(f"{len(df)} transactions")
+
+    CFG.EXECUTION_MODE = "thread"
+    base_s, base = _timed(run_full_analysis, df)
+    expected = _comparable(base)
+    print(f"thread mode        : {base_s:8.3f}s")
+
+    CFG.EXECUTION_MODE = "process"
+    ok = True
+    single_s = 0.0
+    try:
+        for workers in [int(w) for w in args.workers.split(",")]:
+            CFG.DETECTOR_WORKERS = workers
+            run_full_analysis(df)                       # warm-up: starts the pool
+            elapsed, result = _timed(run_full_analysis, df)
+            if workers == 1:
+                single_s = elapsed
+            same = _comparable(result) == expected
+            ok &= same
+            line = f"process x{workers:<3d}      : {elapsed:8.3f}s  vs thread {base_s / elapsed:5.2f}x"
+            if single_s:
+                line += f"  efficiency {single_s / (elapsed * workers):6.1%}"
+            print(f"{line}  identical: {same}")
+    finally:
+        main.shutdown_process_pool()
+    if not ok:
+        raise SystemExit(1)
+
+
+def _parse_size(text: str) -> int:
+    """'10k' → 10_000, '1M' → 1_000_000."""
+    text = text.strip().lower()
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1])
+    return int(float(text[:-1]) * scale) if scale else int(text)
+
+
+def _planted_counts(rows: int) -> Dict[str, int]:
+    return {
+        "cycles": max(10, rows // 10_000),
+        "smurfs": max(10, rows // 20_000),
+        "shells": max(10, rows // 10_000),
+        "merchants": max(3, rows // 500_000),
+    }
+
+
+def bench_suite(args: argparse.Namespace) -> None:
+    CFG.EXECUTION_MODE = "thread"
+    report: List[Dict[str, Any]] = []
+    header = f"{'rows':>10}  {'stage':<10} {'wall s':>9} {'peak MB':>9}"
+    print(header)
+    print("-" * len(header))
+    for size in [_parse_size(s) for s in args.sizes.split(",")]:
+        gen_s, (df, planted) = _timed(lambda: synthetic_transactions(size, args.seed, **_planted_counts(size)))
+        stages: Dict[str, Tuple[float, float]] = {}
+
+        wall, mem, graph = _measured(CompactGraph.from_frame, df)
+        stages["graph"] = (wall, mem)
+        wall, mem, whitelist = _measured(_merchant_mask, graph.tx_count)
+        stages["whitelist"] = (wall, mem)
+        wall, mem, _ = _measured(detect_circular_routing, graph)
+        stages["cycles"] = (wall, mem)
+        wall, mem, _ = _measured(detect_smurfing, graph, whitelist)
+        stages["smurfing"] = (wall, mem)
+        wall, mem, _ = _measured(detect_layered_shells, graph, whitelist)
+        stages["shells"] = (wall, mem)
+        del graph, whitelist
+
+        wall, mem, results = _measured(run_full_analysis, df)
+        stages["full"] = (wall, mem)
+        found = recall(results, planted)
+
+        for name, (wall, mem) in stages.items():
+            print(f"{len(df):>10}  {name:<10} {wall:>9.3f} {mem:>9.1f}")
+        print(f"{'':>10}  recall     " + "  ".join(f"{k}={v}" for k, v in found.items()))
+        report.append({
+            "rows": len(df), "seed": args.seed, "generate_seconds": round(gen_s, 3),
+            "stages": {k: {"wall_seconds": round(w, 4), "peak_mb": m} for k, (w, m) in stages.items()},
+            "recall": found,
+        })
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {args.json}")
+
+
+def bench_generate(args: argparse.Namespace) -> None:
+    df, planted = synthetic_transactions(args.rows, args.seed, **_planted_counts(args.rows))
+    df.to_csv(args.out, index=False)
+    print(f"wrote {len(df)} rows to {args.out}")
+    if args.truth:
+        with open(args.truth, "w") as f:
+            json.dump(planted, f, indent=2)
+
+
+def bench_sharded(args: argparse.Namespace) -> None:
+    df, _ = synthetic_transactions(args.rows, args.seed, **_planted_counts(args.rows))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = f"{tmp}/transactions.csv"
+        df.to_csv(path, index=False)
+        del df
+
+        def in_memory() -> Dict[str, Any]:
+            with open(path, "rb") as raw:
+                frame, _ = main.ingest_csv(raw)
+            return run_full_analysis(frame)
+
+        def sharded() -> Dict[str, Any]:
+            with open(path, "rb") as raw:
+                return run_sharded_analysis(read_csv_chunks(raw))
+
+        CFG.EXECUTION_MODE = "thread"
+        base_s, base_mb, base = _measured(in_memory)
+        CFG.SHARD_MEMORY_MB, CFG.DETECTOR_WORKERS = args.shard_mb, args.workers
+        try:
+            shard_s, shard_mb, result = _measured(sharded)
+        finally:
+            main.shutdown_process_pool()
+
+    counters = result["timings"]["counters"]
+    print(f"{args.rows} rows, {counters['components']} components, {counters['shards']} shards")
+    print(f"in memory : {base_s:8.3f}s  {base_mb:9.1f} MB")
+    print(f"sharded   : {shard_s:8.3f}s  {shard_mb:9.1f} MB (parent)")
+    same = _comparable(result) == _comparable(base)
+    print(f"identical: {same}")
+    if not same:
+        raise SystemExit(1)
+
+
+def bench_temporal(args: argparse.Namespace) -> None:
+    df = random_transactions(args.nodes, args.edges, args.clusters, args.cluster_size, args.seed, args.days)
+    graph = CompactGraph.from_frame(df)
+    print(f"graph: {graph.n_nodes} nodes, {graph.n_edges} edges over {args.days} days, "
+          f"window {args.window_hours} h")
+
+    CFG.CYCLE_WINDOW_HOURS = args.window_hours
+    found: Dict[str, Set[Tuple[int, ...]]] = {}
+    explored: Dict[str, int] = {}
+    for mode in ("structural", "temporal"):
+        CFG.CYCLE_MODE = mode
+        ctx = main.RunContext()
+        seconds, cycles = _timed(detect_circular_routing, graph, ctx)
+        found[mode] = {tuple(c) for c in cycles}
+        explored[mode] = ctx.counters.get("cycle_paths_explored", 0)
+        print(f"{mode:<10}: {seconds:8.3f}s  {len(cycles):8d} cycles  "
+              f"{explored[mode]:10d} paths explored  {ctx.counters.get('cycle_hops_pruned', 0):10d} hops pruned")
+
+    ratio = explored["structural"] / max(explored["temporal"], 1)
+    subset = found["temporal"] <= found["structural"]
+    print(f"search space: {ratio:.1f}x smaller   temporal ⊆ structural: {subset}")
+    if not subset:
+        raise SystemExit(1)
+
+
+def bench_rings(args: argparse.Namespace) -> None:
+    df = random_transactions(args.nodes, args.edges, args.clusters, args.cluster_size, args.seed)
+    accounts: Dict[str, List[Tuple[str, float]]] = {}
+    for mode in ("paths", "grouped"):
+        CFG.RING_MODE = mode
+        result = run_full_analysis(df)
+        dump_s, body = _timed(json.dumps, result)
+        accounts[mode] = [(a["account_id"], a["suspicion_score"]) for a in result["suspicious_accounts"]]
+        print(f"{mode:<8}: {len(result['fraud_rings']):8d} rings  {len(body) / 1e6:8.2f} MB JSON  "
+              f"{dump_s:7.3f}s json.dumps")
+    same = accounts["paths"] == accounts["grouped"]
+    print(f"same flagged accounts and scores: {same}")
+    if not same:
+        raise SystemExit(1)
+
+
+SWEEP_GRID: Dict[str, List[float]] = {
+    "SMURF_MIN_COUNTERPARTIES": [6, 8, 10, 12, 15],
+    "SMURF_WINDOW_HOURS": [24, 72],
+    "MERCHANT_PERCENTILE": [97.0, 99.0],
+    "W_CYCLE": [0.3, 0.4, 0.5, 0.6, 0.7],
+}
+
+
+def bench_sweep(args: argparse.Namespace) -> None:
+    df, _ = synthetic_transactions(args.rows, args.seed, **_planted_counts(args.rows))
+    graph = CompactGraph.from_frame(df)
+    points = main._sweep_points(SWEEP_GRID, CFG)
+    print(f"{len(df)} rows, {graph.n_nodes} accounts, {len(points)} grid points")
+
+    one_s, _ = _timed(main.analyze_graph, graph)
+    sweep_s, sweep = _timed(run_parameter_sweep, graph, points)
+    summary = sweep["summary"]
+    print(f"one analysis: {one_s:8.3f}s")
+    print(f"sweep       : {sweep_s:8.3f}s  ({sweep_s / one_s:.1f}x one analysis, "
+          f"{len(points) * one_s / sweep_s:.0f}x faster than {len(points)} runs)  "
+          f"{summary['smurf_window_passes']} window passes, {summary['shell_searches']} shell searches")
+
+    def row(result: Dict[str, Any]) -> Tuple[Any, ...]:
+        top = [(a["account_id"], a["suspicion_score"]) for a in result["suspicious_accounts"][:CFG.SWEEP_TOP_ACCOUNTS]]
+        return result["summary"]["suspicious_accounts_flagged"], result["summary"]["fraud_rings_detected"], top
+
+    same = True
+    for i in np.linspace(0, len(points) - 1, args.check).astype(int).tolist():
+        with use_config(CFG.replace(**points[i])):
+            expected = row(main.analyze_graph(graph))
+        got = sweep["points"][i]
+        same &= expected == (
+            got["suspicious_accounts_flagged"], got["fraud_rings_detected"],
+            [(a["account_id"], a["suspicion_score"]) for a in got["top_accounts"]],
+        )
+    print(f"{args.check} points match a full analysis: {same}")
+    if not same:
+        raise SystemExit(1)
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    p = sub.add_parser("cycles", help="cycle engine vs legacy nx.simple_cycles")
+    p.add_argument("--nodes", type=int, default=3_000)
+    p.add_argument("--edges", type=int, default=3_000)
+    p.add_argument("--clusters", type=int, default=4)
+    p.add_argument("--cluster-size", type=int, default=8)
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--skip-legacy", action="store_true", help="only time the new engine")
+    p.set_defaults(func=bench_cycles)
+
+    p = sub.add_parser("scaling", help="process-pool detectors across worker counts")
+    p.add_argument("--nodes", type=int, default=50_000)
+    p.add_argument("--edges", type=int, default=200_000)
+    p.add_argument("--clusters", type=int, default=40)
+    p.add_argument("--cluster-size", type=int, default=8)
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--workers", default="1,2,4,8,16", help="comma-separated worker counts")
+    p.set_defaults(func=bench_scaling)
+
+    p = sub.add_parser("suite", help="per-stage wall time, memory and recall on synthetic data")
+    p.add_argument("--sizes", default="10k,100k,1M,10M", help="comma-separated row counts")
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--json", help="also write the report to this file")
+    p.set_defaults(func=bench_suite)
+
+    p = sub.add_parser("generate", help="write a synthetic dataset as CSV")
+    p.add_argument("--rows", type=_parse_size, required=True)
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--out", required=True)
+    p.add_argument("--truth", help="write the planted patterns to this JSON file")
+    p.set_defaults(func=bench_generate)
+
+    p = sub.add_parser("sharded", help="sharded vs in-memory analysis of a synthetic CSV")
+    p.add_argument("--rows", type=_parse_size, default=1_000_000)
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--shard-mb", type=int, default=CFG.SHARD_MEMORY_MB)
+    p.add_argument("--workers", type=int, default=CFG.DETECTOR_WORKERS)
+    p.set_defaults(func=bench_sharded)
+
+    p = sub.add_parser("temporal", help="structural vs time-respecting cycle search")
+    p.add_argument("--nodes", type=int, default=20_000)
+    p.add_argument("--edges", type=int, default=60_000)
+    p.add_argument("--clusters", type=int, default=20)
+    p.add_argument("--cluster-size", type=int, default=20)
+    p.add_argument("--days", type=int, default=30)
+    p.add_argument("--window-hours", type=float, default=CFG.CYCLE_WINDOW_HOURS)
+    p.add_argument("--seed", type=int, default=7)
+    p.set_defaults(func=bench_temporal)
+
+    p = sub.add_parser("rings", help="fraud ring output size, one ring per path vs grouped")
+    p.add_argument("--nodes", type=int, default=20_000)
+    p.add_argument("--edges", type=int, default=20_000)
+    p.add_argument("--clusters", type=int, default=20)
+    p.add_argument("--cluster-size", type=int, default=16)
+    p.add_argument("--seed", type=int, default=7)
+    p.set_defaults(func=bench_rings)
+
+    p = sub.add_parser("sweep", help="100-point parameter sweep vs one analysis")
+    p.add_argument("--rows", type=_parse_size, default=200_000)
+    p.add_argument("--seed", type=int, default=7)
+    p.add_argument("--check", type=int, default=5, help="grid points re-run as full analyses")
+    p.set_defaults(func=bench_sweep)
+
+    args = parser.parse_args()
+    main.logger.setLevel("WARNING")
+    _pin_mmap_threshold()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -6,18 +6,37 @@ JSON output format, field names, ring ID format, cycle lengths, smurfing fan-in/
 shell hop counts, and false-positive guards all match the problem statement exactly.
 """
 
+import base64
+import bisect
+import contextlib
+import hashlib
 import io
+import itertools
+import json
 import logging
 import math
+import multiprocessing
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
 import time
+import uuid
 import concurrent.futures
-from typing import Any, Dict, List, Set, Tuple
+import contextvars
+import csv
+from collections import OrderedDict, deque
+from multiprocessing import shared_memory
+from typing import Any, BinaryIO, Callable, ContextManager, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
 
-import networkx as nx
+import numpy as np
 import pandas as pd
-from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi import Depends, FastAPI, File, HTTPException, Query, Request, Response, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
 
 # =============================================================================
@@ -44,6 +63,10 @@ class Config:
     # ── Circular routing (PDF §Detection Pattern 1) ──────────────────────────
     CYCLE_MIN_LEN: int = 3
     CYCLE_MAX_LEN: int = 5          # PDF specifies exactly 3–5
+    # "structural" — any closed path; "temporal" — hops must follow each other
+    # in time, first to last within CYCLE_WINDOW_HOURS
+    CYCLE_MODE: str = "structural"
+    CYCLE_WINDOW_HOURS: int = 72
 
     # ── Smurfing (PDF §Detection Pattern 2) ──────────────────────────────────
     SMURF_MIN_COUNTERPARTIES: int = 10   # 10+ senders (fan-in) or receivers (fan-out)
@@ -53,6 +76,16 @@ class Config:
     SHELL_MIN_HOPS: int = 3              # chains of 3+ hops
     SHELL_MAX_TX_PER_NODE: int = 3       # intermediate accounts with ≤ 3 total txns (PDF: "2–3")
     SHELL_MAX_DEPTH: int = 8             # DFS recursion cap
+    SHELL_MAX_CHAINS_PER_HEAD: int = 1_000   # stop expanding a head after this many chains
+
+    # ── Detector work budgets ─────────────────────────────────────────────────
+    # A detector that hits either limit stops and returns what it found so far;
+    # the response lists it in summary.truncated_detectors. 0 disables a limit.
+    # Overridable per request (see BUDGET_OVERRIDES).
+    CYCLE_MAX_SECONDS: float = 20.0
+    CYCLE_MAX_EXPANDED: int = 20_000_000     # DFS nodes expanded by the cycle search
+    SHELL_MAX_SECONDS: float = 20.0
+    SHELL_MAX_EXPANDED: int = 5_000_000      # DFS nodes expanded by the shell search
 
     # ── False-positive guards ─────────────────────────────────────────────────
     # High-volume legitimate accounts: top N% by transaction count are excluded
@@ -70,8 +103,122 @@ class Config:
     # Volume normalisation (log scale denominator)
     VOLUME_LOG_SCALE: float = 1_000_000.0
 
+    # ── Ring output ───────────────────────────────────────────────────────────
+    # "paths" — one ring per cycle and per shell chain; "grouped" — cycles (and
+    # shell chains) sharing an account merge into one ring that lists its
+    # members, how many paths it holds and the first RING_REPRESENTATIVES of
+    # them. Overridable per request (?rings=grouped).
+    RING_MODE: str = "paths"
+    RING_REPRESENTATIVES: int = 3
+
+    # ── Upload ingestion ──────────────────────────────────────────────────────
+    UPLOAD_CHUNK_ROWS: int = 250_000     # rows parsed per read_csv chunk
+    UPLOAD_READ_BYTES: int = 1 << 20     # raw read size from the spooled upload
+
+    # ── Analysis jobs ─────────────────────────────────────────────────────────
+    JOB_WORKERS: int = 2                 # analyses running concurrently
+    JOB_MAX_PENDING: int = 8             # queued + running jobs before POST /jobs returns 429
+    JOB_HISTORY: int = 32                # finished jobs kept for GET /jobs/{id}
+
+    # ── Dataset store ─────────────────────────────────────────────────────────
+    # Uploaded datasets persist here as memory-mapped columns (see DatasetStore);
+    # point every uvicorn worker at the same directory.
+    DATASET_DIR: str = os.environ.get("MULING_DATASET_DIR", "datasets")
+
+    # ── Result cache ──────────────────────────────────────────────────────────
+    ANALYSIS_CACHE_SIZE: int = 8         # (dataset, config) results kept in memory
+    VIEW_CACHE_SIZE: int = 16            # sorted/filtered record lists kept for paging
+
+    # ── Result paging & streaming ─────────────────────────────────────────────
+    PAGE_DEFAULT_LIMIT: int = 100        # records per page without ?limit=
+    PAGE_MAX_LIMIT: int = 5_000
+    NDJSON_BATCH_RECORDS: int = 1_000    # records serialised per streamed chunk
+    PARQUET_COMPRESSION: str = "zstd"    # /download?format=parquet codec
+
+    # ── Account lookup (GET /accounts/{account_id}) ───────────────────────────
+    ACCOUNT_MAX_HOPS: int = 3            # deepest ?hops= neighbourhood
+    ACCOUNT_MAX_NEIGHBOURS: int = 10_000 # stop expanding a neighbourhood past this many accounts
+
+    # ── Detector execution ────────────────────────────────────────────────────
+    EXECUTION_MODE: str = "thread"       # "thread" (one thread per detector), "process" or "sharded"
+    DETECTOR_WORKERS: int = os.cpu_count() or 1   # process-pool size in "process" mode
+    TASKS_PER_WORKER: int = 4            # work slices per worker, for load balancing
+
+    # ── Sharded analysis ──────────────────────────────────────────────────────
+    # Weakly connected components are packed into shards of at most
+    # SHARD_MEMORY_MB (estimated at SHARD_ROW_BYTES per transaction while a
+    # shard is analysed); DETECTOR_WORKERS shards are analysed at a time.
+    SHARD_MEMORY_MB: int = 1_024
+    SHARD_ROW_BYTES: int = 320
+    SHARD_SPILL_DIR: Optional[str] = None    # temp dir for shard files (None = system default)
+
+    # ── Incremental append ────────────────────────────────────────────────────
+    APPEND_COMPACT_FRACTION: float = 0.25   # rebuild once appended rows exceed this share of the base
+
+    # ── Metrics ───────────────────────────────────────────────────────────────
+    # Upper bounds (seconds) of the latency histogram buckets on GET /metrics.
+    METRICS_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+    # ── Batch CLI (batch.py) ──────────────────────────────────────────────────
+    # Files run concurrently while their estimated peak memory (rows ×
+    # BATCH_ROW_BYTES) fits in BATCH_MEMORY_MB; 0 = 75% of available memory.
+    # A file that alone exceeds it is analysed sharded in the parent process.
+    BATCH_MEMORY_MB: int = 0
+    BATCH_ROW_BYTES: int = 600
+
+    # ── Parameter sweep (POST /sweep) ─────────────────────────────────────────
+    SWEEP_PARAMETERS: Tuple[str, ...] = (
+        "CYCLE_MIN_LEN", "CYCLE_MAX_LEN",
+        "SMURF_MIN_COUNTERPARTIES", "SMURF_WINDOW_HOURS", "SHELL_MAX_TX_PER_NODE",
+        "MERCHANT_PERCENTILE", "MERCHANT_MIN_TX",
+        "W_CYCLE", "W_SMURF", "W_SHELL", "W_VOLUME", "VOLUME_LOG_SCALE",
+    )
+    SWEEP_MAX_POINTS: int = 1_000        # grid points evaluated per request
+    SWEEP_TOP_ACCOUNTS: int = 10         # highest-scoring accounts listed per point
+
+    def __init__(self, **overrides: Any) -> None:
+        for name, value in overrides.items():
+            if not name.isupper() or not hasattr(Config, name):
+                raise ValueError(f"Unknown setting: {name}")
+            setattr(self, name, value)
+
+    def replace(self, **overrides: Any) -> "Config":
+        """A new Config with this one's values, `overrides` applied on top."""
+        return Config(**{**_config_values(self), **overrides})
 
-CFG = Config()
+
+class _ActiveConfig:
+    """
+    CFG: attribute reads and writes go to the Config active in the current
+    context (see use_config), the process-wide default otherwise. Requests
+    run under their own Config objects, so concurrent analyses with different
+    settings never see each other's values.
+    """
+
+    __slots__ = ()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(_active_config.get(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(_active_config.get(), name, value)
+
+    def __dir__(self) -> List[str]:
+        return dir(_active_config.get())
+
+
+_active_config: contextvars.ContextVar[Config] = contextvars.ContextVar("muling_config", default=Config())
+CFG: Config = _ActiveConfig()    # type: ignore[assignment]
+
+
+@contextlib.contextmanager
+def use_config(cfg: Config) -> Iterator[Config]:
+    """Make `cfg` what CFG reads in this context; the pipeline's threads inherit it."""
+    token = _active_config.set(cfg)
+    try:
+        yield cfg
+    finally:
+        _active_config.reset(token)
 
 # =============================================================================
 # Pydantic models — field names match the PDF's required JSON format EXACTLY
@@ -88,21 +235,147 @@ class FraudRing(BaseModel):
     member_accounts: List[str]
     pattern_type: str                   # "cycle" | "smurfing" | "layered_shells"
     risk_score: float                   # 0–100
+    # Only with RING_MODE "grouped" (?rings=grouped):
+    member_count: Optional[int] = None                      # len(member_accounts)
+    path_count: Optional[int] = None                        # cycles / shell chains merged into the ring
+    representatives: Optional[List[List[str]]] = None       # the first RING_REPRESENTATIVES of them
 
 class Summary(BaseModel):
     total_accounts_analyzed: int
     suspicious_accounts_flagged: int
     fraud_rings_detected: int
     processing_time_seconds: float
+    truncated_detectors: List[str] = []  # detectors stopped by their work budget
+
+class Timings(BaseModel):
+    stages: Dict[str, float]            # wall seconds per pipeline stage
+    counters: Dict[str, int]            # e.g. {"nodes": 812, "cycle_paths_explored": 5120}
 
 class AnalysisResponse(BaseModel):
     suspicious_accounts: List[SuspiciousAccount]
     fraud_rings: List[FraudRing]
     summary: Summary
+    timings: Optional[Timings] = None   # only with ?timings=true
+
+class SuspiciousAccountPage(BaseModel):
+    items: List[SuspiciousAccount]
+    total: int                          # records matching min_score, across all pages
+    next_cursor: Optional[str] = None   # pass as ?cursor= for the next page; None on the last
+
+class FraudRingPage(BaseModel):
+    items: List[FraudRing]
+    total: int
+    next_cursor: Optional[str] = None
+
+class JobStatus(BaseModel):
+    job_id: str
+    dataset_id: Optional[str] = None
+    status: str                         # "queued" | "running" | "done" | "failed" | "cancelled"
+    progress: Dict[str, float]          # per-stage fraction, 0–1
+    error: Optional[str] = None
+    result: Optional[AnalysisResponse] = None
+
+class AppendResponse(BaseModel):
+    status: str
+    dataset_id: str
+    transactions_appended: int
+    transactions_total: int
+    accounts_reanalysed: int
+    processing_time_seconds: float
+
 
 class UploadResponse(BaseModel):
     status: str
+    dataset_id: str
     transactions_loaded: int
+    rows_per_second: float = 0.0
+    peak_rss_mb: float = 0.0
+
+class DatasetInfo(BaseModel):
+    dataset_id: str
+    version: str                        # content hash of the current version
+    transactions: int
+    segments: int                       # stored upload + appended batches not yet compacted
+    current: bool                       # used by requests without ?dataset_id=
+    created_at: float                   # Unix seconds
+    updated_at: float
+
+class Counterparty(BaseModel):
+    account_id: str
+    direction: str                      # "out" (paid by the account) | "in"
+    transactions: int
+    total_amount: float
+
+class AccountTransaction(BaseModel):
+    transaction_id: str
+    sender_id: str
+    receiver_id: str
+    amount: float
+    timestamp: Optional[str]            # ISO 8601 UTC; None if unparseable
+
+class AccountWindow(BaseModel):
+    start: Optional[str]                # None when the account has no dated transaction
+    end: Optional[str]
+    sent: int
+    received: int
+    amount_sent: float
+    amount_received: float
+    distinct_receivers: int             # fan-out inside the window
+    distinct_senders: int               # fan-in inside the window
+    transactions: List[AccountTransaction]   # oldest first, at most ?limit
+
+class Neighbour(BaseModel):
+    account_id: str
+    hops: int
+    suspicion_score: Optional[float] = None
+
+class AccountDetail(BaseModel):
+    dataset_id: str
+    account_id: str
+    transactions: int                   # sent + received
+    first_seen: Optional[str]
+    last_seen: Optional[str]
+    counterparties: List[Counterparty]  # most transactions first, at most ?limit
+    counterparties_total: int
+    window: AccountWindow
+    analysed: bool                      # False: no analysis of this version yet, rings unknown
+    suspicion: Optional[SuspiciousAccount] = None
+    rings: List[FraudRing]
+    neighbourhood: List[Neighbour]      # accounts within ?hops, nearest first, at most ?limit
+    neighbourhood_total: int
+    neighbourhood_truncated: bool       # expansion stopped at ACCOUNT_MAX_NEIGHBOURS
+
+class SweepRequest(BaseModel):
+    # Config constant (one of SWEEP_PARAMETERS) → values to try; every
+    # combination is evaluated, e.g. {"SMURF_MIN_COUNTERPARTIES": [5, 10, 15]}
+    grid: Dict[str, List[float]] = {}
+
+class ScoredAccount(BaseModel):
+    account_id: str
+    suspicion_score: float
+
+class SweepPoint(BaseModel):
+    parameters: Dict[str, Any]          # this point's grid values
+    suspicious_accounts_flagged: int
+    fraud_rings_detected: int
+    pattern_accounts: Dict[str, int]    # accounts per pattern: "cycle" | "smurfing" | "layered_shells"
+    score_mean: float
+    score_histogram: List[int]          # flagged accounts per 10-point score band, 0–10 … 90–100
+    top_accounts: List[ScoredAccount]   # the first SWEEP_TOP_ACCOUNTS suspicious_accounts
+
+class SweepSummary(BaseModel):
+    total_accounts_analyzed: int
+    grid_points: int
+    cycle_searches: int                 # shared work actually done, see run_parameter_sweep
+    smurf_window_passes: int
+    shell_searches: int
+    processing_time_seconds: float
+    truncated_detectors: List[str] = []
+
+class SweepResponse(BaseModel):
+    points: List[SweepPoint]
+    summary: SweepSummary
+    timings: Timings
 
 # =============================================================================
 # Helpers
@@ -125,444 +398,4425 @@ def _ring_id(index: int) -> str:
     return f"RING_{index + 1:03d}"
 
 
-def _build_merchant_whitelist(count_map: Dict[str, int]) -> Set[str]:
+def _config_values(cfg: Config) -> Dict[str, Any]:
+    """Every tunable constant of `cfg` as a plain dict."""
+    return {k: getattr(cfg, k) for k in dir(cfg) if k.isupper()}
+
+
+def _merchant_mask(counts: np.ndarray) -> np.ndarray:
     """
     Accounts in the top MERCHANT_PERCENTILE by tx count AND above MERCHANT_MIN_TX
     are treated as legitimate high-volume merchants / payroll accounts and
-    excluded from smurfing + shell flags.
+    excluded from smurfing + shell flags. `counts` is indexed by account code.
     PDF requirement: 'MUST NOT flag legitimate high-volume merchants or payroll accounts'.
     """
-    if not count_map:
-        return set()
-    counts = sorted(count_map.values())
-    threshold_idx = int(len(counts) * CFG.MERCHANT_PERCENTILE / 100)
-    percentile_val = counts[min(threshold_idx, len(counts) - 1)]
-    threshold = max(CFG.MERCHANT_MIN_TX, percentile_val)
-    return {acct for acct, cnt in count_map.items() if cnt >= threshold}
+    if not len(counts):
+        return np.zeros(0, dtype=bool)
+    return counts >= _merchant_threshold(counts)
+
+
+def _merchant_threshold(counts: np.ndarray) -> int:
+    """Tx count at which an account enters the merchant whitelist (counts non-empty)."""
+    k = min(int(len(counts) * CFG.MERCHANT_PERCENTILE / 100), len(counts) - 1)
+    return max(CFG.MERCHANT_MIN_TX, int(np.partition(counts, k)[k]))
 
 # =============================================================================
-# Detection 1 — Circular Routing (PDF §1)
+# Compact graph core — interned accounts + CSR adjacency shared by all detectors
 # =============================================================================
 
-def detect_circular_routing(G: nx.MultiDiGraph) -> List[List[str]]:
+_NAT = np.iinfo(np.int64).min      # int64 view of NaT
+
+
+class CompactGraph:
     """
-    Simple cycles of length 3–5 (PDF: 'Detect cycles of length 3 to 5').
-    Iterative pruning removes nodes that cannot be part of any cycle.
+    Account IDs interned once to dense integer codes, with code order equal to
+    sorted account-ID order, and one array-backed adjacency every detector reads.
+
+    Transaction arrays (`tx_*`) are sorted by (src, dst, timestamp, input row),
+    so the transactions behind each distinct edge are contiguous: edge `e`
+    owns rows `edge_tx[e]:edge_tx[e + 1]`. `indptr`/`indices` is the CSR over
+    distinct edges (successors sorted), `rindptr`/`rindices` the matching CSC
+    (predecessors) with `redge` mapping CSC slots back to edge ids.
+    Unparseable timestamps are stored as `_NAT`.
     """
-    simple_G = nx.DiGraph(G)
 
-    changed = True
-    while changed:
-        low = [n for n in simple_G if simple_G.degree(n) < 2]
-        simple_G.remove_nodes_from(low)
-        changed = bool(low)
+    # Every array attribute — what process workers receive via shared memory
+    ARRAYS: Tuple[str, ...] = (
+        "tx_src", "tx_dst", "tx_amount", "tx_ts", "tx_row",
+        "edge_tx", "edge_src", "indices", "edge_count", "edge_amount", "indptr",
+        "redge", "rindices", "rindptr", "tx_count", "volume",
+    )
 
-    cycles: List[List[str]] = []
-    seen: Set[Tuple[str, ...]] = set()
+    def __init__(
+        self,
+        labels: np.ndarray,
+        tx_src: np.ndarray,
+        tx_dst: np.ndarray,
+        tx_amount: np.ndarray,
+        tx_ts: np.ndarray,
+        tx_row: np.ndarray,
+    ) -> None:
+        n = len(labels)
+        order = np.lexsort((tx_row, tx_ts, tx_dst, tx_src))
+        self.labels = labels
+        self.tx_src = tx_src[order]
+        self.tx_dst = tx_dst[order]
+        self.tx_amount = tx_amount[order]
+        self.tx_ts = tx_ts[order]
+        self.tx_row = tx_row[order]
 
-    for cycle in nx.simple_cycles(simple_G):
-        if CFG.CYCLE_MIN_LEN <= len(cycle) <= CFG.CYCLE_MAX_LEN:
-            key = _canonical_cycle(cycle)
-            if key not in seen:
-                seen.add(key)
-                cycles.append(cycle)
+        n_tx = len(order)
+        if n_tx:
+            new_edge = np.empty(n_tx, dtype=bool)
+            new_edge[0] = True
+            np.not_equal(self.tx_src[1:], self.tx_src[:-1], out=new_edge[1:])
+            new_edge[1:] |= self.tx_dst[1:] != self.tx_dst[:-1]
+            edge_start = np.flatnonzero(new_edge)
+        else:
+            edge_start = np.empty(0, dtype=np.int64)
+        # Blank amounts (NaN) add nothing to any total, as a pandas sum skips them
+        amount = np.where(np.isnan(self.tx_amount), 0.0, self.tx_amount)
+        self.edge_tx = np.append(edge_start, n_tx)
+        self.edge_src = self.tx_src[edge_start]
+        self.indices = self.tx_dst[edge_start]
+        self.edge_count = np.diff(self.edge_tx)
+        self.edge_amount = (
+            np.add.reduceat(amount, edge_start) if n_tx else np.empty(0, dtype=np.float64)
+        )
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.edge_src, minlength=n), out=self.indptr[1:])
 
-    logger.info("Cycles: %d unique rings found", len(cycles))
-    return cycles
+        self.redge = np.lexsort((self.edge_src, self.indices))
+        self.rindices = self.edge_src[self.redge]
+        self.rindptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.indices, minlength=n), out=self.rindptr[1:])
+
+        # Per-account totals; a self-transfer counts at both ends, as in the
+        # sender + receiver groupby sums.
+        self.tx_count = (
+            np.bincount(self.tx_src, minlength=n) + np.bincount(self.tx_dst, minlength=n)
+        )
+        self.volume = (
+            np.bincount(self.tx_src, weights=amount, minlength=n)
+            + np.bincount(self.tx_dst, weights=amount, minlength=n)
+        )
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "CompactGraph":
+        """Intern sender/receiver IDs and parse timestamps once for the whole frame."""
+        n_rows = len(df)
+        senders, receivers = df["sender_id"], df["receiver_id"]
+        if (
+            isinstance(senders.dtype, pd.CategoricalDtype)
+            and senders.dtype == receivers.dtype
+            and not (senders.isna().any() or receivers.isna().any())
+        ):
+            # Ingestion already interned both columns against one category set
+            uniques = np.asarray(senders.cat.categories, dtype=object)
+            codes = np.concatenate([senders.cat.codes.to_numpy(), receivers.cat.codes.to_numpy()])
+        else:
+            ids = pd.concat([senders, receivers], ignore_index=True).astype(str).fillna("nan")
+            codes, uniques = pd.factorize(ids)
+            uniques = np.asarray(uniques, dtype=object)
+        order = np.argsort(uniques, kind="stable")
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        codes = rank[codes].astype(_code_dtype(len(order)))
+
+        ts = pd.to_datetime(df["timestamp"], utc=True, errors="coerce")
+        tx_ts = ts.dt.as_unit("ns").to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+        return cls(
+            labels=uniques[order],
+            tx_src=codes[:n_rows],
+            tx_dst=codes[n_rows:],
+            tx_amount=df["amount"].to_numpy(dtype=np.float64),
+            tx_ts=tx_ts,
+            tx_row=np.arange(n_rows, dtype=np.int64),
+        )
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], labels: Any = None) -> "CompactGraph":
+        """Wrap already-built arrays (e.g. views onto shared memory) without copying."""
+        graph = cls.__new__(cls)
+        for name in cls.ARRAYS:
+            setattr(graph, name, arrays[name])
+        graph.labels = labels
+        return graph
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.indptr) - 1
+
+    @property
+    def n_edges(self) -> int:
+        return len(self.indices)
+
+    def successors(self, node: int) -> np.ndarray:
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def predecessors(self, node: int) -> np.ndarray:
+        return self.rindices[self.rindptr[node]:self.rindptr[node + 1]]
+
+    def rows_from(self, lo: int, hi: int) -> np.ndarray:
+        """Transaction rows sent by accounts with codes in [lo, hi)."""
+        return np.arange(self.edge_tx[self.indptr[lo]], self.edge_tx[self.indptr[hi]])
+
+    def rows_into(self, lo: int, hi: int) -> np.ndarray:
+        """Transaction rows received by accounts with codes in [lo, hi)."""
+        edges = self.redge[self.rindptr[lo]:self.rindptr[hi]]
+        return _expand_ranges(self.edge_tx[edges], self.edge_count[edges])
+
+    def rows_of(self, accounts: np.ndarray) -> np.ndarray:
+        """Sorted transaction rows sent or received by any of `accounts` (codes)."""
+        first_tx = self.edge_tx[self.indptr[accounts]]
+        sent = _expand_ranges(first_tx, self.edge_tx[self.indptr[accounts + 1]] - first_tx)
+        in_slots = _expand_ranges(self.rindptr[accounts], self.rindptr[accounts + 1] - self.rindptr[accounts])
+        edges = self.redge[in_slots]
+        received = _expand_ranges(self.edge_tx[edges], self.edge_count[edges])
+        return np.union1d(sent, received)
+
+    def mask(self, accounts: Set[str]) -> np.ndarray:
+        """Boolean per-code mask for a set of account IDs."""
+        if not accounts:
+            return np.zeros(self.n_nodes, dtype=bool)
+        return np.isin(self.labels, np.array(list(accounts), dtype=object))
+
+
+def _expand_ranges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Concatenation of arange(start, start + count) for every pair."""
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return offsets + np.arange(int(counts.sum()))
+
+
+def _code_dtype(n: int) -> type:
+    return np.int32 if n < np.iinfo(np.int32).max else np.int64
 
 # =============================================================================
-# Detection 2 — Smurfing: Fan-in AND Fan-out (PDF §2)
+# Run context — progress reporting and cooperative cancellation
 # =============================================================================
 
-def _sliding_window_check(
-    grp: pd.DataFrame,
-    counterpart_col: str,
-    window_hours: int,
-    threshold: int,
-) -> Tuple[bool, int, float, str]:
+class AnalysisCancelled(Exception):
+    """Raised inside a detector when its run has been cancelled."""
+
+
+class RunContext:
     """
-    Two-pointer sliding window. Returns (found, unique_counterparts, amount, window_start).
-    O(n) per group after sort.
+    Per-run progress and cancellation shared by the pipeline stages.
+
+    Stages report `done / total` as a fraction in [0, 1]; every report also
+    checks the cancel flag, so a cancelled run stops at the next report.
+    `timed(stage)` accumulates wall time per stage and `count(...)` work
+    counters; together they form the response's `timings` block.
+    `overrides` replaces Config constants (work budgets, RING_MODE) for this
+    run only: `config` is the active Config with them applied, read through
+    `setting` or activated for the whole run with use_config. `shares` pins
+    a detector to a (deadline, expansions) slice of a parent run's budget.
     """
-    grp = grp.reset_index(drop=True)
-    left = 0
-    cp_counts: Dict[str, int] = {}
-    window_amt = 0.0
 
-    for right in range(len(grp)):
-        cp  = grp.at[right, counterpart_col]
-        amt = grp.at[right, "amount"]
-        cp_counts[cp] = cp_counts.get(cp, 0) + 1
-        window_amt += amt
+    STAGES: Tuple[str, ...] = ("graph", "cycles", "smurfing", "shells", "scoring")
 
-        cutoff = grp.at[right, "timestamp"] - pd.Timedelta(hours=window_hours)
-        while grp.at[left, "timestamp"] < cutoff:
-            old_cp = grp.at[left, counterpart_col]
-            cp_counts[old_cp] -= 1
-            if cp_counts[old_cp] == 0:
-                del cp_counts[old_cp]
-            window_amt -= grp.at[left, "amount"]
-            left += 1
+    def __init__(self, overrides: Optional[Dict[str, Any]] = None) -> None:
+        self.progress: Dict[str, float] = {stage: 0.0 for stage in self.STAGES}
+        self._cancel = threading.Event()
+        self.timings: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.overrides: Dict[str, Any] = dict(overrides or {})
+        self.config = CFG.replace(**self.overrides)
+        self.truncated: Set[str] = set()
+        self.shares: Dict[str, Tuple[float, int]] = {}
 
-        if len(cp_counts) >= threshold:
-            return True, len(cp_counts), round(window_amt, 2), str(grp.at[left, "timestamp"])
+    def cancel(self) -> None:
+        self._cancel.set()
 
-    return False, 0, 0.0, ""
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
 
+    def check(self) -> None:
+        if self._cancel.is_set():
+            raise AnalysisCancelled()
 
-def detect_smurfing(
-    df: pd.DataFrame,
-    whitelist: Set[str],
-) -> Dict[str, Dict[str, Any]]:
+    def report(self, stage: str, done: float, total: float = 1.0) -> None:
+        self.check()
+        self.progress[stage] = round(min(done / total, 1.0), 4) if total else 1.0
+
+    @contextlib.contextmanager
+    def timed(self, stage: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+
+    def count(self, counters: Dict[str, int]) -> None:
+        with self._lock:
+            for key, value in counters.items():
+                self.counters[key] = self.counters.get(key, 0) + int(value)
+
+    def profile(self) -> Dict[str, Any]:
+        return {
+            "stages": {stage: round(sec, 6) for stage, sec in self.timings.items()},
+            "counters": dict(self.counters),
+        }
+
+    def setting(self, name: str) -> Any:
+        """Config constant `name` for this run — the override if one was given."""
+        return getattr(self.config, name)
+
+    def budget(self, detector: str) -> "WorkBudget":
+        if detector in self.shares:
+            deadline, limit = self.shares[detector]
+            return WorkBudget(0, limit, deadline)
+        return WorkBudget.from_config(self.config, detector)
+
+
+class WorkBudget:
     """
-    Fan-in:  ≥10 unique senders → 1 receiver within 72 h
-    Fan-out: 1 sender → ≥10 unique receivers within 72 h
-    Both checked; whitelisted accounts skipped.
+    Wall-time and expanded-node limit for one detector run. Searches call
+    `spend()` per expanded node and stop once it returns False; the clock is
+    read every 1024 expansions and at each `expired()` call. Deadlines are
+    wall-clock (time.time) so a budget can be handed to worker processes.
     """
-    df_t = df[["receiver_id", "sender_id", "amount", "timestamp"]].copy()
-    df_t["timestamp"] = pd.to_datetime(df_t["timestamp"], utc=True, errors="coerce")
-    dropped = df_t["timestamp"].isna().sum()
-    if dropped:
-        logger.warning("Smurfing: %d rows with unparseable timestamps dropped", dropped)
-    df_t = df_t.dropna(subset=["timestamp"]).sort_values("timestamp").reset_index(drop=True)
 
-    flagged: Dict[str, Dict[str, Any]] = {}
+    PREFIX: Dict[str, str] = {"cycles": "CYCLE", "shells": "SHELL"}
 
-    # Fan-in: focal = receiver, counterpart = sender
-    for receiver, grp in df_t.groupby("receiver_id", sort=False):
-        if str(receiver) in whitelist:
-            continue
-        found, cnt, amt, ws = _sliding_window_check(
-            grp, "sender_id", CFG.SMURF_WINDOW_HOURS, CFG.SMURF_MIN_COUNTERPARTIES
-        )
-        if found:
-            flagged[str(receiver)] = {"pattern": "fan_in", "fan_count": cnt, "amount": amt, "window_start": ws}
+    def __init__(self, seconds: float, max_expanded: int, deadline: Optional[float] = None) -> None:
+        if deadline is None:
+            deadline = time.time() + seconds if seconds > 0 else math.inf
+        self.deadline = deadline
+        self.max_expanded = max_expanded if max_expanded > 0 else sys.maxsize
+        self.expanded = 0
+        self.exhausted = False
 
-    # Fan-out: focal = sender, counterpart = receiver
-    for sender, grp in df_t.groupby("sender_id", sort=False):
-        if str(sender) in whitelist or str(sender) in flagged:
-            continue
-        found, cnt, amt, ws = _sliding_window_check(
-            grp, "receiver_id", CFG.SMURF_WINDOW_HOURS, CFG.SMURF_MIN_COUNTERPARTIES
-        )
-        if found:
-            flagged[str(sender)] = {"pattern": "fan_out", "fan_count": cnt, "amount": amt, "window_start": ws}
+    @classmethod
+    def from_config(cls, cfg: Any, detector: str) -> "WorkBudget":
+        prefix = cls.PREFIX[detector]
+        return cls(getattr(cfg, f"{prefix}_MAX_SECONDS"), getattr(cfg, f"{prefix}_MAX_EXPANDED"))
 
-    logger.info("Smurfing: %d accounts flagged", len(flagged))
-    return flagged
+    def spend(self) -> bool:
+        self.expanded += 1
+        if self.expanded > self.max_expanded or (not self.expanded & 0x3FF and time.time() > self.deadline):
+            self.exhausted = True
+        return not self.exhausted
+
+    def expired(self) -> bool:
+        if not self.exhausted and time.time() > self.deadline:
+            self.exhausted = True
+        return self.exhausted
+
+    def share(self, parts: int) -> Tuple[float, int]:
+        """(deadline, expansions) for one of `parts` slices of this budget."""
+        limit = 0 if self.max_expanded == sys.maxsize else max(1, self.max_expanded // max(1, parts))
+        return self.deadline, limit
+
+
+def _report(ctx: Any, stage: str, done: float, total: float = 1.0) -> None:
+    if ctx is not None:
+        ctx.report(stage, done, total)
+
+
+def _timed(ctx: Any, stage: str) -> ContextManager[None]:
+    return ctx.timed(stage) if ctx is not None else contextlib.nullcontext()
+
+
+def _count(ctx: Any, counters: Dict[str, int]) -> None:
+    if ctx is not None:
+        ctx.count(counters)
+
+
+def _tally(stats: Optional[Dict[str, int]], key: str, n: int) -> None:
+    if stats is not None:
+        stats[key] = stats.get(key, 0) + n
+
+
+def _budget(ctx: Any, detector: str) -> WorkBudget:
+    return ctx.budget(detector) if ctx is not None else WorkBudget.from_config(CFG, detector)
+
+
+def _mark_truncated(ctx: Any, detector: str) -> None:
+    logger.warning("%s: work budget exhausted — returning partial results", detector.capitalize())
+    if ctx is not None:
+        ctx.truncated.add(detector)
 
 # =============================================================================
-# Detection 3 — Layered Shell Networks (PDF §3)
+# Metrics — Prometheus text exposition for GET /metrics
 # =============================================================================
 
-def detect_layered_shells(
-    G: nx.MultiDiGraph,
-    count_map: Dict[str, int],
-    whitelist: Set[str],
-) -> List[List[str]]:
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in labels) + "}"
+
+
+class MetricsRegistry:
     """
-    Chains of 3+ hops where INTERIOR nodes have ≤ SHELL_MAX_TX_PER_NODE transactions.
-    PDF: 'chains of 3+ hops where intermediate accounts have only 2–3 total transactions'.
-    Chain head and tail are not constrained.
+    Counters, gauges and histograms in Prometheus text format (version 0.0.4).
+    Metrics are declared once with `describe`; samples are keyed by label set.
     """
 
-    def is_shell_interior(node: str) -> bool:
-        return (
-            node not in whitelist
-            and count_map.get(str(node), 0) <= CFG.SHELL_MAX_TX_PER_NODE
-        )
+    def __init__(self, buckets: Tuple[float, ...]) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._meta: "OrderedDict[str, Tuple[str, str]]" = OrderedDict()
+        self._values: Dict[str, Dict[Tuple[Tuple[str, str], ...], Any]] = {}
+        self._lock = threading.Lock()
 
-    candidate_nodes = {n for n in G.nodes() if str(n) not in whitelist}
-    sub_G: nx.DiGraph = nx.DiGraph(G.subgraph(candidate_nodes))
+    def describe(self, name: str, kind: str, help_text: str) -> None:
+        self._meta[name] = (kind, help_text)
+        self._values.setdefault(name, {})
 
-    chains: List[List[str]] = []
-    seen: Set[Tuple[str, ...]] = set()
+    def inc(self, name: str, value: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._values[name]
+            series[key] = series.get(key, 0.0) + value
 
-    def dfs(node: str, path: List[str]) -> None:
-        if len(path) >= CFG.SHELL_MIN_HOPS:
-            interior = path[1:-1]
-            if interior and all(is_shell_interior(n) for n in interior):
-                key = tuple(path)
-                if key not in seen:
-                    seen.add(key)
-                    chains.append(list(path))
+    def set(self, name: str, value: float, **labels: str) -> None:
+        with self._lock:
+            self._values[name][tuple(sorted(labels.items()))] = float(value)
 
-        if len(path) < CFG.SHELL_MAX_DEPTH:
-            for succ in sub_G.successors(node):
-                if succ not in path:
-                    path.append(succ)
-                    dfs(succ, path)
-                    path.pop()
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._values[name]
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = [[0] * len(self.buckets), 0.0, 0]
+            i = bisect.bisect_left(self.buckets, value)
+            if i < len(self.buckets):       # above the last bound: only +Inf
+                hist[0][i] += 1
+            hist[1] += value
+            hist[2] += 1
 
-    # Start from nodes with no incoming edges (chain heads)
-    chain_heads = [n for n in sub_G if sub_G.in_degree(n) == 0]
-    if not chain_heads:
-        chain_heads = list(sub_G.nodes())
+    def render(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            for name, (kind, help_text) in self._meta.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for key, value in self._values[name].items():
+                    if kind != "histogram":
+                        lines.append(f"{name}{_format_labels(key)} {value:g}")
+                        continue
+                    counts, total, n = value
+                    cumulative = 0
+                    for bound, count in zip(self.buckets, counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(key + (('le', f'{bound:g}'),))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(key + (('le', '+Inf'),))} {n}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {total:g}")
+                    lines.append(f"{name}_count{_format_labels(key)} {n}")
+        return "\n".join(lines) + "\n"
 
-    for head in chain_heads:
-        dfs(head, [head])
 
-    logger.info("Shell chains: %d found", len(chains))
-    return chains
+_metrics = MetricsRegistry(CFG.METRICS_BUCKETS)
+_metrics.describe("muling_analysis_seconds", "histogram", "Wall time of one analysis, by mode (full or append).")
+_metrics.describe("muling_stage_seconds", "histogram", "Wall time of one analysis pipeline stage.")
+_metrics.describe("muling_analyses_total", "counter", "Analyses completed, by mode.")
+_metrics.describe("muling_detector_work_total", "counter", "Detector work units (paths explored, windows scanned, ...).")
+_metrics.describe("muling_graph_nodes", "gauge", "Accounts in the most recently analysed graph.")
+_metrics.describe("muling_graph_edges", "gauge", "Distinct sender-receiver edges in the most recently analysed graph.")
+_metrics.describe("muling_analysis_cache_total", "counter", "Analysis cache lookups, by result (hit or miss).")
+_metrics.describe("muling_http_request_seconds", "histogram", "HTTP request latency, by method, route and status.")
+
+
+def _record_analysis(mode: str, profile: Dict[str, Any]) -> None:
+    """Export one analysis' `timings` block to the metrics registry."""
+    stages = dict(profile["stages"])
+    _metrics.observe("muling_analysis_seconds", stages.pop("total", 0.0), mode=mode)
+    _metrics.inc("muling_analyses_total", mode=mode)
+    for stage, seconds in stages.items():
+        _metrics.observe("muling_stage_seconds", seconds, stage=stage)
+    counters = dict(profile["counters"])
+    if "nodes" in counters:
+        _metrics.set("muling_graph_nodes", counters.pop("nodes"))
+        _metrics.set("muling_graph_edges", counters.pop("edges", 0))
+    for kind, value in counters.items():
+        _metrics.inc("muling_detector_work_total", value, kind=kind)
 
 # =============================================================================
-# Pattern label builder
+# Detection 1 — Circular Routing (PDF §1)
 # =============================================================================
 
-def _detected_patterns(
-    in_cycle: bool,
-    cycle_len: int,
-    smurf_info: Dict[str, Any],
-    in_shell: bool,
-    volume: float,
-) -> List[str]:
+def _trim_acyclic(graph: CompactGraph) -> np.ndarray:
     """
-    Returns descriptive string labels.
-    PDF example: ["cycle_length_3", "high_velocity"].
+    Alive mask after iteratively stripping nodes with in-degree or out-degree
+    zero (self-loops ignored). Such nodes cannot lie on any cycle; removing one
+    may expose its neighbours, so a work queue propagates the trim in O(V + E).
     """
-    patterns = []
-    if in_cycle and cycle_len:
-        patterns.append(f"cycle_length_{cycle_len}")
-    if smurf_info:
-        pat = smurf_info.get("pattern", "fan_in")
-        patterns.append("high_velocity" if pat == "fan_in" else "fan_out")
-    if in_shell:
-        patterns.append("layered_shell")
-    if volume > 500_000:
-        patterns.append("high_volume")
-    return sorted(patterns)
+    n = graph.n_nodes
+    real = graph.edge_src != graph.indices
+    in_deg = np.bincount(graph.indices[real], minlength=n)
+    out_deg = np.bincount(graph.edge_src[real], minlength=n)
+    alive = np.ones(n, dtype=bool)
 
-# =============================================================================
-# Core Analysis Engine
-# =============================================================================
+    queue = deque(np.flatnonzero((in_deg == 0) | (out_deg == 0)).tolist())
+    in_deg, out_deg = in_deg.tolist(), out_deg.tolist()
+    indptr, indices = graph.indptr, graph.indices
+    rindptr, rindices = graph.rindptr, graph.rindices
 
-def _validate(df: pd.DataFrame) -> None:
-    missing = CFG.REQUIRED_COLUMNS - set(df.columns)
-    if missing:
-        raise ValueError(f"Missing required columns: {sorted(missing)}")
-    if df.empty:
-        raise ValueError("CSV contains no data rows.")
+    while queue:
+        node = queue.popleft()
+        if not alive[node]:
+            continue
+        alive[node] = False
+        for succ in indices[indptr[node]:indptr[node + 1]].tolist():
+            if alive[succ] and succ != node:
+                in_deg[succ] -= 1
+                if in_deg[succ] == 0:
+                    queue.append(succ)
+        for pred in rindices[rindptr[node]:rindptr[node + 1]].tolist():
+            if alive[pred] and pred != node:
+                out_deg[pred] -= 1
+                if out_deg[pred] == 0:
+                    queue.append(pred)
 
+    return alive
 
-def run_full_analysis(df: pd.DataFrame) -> Dict[str, Any]:
-    _validate(df)
-    start = time.perf_counter()
 
-    # ── Pre-compute per-account volume & tx-count maps ────────────────────────
-    in_vol  = df.groupby("receiver_id")["amount"].sum()
-    out_vol = df.groupby("sender_id")["amount"].sum()
-    vol_map: Dict[str, float] = in_vol.add(out_vol, fill_value=0).to_dict()
+def _strongly_connected_components(graph: CompactGraph, alive: np.ndarray) -> List[List[int]]:
+    """Iterative Tarjan over the CSR, restricted to `alive` nodes."""
+    indptr, indices = graph.indptr, graph.indices
+    index: Dict[int, int] = {}
+    low: Dict[int, int] = {}
+    on_stack: Set[int] = set()
+    stack: List[int] = []
+    components: List[List[int]] = []
+    counter = 0
 
-    in_cnt  = df.groupby("receiver_id")["transaction_id"].count()
-    out_cnt = df.groupby("sender_id")["transaction_id"].count()
-    cnt_map: Dict[str, int] = in_cnt.add(out_cnt, fill_value=0).astype(int).to_dict()
+    alive_l = alive.tolist()
+    for root in np.flatnonzero(alive).tolist():
+        if root in index:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(indices[indptr[root]:indptr[root + 1]].tolist()))]
 
-    whitelist = _build_merchant_whitelist(cnt_map)
-    logger.info("Merchant whitelist: %d accounts", len(whitelist))
+        while work:
+            node, it = work[-1]
+            advanced = False
+            for succ in it:
+                if not alive_l[succ]:
+                    continue
+                if succ not in index:
+                    index[succ] = low[succ] = counter
+                    counter += 1
+                    stack.append(succ)
+                    on_stack.add(succ)
+                    work.append((succ, iter(indices[indptr[succ]:indptr[succ + 1]].tolist())))
+                    advanced = True
+                    break
+                if succ in on_stack:
+                    low[node] = min(low[node], index[succ])
+            if advanced:
+                continue
 
-    # ── Build graph ───────────────────────────────────────────────────────────
-    G = nx.MultiDiGraph()
-    G.add_edges_from([
-        (str(r.sender_id), str(r.receiver_id), {"amount": r.amount})
-        for r in df.itertuples()
-    ])
-    total_accounts = G.number_of_nodes()
-    logger.info("Graph: %d nodes, %d edges", total_accounts, G.number_of_edges())
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
 
-    # ── Run detectors in parallel ─────────────────────────────────────────────
-    with concurrent.futures.ThreadPoolExecutor(max_workers=3) as pool:
-        f_cycles = pool.submit(detect_circular_routing, G)
-        f_smurf  = pool.submit(detect_smurfing, df, whitelist)
-        f_shells = pool.submit(detect_layered_shells, G, cnt_map, whitelist)
-        cycles       = f_cycles.result()
-        smurf_map    = f_smurf.result()
-        shell_chains = f_shells.result()
-
-    # ── Assign RING_xxx IDs ───────────────────────────────────────────────────
-    ring_counter = 0
-    fraud_rings_raw: List[Dict[str, Any]] = []
-    acct_to_ring: Dict[str, str] = {}       # first ring assignment wins
-    acct_to_cycle_len: Dict[str, int] = {}
-
-    for cycle in cycles:
-        rid = _ring_id(ring_counter); ring_counter += 1
-        fraud_rings_raw.append({
-            "ring_id": rid, "member_accounts": list(cycle),
-            "pattern_type": "cycle",
-        })
-        for acct in cycle:
-            acct_to_ring.setdefault(acct, rid)
-            acct_to_cycle_len[acct] = len(cycle)
-
-    for chain in shell_chains:
-        rid = _ring_id(ring_counter); ring_counter += 1
-        fraud_rings_raw.append({
-            "ring_id": rid, "member_accounts": list(chain),
-            "pattern_type": "layered_shells",
-        })
-        for acct in chain[1:-1]:    # interior only
-            acct_to_ring.setdefault(acct, rid)
-
-    for acct in smurf_map:
-        if acct not in acct_to_ring:
-            rid = _ring_id(ring_counter); ring_counter += 1
-            fraud_rings_raw.append({
-                "ring_id": rid, "member_accounts": [acct],
-                "pattern_type": "smurfing",
-            })
-            acct_to_ring[acct] = rid
+    return components
 
-    # ── Score each flagged account ────────────────────────────────────────────
-    cycle_nodes = set(acct_to_cycle_len.keys())
-    shell_nodes = {n for c in shell_chains if len(c) > 2 for n in c[1:-1]}
-    all_flagged = cycle_nodes | set(smurf_map.keys()) | shell_nodes
-
-    score_map: Dict[str, float] = {}
-    suspicious_out: List[Dict[str, Any]] = []
-
-    for acct in all_flagged:
-        in_cycle = acct in cycle_nodes
-        in_smurf = acct in smurf_map
-        in_shell = acct in shell_nodes
-        vol      = vol_map.get(acct, 0.0)
-
-        score = round(min(
-            CFG.W_CYCLE  * (100.0 if in_cycle else 0.0) +
-            CFG.W_SMURF  * (100.0 if in_smurf else 0.0) +
-            CFG.W_SHELL  * (100.0 if in_shell else 0.0) +
-            CFG.W_VOLUME * _log_volume_score(vol, CFG.VOLUME_LOG_SCALE) * 100.0,
-            100.0,
-        ), 2)
-
-        score_map[acct] = score
-
-        suspicious_out.append({
-            "account_id":        acct,
-            "suspicion_score":   score,
-            "detected_patterns": _detected_patterns(
-                in_cycle, acct_to_cycle_len.get(acct, 0),
-                smurf_map.get(acct, {}), in_shell, vol,
-            ),
-            "ring_id": acct_to_ring.get(acct, "NONE"),
-        })
 
-    # Sorted descending — PDF requirement
-    suspicious_out.sort(key=lambda x: x["suspicion_score"], reverse=True)
+class _ComponentAdjacency:
+    """Successor/predecessor lists restricted to one SCC, filled on first use."""
 
-    # ── Attach risk_score to each ring ────────────────────────────────────────
-    fraud_rings_out: List[Dict[str, Any]] = []
-    for ring in fraud_rings_raw:
-        members = ring["member_accounts"]
-        avg_score = (
-            round(sum(score_map.get(m, 0.0) for m in members) / len(members), 1)
-            if members else 0.0
-        )
-        fraud_rings_out.append({
-            "ring_id":         ring["ring_id"],
-            "member_accounts": members,
-            "pattern_type":    ring["pattern_type"],
-            "risk_score":      avg_score,
-        })
+    def __init__(self, graph: CompactGraph, component: List[int]) -> None:
+        self.graph = graph
+        self.order = sorted(component)
+        self.member = np.zeros(graph.n_nodes, dtype=bool)
+        self.member[self.order] = True
+        self._succ: Dict[int, List[int]] = {}
+        self._pred: Dict[int, List[int]] = {}
+        self._out: Dict[int, List[Tuple[int, int]]] = {}
+        self._times: Dict[int, List[int]] = {}
 
-    elapsed = round(time.perf_counter() - start, 4)
-    logger.info("Done %.4fs — %d suspicious, %d rings", elapsed, len(suspicious_out), len(fraud_rings_out))
+    def successors(self, n: int) -> List[int]:
+        succ = self._succ.get(n)
+        if succ is None:
+            nbrs = self.graph.successors(n)
+            succ = self._succ[n] = nbrs[self.member[nbrs]].tolist()
+        return succ
 
-    return {
-        "suspicious_accounts": suspicious_out,
-        "fraud_rings":         fraud_rings_out,
-        "summary": {
-            "total_accounts_analyzed":     total_accounts,
-            "suspicious_accounts_flagged": len(suspicious_out),
-            "fraud_rings_detected":        len(fraud_rings_out),
-            "processing_time_seconds":     elapsed,
-        },
-    }
+    def predecessors(self, n: int) -> List[int]:
+        pred = self._pred.get(n)
+        if pred is None:
+            nbrs = self.graph.predecessors(n)
+            pred = self._pred[n] = nbrs[self.member[nbrs]].tolist()
+        return pred
 
-# =============================================================================
-# FastAPI
-# =============================================================================
+    def out_edges(self, n: int) -> List[Tuple[int, int]]:
+        """(successor, edge id) pairs of `n` inside the SCC."""
+        out = self._out.get(n)
+        if out is None:
+            lo = int(self.graph.indptr[n])
+            nbrs = self.graph.successors(n)
+            keep = np.flatnonzero(self.member[nbrs])
+            out = self._out[n] = list(zip(nbrs[keep].tolist(), (keep + lo).tolist()))
+        return out
 
-app = FastAPI(title="RIFT 2026 — Money Muling Detection Engine")
+    def times(self, e: int) -> List[int]:
+        """Distinct valid timestamps of edge `e`, ascending."""
+        times = self._times.get(e)
+        if times is None:
+            ts = self.graph.tx_ts[self.graph.edge_tx[e]:self.graph.edge_tx[e + 1]]
+            times = self._times[e] = np.unique(ts[ts != _NAT]).tolist()
+        return times
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
-_state: Dict[str, Any] = {"df": None}
+def _bounded_cycles_in_component(
+    graph: CompactGraph,
+    component: List[int],
+    min_len: int,
+    max_len: int,
+    tick: Optional[Callable[[int], None]] = None,
+    starts: Optional[Tuple[int, int]] = None,
+    adjacency: Optional[_ComponentAdjacency] = None,
+    stats: Optional[Dict[str, int]] = None,
+    budget: Optional[WorkBudget] = None,
+) -> List[List[int]]:
+    """
+    Enumerate simple cycles of length min_len..max_len inside one SCC.
 
+    Each cycle is rooted at its smallest node: the search from start `s` only
+    visits nodes ranked above `s`, so every cycle is produced exactly once and
+    already in canonical rotation. A reverse BFS from `s` bounds how far each
+    node is from closing the loop; branches that cannot return to `s` within
+    max_len hops are never entered. `tick(i)` is called before the i-th start;
+    `starts=(lo, hi)` restricts the search to that slice of sorted start nodes
+    so one large component can be split across workers, which pass the same
+    `adjacency` for every slice of a component. Partial paths explored are
+    tallied into `stats`; once `budget` is exhausted the search stops and the
+    cycles found so far are returned.
+    """
+    if adjacency is None:
+        adjacency = _ComponentAdjacency(graph, component)
+    order = adjacency.order
+    successors, predecessors = adjacency.successors, adjacency.predecessors
 
-@app.get("/")
-async def root() -> Dict[str, str]:
-    return {"message": "Welcome to the Money Muling Detection Engine! POST a CSV to /upload and then GET /analysis."}
+    cycles: List[List[int]] = []
+    explored = 0
 
-@app.get("/health")
-async def health() -> Dict[str, str]:
-    return {"status": "ok"}
+    lo, hi = starts if starts is not None else (0, len(order))
+    for i, s in enumerate(order[lo:hi]):
+        if budget is not None and budget.expired():
+            break
+        if tick is not None:
+            tick(i)
+        # dist[v] = fewest hops from v back to s through nodes ranked above s
+        dist = {s: 0}
+        frontier = [s]
+        for d in range(1, max_len):
+            nxt = []
+            for v in frontier:
+                for p in predecessors(v):
+                    if p > s and p not in dist:
+                        dist[p] = d
+                        nxt.append(p)
+            if not nxt:
+                break
+            frontier = nxt
+        if len(dist) < min_len:
+            continue
 
+        path = [s]
+        on_path = {s}
 
-@app.post("/upload", response_model=UploadResponse)
-async def upload(file: UploadFile = File(...)) -> UploadResponse:
-    if not file.filename.lower().endswith(".csv"):
-        raise HTTPException(status_code=415, detail="Only CSV files accepted.")
-    try:
-        content = await file.read()
-        df = pd.read_csv(io.BytesIO(content))
-    except Exception as exc:
-        raise HTTPException(status_code=400, detail=f"Cannot parse CSV: {exc}") from exc
+        def extend(v: int) -> None:
+            nonlocal explored
+            if budget is not None and not budget.spend():
+                return
+            explored += 1
+            depth = len(path)
+            for w in successors(v):
+                if w == s:
+                    if depth >= min_len:
+                        cycles.append(list(path))
+                elif w in dist and w not in on_path and depth + dist[w] <= max_len:
+                    path.append(w)
+                    on_path.add(w)
+                    extend(w)
+                    on_path.discard(w)
+                    path.pop()
 
-    for col in CFG.ID_COLUMNS:
-        if col in df.columns:
-            df[col] = df[col].astype(str).str.strip()
+        extend(s)
 
-    missing = CFG.REQUIRED_COLUMNS - set(df.columns)
-    if missing:
-        raise HTTPException(status_code=422, detail=f"Missing columns: {sorted(missing)}")
+    _tally(stats, "cycle_starts", hi - lo)
+    _tally(stats, "cycle_paths_explored", explored)
+    return cycles
 
-    _state["df"] = df
-    logger.info("Loaded '%s' — %d rows", file.filename, len(df))
-    return UploadResponse(status="ok", transactions_loaded=len(df))
 
+def _next_hop(
+    early: List[Tuple[int, int]], late: List[Tuple[int, int]], times: List[int], window: int,
+) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+    """
+    Advance the timing states of a path from its root over an edge with `times`.
 
-@app.get("/analysis")
-async def analysis(min_score: float = 0.0) -> JSONResponse:
-    if _state["df"] is None:
-        raise HTTPException(status_code=400, detail="No data — POST a CSV to /upload first.")
-    if not (0.0 <= min_score <= 100.0):
-        raise HTTPException(status_code=422, detail="min_score must be 0–100.")
-    try:
-        results = run_full_analysis(_state["df"])
-    except ValueError as exc:
-        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    A time-respecting loop read from its root splits into a later run of hops
+    (the root's first hop onwards) and an earlier run that closes the loop and
+    may be empty. `early` holds (first hop time, arrival) while the path is
+    still in the later run; the hop takes the edge's first transaction after
+    the arrival — arriving earliest never hurts — within `window` of the first
+    hop. The hop may instead open the earlier run: its earliest transaction
+    no more than `window` before the arrival and before the first hop starts
+    a `late` state (first hop time, arrival), which later hops advance below
+    that first hop time. Dominated states are dropped: a later first hop and
+    an earlier arrival are both better.
+    """
+    next_early: List[Tuple[int, int]] = []
+    opened: List[Tuple[int, int]] = []
+    for first, arrival in early:
+        j = bisect.bisect_right(times, arrival)
+        if j < len(times) and times[j] - first <= window:
+            if next_early and next_early[-1][1] == times[j]:
+                next_early[-1] = (first, times[j])
+            else:
+                next_early.append((first, times[j]))
+        j = bisect.bisect_left(times, arrival - window)
+        if j < len(times) and times[j] < first:
+            opened.append((first, times[j]))
+    for first, arrival in late:
+        j = bisect.bisect_right(times, arrival)
+        if j < len(times) and times[j] < first:
+            opened.append((first, times[j]))
 
-    results["suspicious_accounts"] = [
-        a for a in results["suspicious_accounts"] if a["suspicion_score"] >= min_score
-    ]
-    return JSONResponse(content=results)
+    next_late: List[Tuple[int, int]] = []
+    for first, arrival in sorted(opened, key=lambda st: (st[1], -st[0])):
+        if not next_late or first > next_late[-1][0]:
+            next_late.append((first, arrival))
+    return next_early, next_late
 
 
-@app.get("/download")
-async def download_json(min_score: float = 0.0) -> JSONResponse:
+def _temporal_cycles_in_component(
+    graph: CompactGraph,
+    component: List[int],
+    min_len: int,
+    max_len: int,
+    window: int,
+    tick: Optional[Callable[[int], None]] = None,
+    starts: Optional[Tuple[int, int]] = None,
+    adjacency: Optional[_ComponentAdjacency] = None,
+    stats: Optional[Dict[str, int]] = None,
+    budget: Optional[WorkBudget] = None,
+) -> List[List[int]]:
     """
-    PDF mandates a Download JSON button on the UI — wire it to this endpoint.
-    Returns the analysis as a downloadable .json file attachment.
+    Enumerate time-respecting cycles of length min_len..max_len inside one SCC.
+
+    A cycle qualifies when its hops, starting from some member, can be matched
+    to transactions with strictly increasing timestamps, the last at most
+    `window` ns after the first. The walk is the structural one — rooted at
+    the smallest node, bounded by the same reverse BFS — but each partial path
+    carries its timing states (see _next_hop), and an edge that leaves none is
+    never entered; such pruned edges are tallied as cycle_hops_pruned. Other
+    arguments as for _bounded_cycles_in_component.
     """
-    if _state["df"] is None:
-        raise HTTPException(status_code=400, detail="No data loaded.")
-    try:
-        results = run_full_analysis(_state["df"])
-    except ValueError as exc:
-        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    if adjacency is None:
+        adjacency = _ComponentAdjacency(graph, component)
+    order = adjacency.order
+    out_edges, predecessors, times = adjacency.out_edges, adjacency.predecessors, adjacency.times
 
-    results["suspicious_accounts"] = [
-        a for a in results["suspicious_accounts"] if a["suspicion_score"] >= min_score
-    ]
-    return JSONResponse(
-        content=results,
-        headers={"Content-Disposition": "attachment; filename=muling_analysis.json"},
-    )
+    cycles: List[List[int]] = []
+    explored = pruned = 0
+
+    lo, hi = starts if starts is not None else (0, len(order))
+    for i, s in enumerate(order[lo:hi]):
+        if budget is not None and budget.expired():
+            break
+        if tick is not None:
+            tick(i)
+        # dist[v] = fewest hops from v back to s through nodes ranked above s
+        dist = {s: 0}
+        frontier = [s]
+        for d in range(1, max_len):
+            nxt = []
+            for v in frontier:
+                for p in predecessors(v):
+                    if p > s and p not in dist:
+                        dist[p] = d
+                        nxt.append(p)
+            if not nxt:
+                break
+            frontier = nxt
+        if len(dist) < min_len:
+            continue
+
+        path = [s]
+        on_path = {s}
+
+        def extend(v: int, early: List[Tuple[int, int]], late: List[Tuple[int, int]]) -> None:
+            nonlocal explored, pruned
+            if budget is not None and not budget.spend():
+                return
+            explored += 1
+            depth = len(path)
+            for w, e in out_edges(v):
+                if w == s:
+                    if depth >= min_len and any(_next_hop(early, late, times(e), window)):
+                        cycles.append(list(path))
+                elif w in dist and w not in on_path and depth + dist[w] <= max_len:
+                    if depth == 1:
+                        nxt_early, nxt_late = [(t, t) for t in times(e)], []
+                    else:
+                        nxt_early, nxt_late = _next_hop(early, late, times(e), window)
+                    if not nxt_early and not nxt_late:
+                        pruned += 1
+                        continue
+                    path.append(w)
+                    on_path.add(w)
+                    extend(w, nxt_early, nxt_late)
+                    on_path.discard(w)
+                    path.pop()
+
+        extend(s, [], [])
+
+    _tally(stats, "cycle_starts", hi - lo)
+    _tally(stats, "cycle_paths_explored", explored)
+    _tally(stats, "cycle_hops_pruned", pruned)
+    return cycles
+
+
+def _cycles_in_component(graph: CompactGraph, component: List[int], **kwargs: Any) -> List[List[int]]:
+    """Cycles of one SCC with the kernel selected by CYCLE_MODE."""
+    if CFG.CYCLE_MODE == "temporal":
+        window = int(pd.Timedelta(hours=CFG.CYCLE_WINDOW_HOURS).value)
+        return _temporal_cycles_in_component(
+            graph, component, CFG.CYCLE_MIN_LEN, CFG.CYCLE_MAX_LEN, window, **kwargs,
+        )
+    return _bounded_cycles_in_component(graph, component, CFG.CYCLE_MIN_LEN, CFG.CYCLE_MAX_LEN, **kwargs)
+
+
+def _cycle_components(graph: CompactGraph) -> List[List[int]]:
+    """SCCs of the trimmed graph large enough to hold a CYCLE_MIN_LEN cycle."""
+    alive = _trim_acyclic(graph)
+    return [
+        sorted(c) for c in _strongly_connected_components(graph, alive) if len(c) >= CFG.CYCLE_MIN_LEN
+    ]
+
+
+def detect_circular_routing(graph: CompactGraph, ctx: Any = None) -> List[List[int]]:
+    """
+    Simple cycles of length 3–5 (PDF: 'Detect cycles of length 3 to 5').
+
+    Nodes that cannot sit on a cycle are trimmed first, the remainder is split
+    into strongly connected components (a cycle never crosses components), and
+    each component is searched with a depth bound of CYCLE_MAX_LEN — paths
+    longer than that are never explored. Cycles are returned as account codes
+    in canonical rotation (smallest account first), sorted. The search stops
+    early once its CYCLE_MAX_SECONDS / CYCLE_MAX_EXPANDED budget is spent.
+    With CYCLE_MODE = "temporal" only loops whose transfers follow each other
+    in time within CYCLE_WINDOW_HOURS count (_temporal_cycles_in_component).
+    """
+    with _timed(ctx, "cycles"):
+        components = _cycle_components(graph)
+        total = sum(len(c) for c in components)
+        _report(ctx, "cycles", 0, total)
+
+        cycles: List[List[int]] = []
+        stats: Dict[str, int] = {"cycle_components": len(components)}
+        budget = _budget(ctx, "cycles")
+        searched = 0
+
+        def tick(i: int) -> None:
+            _report(ctx, "cycles", searched + i, total)
+
+        for component in components:
+            cycles.extend(_cycles_in_component(
+                graph, component, tick=tick if ctx is not None else None, stats=stats, budget=budget,
+            ))
+            searched += len(component)
+            if budget.exhausted:
+                _mark_truncated(ctx, "cycles")
+                break
+        cycles.sort()
+        stats["cycles_kept"] = len(cycles)
+        _count(ctx, stats)
+        _report(ctx, "cycles", 1)
+
+    logger.info("Cycles: %d unique rings found", len(cycles))
+    return cycles
+
+# =============================================================================
+# Detection 2 — Smurfing: Fan-in AND Fan-out (PDF §2)
+# =============================================================================
+
+def _window_distinct_counts(
+    group: np.ndarray,
+    counterpart: np.ndarray,
+    ts: np.ndarray,
+    window_ns: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Trailing-window distinct-counterpart counts for rows sorted by (group, ts).
+
+    For every row i returns left[i] — the first row of the same group with
+    ts >= ts[i] - window — and distinct[i], the number of unique counterparts
+    in rows left[i]..i. Fully columnar:
+
+    * window bounds come from one searchsorted over a (group, time-rank) key;
+    * a row j is a repeat inside window i iff its previous same-counterpart
+      row prev[j] lies in [left[i], i]. Because `left` is non-decreasing, the
+      windows in which j is a repeat form the contiguous range
+      [j, searchsorted(left, prev[j], 'right')), so repeats per window fall out
+      of a difference array and a cumsum.
+    """
+    n = len(group)
+    idx = np.arange(n, dtype=np.int64)
+    group = group.astype(np.int64, copy=False)
+
+    uniq_ts, ts_rank = np.unique(ts, return_inverse=True)
+    cutoff_rank = np.searchsorted(uniq_ts, ts - window_ns, side="left")
+    span = len(uniq_ts) + 1
+    left = np.searchsorted(group * span + ts_rank, group * span + cutoff_rank, side="left")
+
+    order = np.lexsort((idx, counterpart, group))
+    g_o, c_o = group[order], counterpart[order]
+    repeat = (g_o[1:] == g_o[:-1]) & (c_o[1:] == c_o[:-1])
+    prev = np.full(n, -1, dtype=np.int64)
+    prev[order[1:][repeat]] = order[:-1][repeat]
+
+    j = np.flatnonzero(prev >= 0)
+    hi = np.searchsorted(left, prev[j], side="right")
+    live = hi > j
+    diff = np.bincount(j[live], minlength=n + 1) - np.bincount(hi[live], minlength=n + 1)
+    repeats = np.cumsum(diff)[:n]
+
+    return left, idx - left + 1 - repeats
+
+
+def _smurf_rows(
+    graph: CompactGraph,
+    whitelist: Optional[np.ndarray] = None,
+    accounts: Optional[Tuple[int, int]] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (group, counterpart, row) of every timestamped fan-in and fan-out row,
+    stacked and sorted by (direction, focal account, timestamp, input row);
+    group = direction * n_nodes + focal account, direction 0 = fan-in.
+    Rows of whitelisted focal accounts are left out when a mask is given.
+    """
+    n_nodes = graph.n_nodes
+    lo, hi = accounts if accounts is not None else (0, n_nodes)
+    in_rows, out_rows = graph.rows_into(lo, hi), graph.rows_from(lo, hi)
+
+    row = np.concatenate([in_rows, out_rows])
+    direction = np.repeat(np.array([0, 1], dtype=np.int64), [len(in_rows), len(out_rows)])
+    focal = np.concatenate([graph.tx_dst[in_rows], graph.tx_src[out_rows]]).astype(np.int64)
+    counterpart = np.concatenate([graph.tx_src[in_rows], graph.tx_dst[out_rows]]).astype(np.int64)
+
+    keep = graph.tx_ts[row] != _NAT
+    if whitelist is not None:
+        keep &= ~whitelist[focal]
+    row, direction, focal, counterpart = row[keep], direction[keep], focal[keep], counterpart[keep]
+
+    group = direction * n_nodes + focal
+    order = np.lexsort((graph.tx_row[row], graph.tx_ts[row], group))
+    return group[order], counterpart[order], row[order]
+
+
+def _smurf_hits(
+    graph: CompactGraph,
+    group: np.ndarray,
+    row: np.ndarray,
+    left: np.ndarray,
+    distinct: np.ndarray,
+    min_counterparties: int,
+    whitelist: Optional[np.ndarray] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Hit arrays from the window counts of _smurf_rows output: each focal
+    account's first window with ≥ `min_counterparties` counterparts. Windows
+    never span groups, so masking `whitelist`ed accounts here gives the same
+    hits as leaving their rows out before counting.
+    """
+    n_nodes = graph.n_nodes
+    reached = distinct >= min_counterparties
+    if whitelist is not None:
+        reached &= ~whitelist[group % n_nodes]
+    hits = np.flatnonzero(reached)
+    _, first = np.unique(group[hits], return_index=True)
+    hit_rows = hits[first]
+    hit_left = left[hit_rows]
+    group_start = np.searchsorted(group, group[hit_rows], side="left")
+
+    ts_sorted = graph.tx_ts[row]
+    amounts_sorted = graph.tx_amount[row]
+    amounts_sorted = np.append(np.where(np.isnan(amounts_sorted), 0.0, amounts_sorted), 0.0)
+    bounds = np.column_stack([hit_left, hit_rows + 1]).ravel()
+    window_amounts = np.add.reduceat(amounts_sorted, bounds)[::2] if len(bounds) else np.empty(0)
+
+    return {
+        "account": group[hit_rows] % n_nodes,
+        "direction": group[hit_rows] // n_nodes,
+        "fan_count": distinct[hit_rows],
+        "amount": window_amounts,
+        "window_start": ts_sorted[hit_left],
+        "first_ts": ts_sorted[group_start],
+        "first_row": graph.tx_row[row[group_start]],
+    }
+
+
+def _smurf_window_hits(
+    graph: CompactGraph,
+    whitelist: np.ndarray,
+    accounts: Optional[Tuple[int, int]] = None,
+    ctx: Any = None,
+    stats: Optional[Dict[str, int]] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    First threshold-reaching window per (direction, focal account), as arrays.
+
+    Fan-in and fan-out rows are stacked into one columnar pass sorted by
+    (direction, focal account, timestamp). `accounts=(lo, hi)` restricts focal
+    accounts to that code range so the work can be split across processes.
+    Besides the window itself each hit carries the (timestamp, input row) of
+    the account's first transaction — the key _smurf_flags orders by.
+    Windows scanned (one per row) and focal accounts are tallied into `stats`.
+    """
+    group, counterpart, row = _smurf_rows(graph, whitelist, accounts)
+    _report(ctx, "smurfing", 0.25)
+
+    window_ns = int(pd.Timedelta(hours=CFG.SMURF_WINDOW_HOURS).value)
+    left, distinct = _window_distinct_counts(group, counterpart, graph.tx_ts[row], window_ns)
+    _report(ctx, "smurfing", 0.75)
+    _tally(stats, "smurf_windows_scanned", len(group))
+    _tally(stats, "smurf_accounts_scanned", int(np.count_nonzero(np.diff(group))) + (len(group) > 0))
+
+    return _smurf_hits(graph, group, row, left, distinct, CFG.SMURF_MIN_COUNTERPARTIES)
+
+
+def _smurf_flags(hits: Dict[str, np.ndarray]) -> Dict[int, Dict[str, Any]]:
+    """
+    Hit arrays → per-account smurf info, in the order each focal account first
+    appears in time (fan-in before fan-out) — the order a time-sorted
+    groupby(sort=False) would visit them. Fan-in wins over fan-out.
+    """
+    emit = np.lexsort((hits["first_row"], hits["first_ts"], hits["direction"]))
+    flagged: Dict[int, Dict[str, Any]] = {}
+    for i in emit.tolist():
+        acct = int(hits["account"][i])
+        if acct in flagged:
+            continue    # fan-in already recorded for this account
+        flagged[acct] = {
+            "pattern": "fan_in" if hits["direction"][i] == 0 else "fan_out",
+            "fan_count": int(hits["fan_count"][i]),
+            "amount": round(float(hits["amount"][i]), 2),
+            "window_start": str(pd.Timestamp(int(hits["window_start"][i]), tz="UTC")),
+        }
+    return flagged
+
+
+def detect_smurfing(
+    graph: CompactGraph,
+    whitelist: np.ndarray,
+    ctx: Any = None,
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Fan-in:  ≥10 unique senders → 1 receiver within 72 h
+    Fan-out: 1 sender → ≥10 unique receivers within 72 h
+    Both checked; whitelisted accounts (boolean mask by code) skipped.
+    Each focal account reports the first window that reaches the threshold;
+    a fan-in hit takes precedence over fan-out. Keyed by account code.
+    """
+    dropped = int((graph.tx_ts == _NAT).sum())
+    if dropped:
+        logger.warning("Smurfing: %d rows with unparseable timestamps dropped", dropped)
+
+    with _timed(ctx, "smurfing"):
+        stats: Dict[str, int] = {}
+        flagged = _smurf_flags(_smurf_window_hits(graph, whitelist, ctx=ctx, stats=stats))
+        stats["smurf_accounts_flagged"] = len(flagged)
+        _count(ctx, stats)
+
+    _report(ctx, "smurfing", 1)
+    logger.info("Smurfing: %d accounts flagged", len(flagged))
+    return flagged
+
+# =============================================================================
+# Detection 3 — Layered Shell Networks (PDF §3)
+# =============================================================================
+
+def _shell_heads(graph: CompactGraph, whitelist: np.ndarray, fallback: bool = True) -> List[int]:
+    """
+    Chain heads: non-whitelisted accounts with no non-whitelisted predecessor.
+    With no heads at all and `fallback`, every non-whitelisted account.
+    """
+    candidate = ~whitelist
+    live = candidate[graph.edge_src] & candidate[graph.indices]
+    in_deg = np.bincount(graph.indices[live], minlength=graph.n_nodes)
+    heads = np.flatnonzero(candidate & (in_deg == 0)).tolist()
+    return heads or (np.flatnonzero(candidate).tolist() if fallback else [])
+
+
+def _shell_chains_from_heads(
+    graph: CompactGraph,
+    whitelist: np.ndarray,
+    heads: List[int],
+    tick: Optional[Callable[[int], None]] = None,
+    stats: Optional[Dict[str, int]] = None,
+    budget: Optional[WorkBudget] = None,
+) -> Tuple[List[List[int]], int]:
+    """
+    Maximal shell chains starting at `heads`, plus how many heads hit the cap.
+    DFS nodes expanded are tallied into `stats`. Once `budget` is exhausted
+    the walk stops; a path cut short is never reported as a chain.
+    """
+    candidate = ~whitelist
+    is_shell_interior = (candidate & (graph.tx_count <= CFG.SHELL_MAX_TX_PER_NODE)).tolist()
+    succ_cache: Dict[int, List[int]] = {}
+
+    def successors(node: int) -> List[int]:
+        succ = succ_cache.get(node)
+        if succ is None:
+            nbrs = graph.successors(node)
+            succ = succ_cache[node] = nbrs[candidate[nbrs]].tolist()
+        return succ
+
+    chains: List[List[int]] = []
+    capped_heads = 0
+    expanded = 0
+
+    def dfs(node: int, path: List[int], on_path: Set[int], found: List[int]) -> None:
+        nonlocal expanded
+        if budget is not None and not budget.spend():
+            return
+        expanded += 1
+        extended = False
+        if len(path) < CFG.SHELL_MAX_DEPTH and (len(path) == 1 or is_shell_interior[node]):
+            for succ in successors(node):
+                if found[0] >= CFG.SHELL_MAX_CHAINS_PER_HEAD or (budget is not None and budget.exhausted):
+                    return
+                if succ not in on_path:
+                    extended = True
+                    path.append(succ)
+                    on_path.add(succ)
+                    dfs(succ, path, on_path, found)
+                    on_path.discard(succ)
+                    path.pop()
+
+        if not extended and len(path) >= CFG.SHELL_MIN_HOPS:
+            chains.append(list(path))
+            found[0] += 1
+
+    for i, head in enumerate(heads):
+        if budget is not None and budget.expired():
+            break
+        if tick is not None and i % 256 == 0:
+            tick(i)
+        found = [0]
+        dfs(head, [head], {head}, found)
+        if found[0] >= CFG.SHELL_MAX_CHAINS_PER_HEAD:
+            capped_heads += 1
+
+    _tally(stats, "shell_heads", len(heads))
+    _tally(stats, "shell_dfs_expanded", expanded)
+    return chains, capped_heads
+
+
+def _log_shell_chains(chains: List[List[int]], capped_heads: int) -> None:
+    if capped_heads:
+        logger.warning("Shell chains: %d heads hit the %d-chain cap", capped_heads, CFG.SHELL_MAX_CHAINS_PER_HEAD)
+    logger.info("Shell chains: %d found", len(chains))
+
+
+def detect_layered_shells(
+    graph: CompactGraph,
+    whitelist: np.ndarray,
+    ctx: Any = None,
+    fallback: bool = True,
+) -> List[List[int]]:
+    """
+    Chains of 3+ hops where INTERIOR nodes have ≤ SHELL_MAX_TX_PER_NODE transactions.
+    PDF: 'chains of 3+ hops where intermediate accounts have only 2–3 total transactions'.
+    Chain head and tail are not constrained.
+
+    The search only walks *through* accounts that qualify as shell interiors,
+    so a branch stops as soon as its tail could not become interior. Only
+    maximal chains are reported — every shorter prefix has a subset of the
+    same interior accounts — and each head is capped at
+    SHELL_MAX_CHAINS_PER_HEAD chains so one hub cannot stall the request;
+    the whole walk is bounded by SHELL_MAX_SECONDS / SHELL_MAX_EXPANDED.
+    Chains are lists of account codes. `fallback` as in _shell_heads.
+    """
+    with _timed(ctx, "shells"):
+        # Start from nodes with no incoming edges (chain heads)
+        heads = _shell_heads(graph, whitelist, fallback)
+
+        def tick(i: int) -> None:
+            _report(ctx, "shells", i, len(heads))
+
+        stats: Dict[str, int] = {}
+        budget = _budget(ctx, "shells")
+        chains, capped_heads = _shell_chains_from_heads(
+            graph, whitelist, heads, tick if ctx is not None else None, stats, budget,
+        )
+        if budget.exhausted:
+            _mark_truncated(ctx, "shells")
+        stats["shell_chains_kept"] = len(chains)
+        _count(ctx, stats)
+    _report(ctx, "shells", 1)
+    _log_shell_chains(chains, capped_heads)
+    return chains
+
+# =============================================================================
+# Process-pool execution — detector slices over a shared-memory graph
+# =============================================================================
+#
+# The graph arrays are copied once into a single SharedMemory block; workers
+# map it read-only and run slices of each detector (cycle start ranges, smurf
+# account ranges, shell head chunks). Only the manifest and slice bounds are
+# pickled per task, and only compact result lists/arrays come back.
+
+_pool_lock = threading.Lock()
+_pool_state: Dict[str, Any] = {"pool": None, "workers": 0}
+
+# Worker-side: the graph currently attached, reused across tasks of one run
+_attached: Dict[str, Any] = {
+    "name": None, "shm": None, "graph": None, "whitelist": None, "components": {},
+}
+
+
+def _process_pool(workers: int) -> concurrent.futures.ProcessPoolExecutor:
+    """Shared, lazily started pool; restarted if the size changes or it broke."""
+    with _pool_lock:
+        pool = _pool_state["pool"]
+        if pool is None or _pool_state["workers"] != workers or getattr(pool, "_broken", False):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context(method),
+            )
+            _pool_state.update(pool=pool, workers=workers)
+        return pool
+
+
+def shutdown_process_pool() -> None:
+    with _pool_lock:
+        if _pool_state["pool"] is not None:
+            _pool_state["pool"].shutdown(wait=True, cancel_futures=True)
+        _pool_state.update(pool=None, workers=0)
+
+
+def _share_graph(
+    graph: CompactGraph, whitelist: np.ndarray,
+) -> Tuple[shared_memory.SharedMemory, Dict[str, Any]]:
+    """Copy the graph arrays and whitelist mask into one shared block."""
+    arrays = {name: getattr(graph, name) for name in CompactGraph.ARRAYS}
+    arrays["whitelist"] = whitelist
+    layout: Dict[str, Tuple[int, str, Tuple[int, ...]]] = {}
+    offset = 0
+    for name, arr in arrays.items():
+        offset = (offset + 63) & ~63        # keep every array cache-line aligned
+        layout[name] = (offset, arr.dtype.str, arr.shape)
+        offset += arr.nbytes
+
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for name, arr in arrays.items():
+        off, dtype, shape = layout[name]
+        np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=off)[...] = arr
+    return shm, {"name": shm.name, "layout": layout}
+
+
+def _attach_graph(manifest: Dict[str, Any]) -> Tuple[CompactGraph, np.ndarray]:
+    """Worker side: map the run's shared block (once per run) as a CompactGraph."""
+    if _attached["name"] != manifest["name"]:
+        old = _attached["shm"]
+        _attached.update(name=None, shm=None, graph=None, whitelist=None, components={})
+        if old is not None:
+            try:
+                old.close()
+            except BufferError:
+                pass    # a stray view is still alive; the mapping goes with the process
+        shm = shared_memory.SharedMemory(name=manifest["name"])
+        arrays = {
+            name: np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=off)
+            for name, (off, dtype, shape) in manifest["layout"].items()
+        }
+        for arr in arrays.values():
+            arr.flags.writeable = False
+        _attached.update(
+            name=manifest["name"], shm=shm,
+            graph=CompactGraph.from_arrays(arrays), whitelist=arrays["whitelist"],
+        )
+    return _attached["graph"], _attached["whitelist"]
+
+
+def _sync_config(values: Dict[str, Any]) -> None:
+    for key, value in values.items():
+        setattr(CFG, key, value)
+
+
+def _cycle_task(
+    manifest: Dict[str, Any], cfg: Dict[str, Any], items: List[Tuple[np.ndarray, int, int]],
+    budget_share: Tuple[float, int],
+) -> Tuple[List[List[int]], Dict[str, int]]:
+    _sync_config(cfg)
+    graph, _ = _attach_graph(manifest)
+    cache: Dict[Tuple[int, int], _ComponentAdjacency] = _attached["components"]
+    cycles: List[List[int]] = []
+    stats: Dict[str, int] = {}
+    deadline, limit = budget_share
+    budget = WorkBudget(0, limit, deadline)
+    for component, lo, hi in items:
+        # Components are disjoint, so (smallest node, size) identifies one
+        key = (int(component[0]), len(component))
+        if key not in cache:
+            cache[key] = _ComponentAdjacency(graph, component.tolist())
+        cycles.extend(_cycles_in_component(
+            graph, component, starts=(lo, hi), adjacency=cache[key], stats=stats, budget=budget,
+        ))
+        if budget.exhausted:
+            stats["cycles_truncated"] = 1
+            break
+    return cycles, stats
+
+
+def _smurf_task(
+    manifest: Dict[str, Any], cfg: Dict[str, Any], lo: int, hi: int,
+) -> Tuple[Dict[str, np.ndarray], Dict[str, int]]:
+    _sync_config(cfg)
+    graph, whitelist = _attach_graph(manifest)
+    stats: Dict[str, int] = {}
+    return _smurf_window_hits(graph, whitelist, accounts=(lo, hi), stats=stats), stats
+
+
+def _shell_task(
+    manifest: Dict[str, Any], cfg: Dict[str, Any], heads: List[int], budget_share: Tuple[float, int],
+) -> Tuple[Tuple[List[List[int]], int], Dict[str, int]]:
+    _sync_config(cfg)
+    graph, whitelist = _attach_graph(manifest)
+    stats: Dict[str, int] = {}
+    deadline, limit = budget_share
+    budget = WorkBudget(0, limit, deadline)
+    found = _shell_chains_from_heads(graph, whitelist, heads, stats=stats, budget=budget)
+    if budget.exhausted:
+        stats["shells_truncated"] = 1
+    return found, stats
+
+
+def _split_weighted(weights: np.ndarray, parts: int) -> List[Tuple[int, int]]:
+    """Contiguous [lo, hi) ranges over `weights` with roughly equal weight sums."""
+    n = len(weights)
+    if n == 0:
+        return []
+    cum = np.cumsum(weights, dtype=np.float64)
+    targets = cum[-1] * np.arange(1, parts) / parts
+    cuts = np.unique(np.concatenate([[0], np.searchsorted(cum, targets, side="right"), [n]]))
+    return [(int(lo), int(hi)) for lo, hi in zip(cuts[:-1], cuts[1:]) if hi > lo]
+
+
+def _cycle_batches(components: List[List[int]], parts: int) -> List[List[Tuple[np.ndarray, int, int]]]:
+    """
+    Pack (component, start_lo, start_hi) slices into about `parts` batches of
+    similar start-node counts: big components are split, small ones grouped.
+    """
+    total = sum(len(c) for c in components)
+    if not total:
+        return []
+    target = max(1, -(-total // parts))
+    batches: List[List[Tuple[np.ndarray, int, int]]] = []
+    batch: List[Tuple[np.ndarray, int, int]] = []
+    size = 0
+    for component in components:
+        component = np.asarray(component)      # pickled once per batch, not per slice
+        for lo in range(0, len(component), target):
+            hi = min(lo + target, len(component))
+            batch.append((component, lo, hi))
+            size += hi - lo
+            if size >= target:
+                batches.append(batch)
+                batch, size = [], 0
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _run_detectors_in_processes(
+    graph: CompactGraph, whitelist: np.ndarray, ctx: Any = None,
+) -> Tuple[List[List[int]], Dict[int, Dict[str, Any]], List[List[int]]]:
+    """
+    Same results as the three detect_* functions, computed as slices on the
+    process pool. Slice results are merged in slice order, so the output does
+    not depend on the worker count or completion order. A stage's time runs
+    from the first submission until its last slice completes. Each slice gets
+    an even share of its detector's expansion budget and the common deadline.
+    """
+    workers = max(1, CFG.DETECTOR_WORKERS)
+    parts = workers * max(1, CFG.TASKS_PER_WORKER)
+    pool = _process_pool(workers)
+    cfg = _config_values(CFG)
+    shm, manifest = _share_graph(graph, whitelist)
+    futures: Dict[concurrent.futures.Future, Tuple[str, int]] = {}
+    stats: Dict[str, int] = {}
+    submitted = time.perf_counter()
+    try:
+        # Smurf and shell slices need nothing beyond the graph — queue them
+        # first, then find cycle components while the workers are busy.
+        weights = graph.tx_count.astype(np.float64)
+        smurf_ranges = _split_weighted(weights, parts)
+        for i, (lo, hi) in enumerate(smurf_ranges):
+            futures[pool.submit(_smurf_task, manifest, cfg, lo, hi)] = ("smurfing", i)
+
+        heads = _shell_heads(graph, whitelist)
+        head_ranges = _split_weighted(np.ones(len(heads)), parts)
+        share = _budget(ctx, "shells").share(len(head_ranges))
+        for i, (lo, hi) in enumerate(head_ranges):
+            futures[pool.submit(_shell_task, manifest, cfg, heads[lo:hi], share)] = ("shells", i)
+
+        components = _cycle_components(graph)
+        stats["cycle_components"] = len(components)
+        batches = _cycle_batches(components, parts)
+        share = _budget(ctx, "cycles").share(len(batches))
+        for i, batch in enumerate(batches):
+            futures[pool.submit(_cycle_task, manifest, cfg, batch, share)] = ("cycles", i)
+
+        totals = {"cycles": len(batches), "smurfing": len(smurf_ranges), "shells": len(head_ranges)}
+        done = {stage: 0 for stage in totals}
+        results: Dict[str, Dict[int, Any]] = {stage: {} for stage in totals}
+        for future in concurrent.futures.as_completed(futures):
+            stage, index = futures[future]
+            results[stage][index], slice_stats = future.result()
+            for key, value in slice_stats.items():
+                stats[key] = stats.get(key, 0) + value
+            done[stage] += 1
+            if done[stage] == totals[stage] and ctx is not None:
+                ctx.add_time(stage, time.perf_counter() - submitted)
+            _report(ctx, stage, done[stage], totals[stage])
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+    finally:
+        shm.close()
+        shm.unlink()
+
+    cycles = sorted(c for i in range(totals["cycles"]) for c in results["cycles"][i])
+
+    smurf_parts = [results["smurfing"][i] for i in range(totals["smurfing"])]
+    if smurf_parts:
+        hits = {key: np.concatenate([p[key] for p in smurf_parts]) for key in smurf_parts[0]}
+        smurf_map = _smurf_flags(hits)
+    else:
+        smurf_map = {}
+
+    shell_chains: List[List[int]] = []
+    capped_heads = 0
+    for i in range(totals["shells"]):
+        chains, capped = results["shells"][i]
+        shell_chains.extend(chains)
+        capped_heads += capped
+
+    for detector in ("cycles", "shells"):
+        if stats.pop(f"{detector}_truncated", 0):
+            _mark_truncated(ctx, detector)
+    stats["cycles_kept"] = len(cycles)
+    stats["smurf_accounts_flagged"] = len(smurf_map)
+    stats["shell_chains_kept"] = len(shell_chains)
+    _count(ctx, stats)
+    for stage in totals:
+        _report(ctx, stage, 1)
+    logger.info("Cycles: %d unique rings found (%d worker processes)", len(cycles), workers)
+    logger.info("Smurfing: %d accounts flagged", len(smurf_map))
+    _log_shell_chains(shell_chains, capped_heads)
+    return cycles, smurf_map, shell_chains
+
+# =============================================================================
+# Pattern label builder
+# =============================================================================
+
+def _detected_patterns(
+    in_cycle: bool,
+    cycle_len: int,
+    smurf_info: Dict[str, Any],
+    in_shell: bool,
+    volume: float,
+) -> List[str]:
+    """
+    Returns descriptive string labels.
+    PDF example: ["cycle_length_3", "high_velocity"].
+    """
+    patterns = []
+    if in_cycle and cycle_len:
+        patterns.append(f"cycle_length_{cycle_len}")
+    if smurf_info:
+        pat = smurf_info.get("pattern", "fan_in")
+        patterns.append("high_velocity" if pat == "fan_in" else "fan_out")
+    if in_shell:
+        patterns.append("layered_shell")
+    if volume > 500_000:
+        patterns.append("high_volume")
+    return sorted(patterns)
+
+
+def _pattern_table(
+    cycle_len: np.ndarray, in_smurf: np.ndarray, fan_out: np.ndarray, in_shell: np.ndarray, volume: np.ndarray,
+) -> Tuple[List[List[str]], np.ndarray]:
+    """
+    _detected_patterns for every account, computed once per distinct flag
+    combination: (one list per combination, combination of each account).
+    """
+    key = ((cycle_len * 2 + in_smurf) * 2 + fan_out) * 4 + in_shell * 2 + (volume > 500_000)
+    uniq, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+    table = [
+        _detected_patterns(
+            bool(cycle_len[i]), int(cycle_len[i]),
+            {"pattern": "fan_out" if fan_out[i] else "fan_in"} if in_smurf[i] else {},
+            bool(in_shell[i]), float(volume[i]),
+        )
+        for i in first.tolist()
+    ]
+    return table, inverse
+
+# =============================================================================
+# Scoring — array helpers matching the scalar formulas bit for bit
+# =============================================================================
+
+def _account_score(in_cycle: bool, in_smurf: bool, in_shell: bool, volume: float) -> float:
+    """Unrounded suspicion score of one account — the reference formula."""
+    return min(
+        CFG.W_CYCLE  * (100.0 if in_cycle else 0.0) +
+        CFG.W_SMURF  * (100.0 if in_smurf else 0.0) +
+        CFG.W_SHELL  * (100.0 if in_shell else 0.0) +
+        CFG.W_VOLUME * _log_volume_score(volume, CFG.VOLUME_LOG_SCALE) * 100.0,
+        100.0,
+    )
+
+
+def _scores(in_cycle: np.ndarray, in_smurf: np.ndarray, in_shell: np.ndarray, volume: np.ndarray) -> np.ndarray:
+    """
+    round(_account_score(...), 2) for every account. np.log1p can differ
+    from math.log1p in the last ulp, which only matters where the score sits
+    on a rounding boundary — those few accounts are recomputed exactly.
+    """
+    log_score = np.zeros(len(volume))
+    pos = volume > 0
+    log_score[pos] = np.minimum(np.log1p(volume[pos]) / math.log1p(CFG.VOLUME_LOG_SCALE), 1.0)
+    raw = np.minimum(
+        CFG.W_CYCLE  * np.where(in_cycle, 100.0, 0.0) +
+        CFG.W_SMURF  * np.where(in_smurf, 100.0, 0.0) +
+        CFG.W_SHELL  * np.where(in_shell, 100.0, 0.0) +
+        CFG.W_VOLUME * log_score * 100.0,
+        100.0,
+    )
+
+    def exact(idx: np.ndarray) -> np.ndarray:
+        return np.array([
+            _account_score(bool(in_cycle[i]), bool(in_smurf[i]), bool(in_shell[i]), float(volume[i]))
+            for i in idx.tolist()
+        ], dtype=np.float64)
+
+    return _py_round(raw, 2, exact)
+
+
+def _py_round(
+    values: np.ndarray, ndigits: int, exact: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+) -> np.ndarray:
+    """
+    Python's round(v, ndigits) per element. Scaling by 10**ndigits can only
+    pick a different integer than round() within float error of a .5 tie, so
+    values that close to a tie go through round() itself — after `exact(idx)`
+    recomputes them when `values` are approximations.
+    """
+    factor = 10.0 ** ndigits
+    scaled = values * factor
+    out = np.rint(scaled) / factor
+    near = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    if len(near):
+        precise = values[near] if exact is None else exact(near)
+        out[near] = [round(v, ndigits) for v in precise.tolist()]
+    return out
+
+
+def _row_sums(values: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """
+    Sum of each consecutive run of `lengths` values, added left to right by
+    np.add.reduceat; empty runs sum to 0.
+    """
+    totals = np.zeros(len(lengths))
+    nonempty = lengths > 0
+    if nonempty.any():
+        totals[nonempty] = np.add.reduceat(values, (np.cumsum(lengths) - lengths)[nonempty])
+    return totals
+
+
+def _flatten(lists: List[List[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """(lengths, concatenated values) of integer lists."""
+    lengths = np.fromiter(map(len, lists), dtype=np.int64, count=len(lists))
+    flat = np.fromiter(itertools.chain.from_iterable(lists), dtype=np.int64, count=int(lengths.sum()))
+    return lengths, flat
+
+
+def _score_order(labels: np.ndarray, scores: np.ndarray) -> np.ndarray:
+    """
+    Positions sorted by descending score, ties by account ID. Both keys come
+    from the data alone, so the order is the same in every process and run.
+    """
+    return np.lexsort((labels, -scores))
+
+# =============================================================================
+# Core Analysis Engine
+# =============================================================================
+
+def _validate(df: pd.DataFrame) -> None:
+    missing = CFG.REQUIRED_COLUMNS - set(df.columns)
+    if missing:
+        raise ValueError(f"Missing required columns: {sorted(missing)}")
+    if df.empty:
+        raise ValueError("CSV contains no data rows.")
+
+
+def run_full_analysis(df: pd.DataFrame, ctx: Any = None) -> Dict[str, Any]:
+    """
+    Full pipeline over one transaction frame. `ctx` (a RunContext) receives
+    per-stage progress and can cancel the run (AnalysisCancelled); its stage
+    timers and work counters end up in the result's `timings` block.
+    """
+    _validate(df)
+    if CFG.EXECUTION_MODE == "sharded":
+        return run_sharded_analysis(_frame_chunks(df), ctx)
+    start = time.perf_counter()
+    ctx = ctx if ctx is not None else RunContext()
+
+    # ── Build compact graph (interns account IDs once) ───────────────────────
+    _report(ctx, "graph", 0)
+    with ctx.timed("graph"):
+        graph = CompactGraph.from_frame(df)
+    return analyze_graph(graph, ctx, start)
+
+
+def analyze_graph(graph: CompactGraph, ctx: Any = None, start: Optional[float] = None) -> Dict[str, Any]:
+    """
+    The pipeline from an already-built graph on — e.g. a memory-mapped
+    stored dataset. `start` is when the run began (default: now).
+    """
+    start = start if start is not None else time.perf_counter()
+    ctx = ctx if ctx is not None else RunContext()
+    _report(ctx, "graph", 1)
+    total_accounts = graph.n_nodes
+    ctx.count({"nodes": total_accounts, "edges": graph.n_edges, "transactions": len(graph.tx_src)})
+    logger.info("Graph: %d nodes, %d edges (%d transactions)", total_accounts, graph.n_edges, len(graph.tx_src))
+
+    with ctx.timed("whitelist"):
+        whitelist_mask = _merchant_mask(graph.tx_count)
+    logger.info("Merchant whitelist: %d accounts", int(whitelist_mask.sum()))
+
+    # ── Run detectors in parallel ─────────────────────────────────────────────
+    if CFG.EXECUTION_MODE == "process":
+        code_cycles, code_smurf, code_chains = _run_detectors_in_processes(graph, whitelist_mask, ctx)
+    else:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=3) as pool:
+            # each detector thread runs in a copy of this context, so it reads the same CFG
+            f_cycles = pool.submit(contextvars.copy_context().run, detect_circular_routing, graph, ctx)
+            f_smurf  = pool.submit(contextvars.copy_context().run, detect_smurfing, graph, whitelist_mask, ctx)
+            f_shells = pool.submit(contextvars.copy_context().run, detect_layered_shells, graph, whitelist_mask, ctx)
+            code_cycles, code_smurf, code_chains = f_cycles.result(), f_smurf.result(), f_shells.result()
+
+    results = _assemble_results(
+        graph.labels, code_cycles, code_smurf, code_chains, graph.volume, total_accounts, start, ctx,
+    )
+    _record_analysis("full", results["timings"])
+    return results
+
+
+class AnalysisResult(dict):
+    """
+    The response dict, plus the typed arrays its records were built from
+    (`arrays`: section → field → column, in record order). Binary exports
+    wrap the arrays; shallow copies made for a response drop them.
+    """
+
+    arrays: Optional[Dict[str, Dict[str, Any]]] = None
+
+
+class _Coded(NamedTuple):
+    """A column stored as integer codes into an array of distinct values."""
+    codes: np.ndarray
+    values: np.ndarray
+
+
+class _Lists(NamedTuple):
+    """A list column: row i is values[offsets[i]:offsets[i + 1]]."""
+    offsets: np.ndarray
+    values: Any
+
+
+def _offsets(lengths: np.ndarray) -> np.ndarray:
+    return np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+
+
+def _records(columns: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    """Row dicts from equal-length columns, keys in column order."""
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+
+def _ring_groups(lengths: np.ndarray, flat: np.ndarray, n: int) -> Tuple[np.ndarray, int]:
+    """
+    (group per path, number of groups) for flattened paths over `n` accounts:
+    paths sharing an account, directly or through other paths, form one group
+    (union-find over consecutive members). Groups are numbered in order of
+    their first path.
+    """
+    if not len(lengths):
+        return np.empty(0, dtype=np.int64), 0
+    parent = np.arange(n, dtype=np.int64)
+    same_path = np.repeat(np.arange(len(lengths)), lengths)
+    link = same_path[1:] == same_path[:-1]
+    _union(parent, flat[:-1][link], flat[1:][link])
+    roots = _roots(parent, flat[np.cumsum(lengths) - lengths])
+    uniq, first, inverse = np.unique(roots, return_index=True, return_inverse=True)
+    number = np.empty(len(uniq), dtype=np.int64)
+    number[np.argsort(first, kind="stable")] = np.arange(len(uniq))
+    return number[inverse], len(uniq)
+
+
+def _representatives(
+    labels: np.ndarray, lengths: np.ndarray, flat: np.ndarray, group: np.ndarray, n_groups: int, keep: int,
+) -> List[List[List[str]]]:
+    """The first `keep` paths of every group, as account IDs."""
+    bounds = np.concatenate([[0], np.cumsum(lengths)]).tolist()
+    counts = np.bincount(group, minlength=n_groups)
+    order = np.argsort(group, kind="stable")
+    rank = np.arange(len(order)) - np.repeat(np.cumsum(counts) - counts, counts)
+    out: List[List[List[str]]] = [[] for _ in range(n_groups)]
+    for path in order[rank < keep].tolist():
+        out[group[path]].append(labels[flat[bounds[path]:bounds[path + 1]]].tolist())
+    return out
+
+
+def _assemble_results(
+    labels: np.ndarray,
+    cycles: List[List[int]],
+    smurf_map: Dict[int, Dict[str, Any]],
+    shell_chains: List[List[int]],
+    volume: np.ndarray,
+    total_accounts: int,
+    start: float,
+    ctx: Any = None,
+) -> Dict[str, Any]:
+    """
+    Ring assignment, scoring and the response dict from detector output.
+    Accounts are integer indices into `labels` / `volume`; ring membership,
+    scores and risk aggregation run as array operations over them.
+    With a `ctx`, the result also carries its `timings` block.
+    """
+    scoring_start = time.perf_counter()
+    _report(ctx, "scoring", 0)
+    n = len(labels)
+
+    # ── Ring members, flattened ───────────────────────────────────────────────
+    cycle_len, cycle_flat = _flatten(cycles)
+    chain_len, chain_flat = _flatten(shell_chains)
+    n_cycles, n_chains = len(cycles), len(shell_chains)
+    chain_pos = np.arange(len(chain_flat)) - np.repeat(np.cumsum(chain_len) - chain_len, chain_len)
+    interior = (chain_pos > 0) & (chain_pos < np.repeat(chain_len - 1, chain_len))
+    shell_flat = chain_flat[interior]
+    smurf_codes = np.fromiter(smurf_map, dtype=np.int64, count=len(smurf_map))
+
+    in_cycle = np.zeros(n, dtype=bool)
+    in_cycle[cycle_flat] = True
+    in_smurf = np.zeros(n, dtype=bool)
+    in_smurf[smurf_codes] = True
+    in_shell = np.zeros(n, dtype=bool)
+    in_shell[shell_flat] = True
+
+    # An account's cycle length comes from the last cycle it appears in
+    len_of = np.zeros(n, dtype=np.int64)
+    if len(cycle_flat):
+        uniq, first_rev = np.unique(cycle_flat[::-1], return_index=True)
+        len_of[uniq] = np.repeat(cycle_len, cycle_len)[::-1][first_rev]
+
+    # ── Assign RING_xxx IDs: first ring assignment wins ───────────────────────
+    # Cycles take ring numbers 0..C-1 in order, shells C.., and assignments
+    # (all cycle members, then shell interiors) are made in ring order. In
+    # grouped mode a path's ring is its group's, groups numbered by first path.
+    setting = ctx.setting if ctx is not None else lambda name: getattr(CFG, name)
+    grouped = setting("RING_MODE") == "grouped"
+    if grouped:
+        cycle_group, n_cycle_groups = _ring_groups(cycle_len, cycle_flat, n)
+        chain_group, n_chain_groups = _ring_groups(chain_len, chain_flat, n)
+        ring_group = np.concatenate([cycle_group, n_cycle_groups + chain_group])
+    else:
+        n_cycle_groups, n_chain_groups = n_cycles, n_chains
+        ring_group = np.arange(n_cycles + n_chains)
+    n_groups = n_cycle_groups + n_chain_groups
+    ring_of = np.full(n, -1, dtype=np.int64)
+    assigned = np.concatenate([cycle_flat, shell_flat])
+    assigned_ring = ring_group[np.concatenate([
+        np.repeat(np.arange(n_cycles), cycle_len),
+        np.repeat(np.arange(n_cycles, n_cycles + n_chains), chain_len)[interior],
+    ])]
+    uniq, first = np.unique(assigned, return_index=True)
+    ring_of[uniq] = assigned_ring[first]
+    # Smurfs not in any ring get a ring of their own, in smurf_map order
+    solo = smurf_codes[ring_of[smurf_codes] < 0]
+    ring_of[solo] = n_groups + np.arange(len(solo))
+    ring_ids = np.array([_ring_id(i) for i in range(n_groups + len(solo))] + ["NONE"], dtype=object)
+
+    # ── Score each flagged account ────────────────────────────────────────────
+    flagged = np.unique(np.concatenate([cycle_flat, smurf_codes, shell_flat]))
+    f_cycle, f_smurf, f_shell = in_cycle[flagged], in_smurf[flagged], in_shell[flagged]
+    f_volume = volume[flagged].astype(np.float64)
+    scores = _scores(f_cycle, f_smurf, f_shell, f_volume)
+
+    fan_out = np.zeros(n, dtype=bool)
+    fan_out[smurf_codes] = [info.get("pattern", "fan_in") != "fan_in" for info in smurf_map.values()]
+    pattern_table, pattern_of = _pattern_table(
+        np.where(f_cycle, len_of[flagged], 0), f_smurf, fan_out[flagged], f_shell, f_volume,
+    )
+
+    # Sorted descending — PDF requirement; equal scores by account ID
+    order = _score_order(labels[flagged], scores)
+    flagged, scores, pattern_of = flagged[order], scores[order], pattern_of[order]
+    account_ids = labels[flagged]
+    account_ring = ring_of[flagged]
+    account_ring[account_ring < 0] = len(ring_ids) - 1      # "NONE"
+    accounts = {
+        "account_id":        account_ids.tolist(),
+        "suspicion_score":   scores.tolist(),
+        "detected_patterns": [pattern_table[k] for k in pattern_of.tolist()],
+        "ring_id":           ring_ids[account_ring].tolist(),
+    }
+
+    # ── Attach risk_score to each ring ────────────────────────────────────────
+    path_len = np.concatenate([cycle_len, chain_len])
+    path_flat = np.concatenate([cycle_flat, chain_flat])
+    if grouped:
+        # distinct (group, account) pairs: members of each group in label order
+        # (codes need not follow label order — incremental ids do not)
+        pairs = np.unique(np.repeat(ring_group, path_len) * n + path_flat)
+        pair_group, group_flat = pairs // n, pairs % n
+        uniq, inverse = np.unique(group_flat, return_inverse=True)
+        label_rank = np.empty(len(uniq), dtype=np.int64)
+        label_rank[np.argsort(labels[uniq], kind="stable")] = np.arange(len(uniq))
+        group_flat = group_flat[np.lexsort((label_rank[inverse], pair_group))]
+        group_len = np.bincount(pair_group, minlength=n_groups)
+    else:
+        group_len, group_flat = path_len, path_flat
+    member_len = np.concatenate([group_len, np.ones(len(solo), dtype=np.int64)])
+    members = np.concatenate([group_flat, solo])
+    score_of = np.zeros(n, dtype=np.float64)
+    score_of[flagged] = scores
+    risk = _py_round(_row_sums(score_of[members], member_len) / np.maximum(member_len, 1), 1)
+    risk[member_len == 0] = 0.0
+
+    bounds = np.concatenate([[0], np.cumsum(member_len)]).tolist()
+    member_ids = labels[members]
+    member_labels = member_ids.tolist()
+    pattern_type = _Coded(
+        np.repeat(np.arange(3, dtype=np.int8), [n_cycle_groups, n_chain_groups, len(solo)]),
+        np.array(["cycle", "layered_shells", "smurfing"], dtype=object),
+    )
+    rings = {
+        "ring_id":         ring_ids[:-1].tolist(),
+        "member_accounts": [member_labels[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])],
+        "pattern_type":    pattern_type.values[pattern_type.codes].tolist(),
+        "risk_score":      risk.tolist(),
+    }
+    ring_arrays = {
+        "ring_id":         ring_ids[:-1],
+        "member_accounts": _Lists(_offsets(member_len), member_ids),
+        "pattern_type":    pattern_type,
+        "risk_score":      risk,
+    }
+    if grouped:
+        path_count = np.concatenate([np.bincount(ring_group, minlength=n_groups), np.zeros(len(solo), dtype=np.int64)])
+        rings["member_count"] = member_len.tolist()
+        rings["path_count"] = path_count.tolist()
+        rings["representatives"] = _representatives(
+            labels, path_len, path_flat, ring_group, n_groups, setting("RING_REPRESENTATIVES"),
+        ) + [[] for _ in range(len(solo))]
+        ring_arrays.update(
+            member_count=member_len, path_count=path_count, representatives=rings["representatives"],
+        )
+
+    suspicious_out = _records(accounts)
+    fraud_rings_out = _records(rings)
+
+    _report(ctx, "scoring", 1)
+    end = time.perf_counter()
+    elapsed = round(end - start, 4)
+    logger.info("Done %.4fs — %d suspicious, %d rings", elapsed, len(suspicious_out), len(fraud_rings_out))
+
+    results = AnalysisResult({
+        "suspicious_accounts": suspicious_out,
+        "fraud_rings":         fraud_rings_out,
+        "summary": {
+            "total_accounts_analyzed":     total_accounts,
+            "suspicious_accounts_flagged": len(suspicious_out),
+            "fraud_rings_detected":        len(fraud_rings_out),
+            "processing_time_seconds":     elapsed,
+            "truncated_detectors":         sorted(ctx.truncated) if ctx is not None else [],
+        },
+    })
+    # detected_patterns as flat codes into the (small) table of pattern names
+    pattern_len = np.fromiter(map(len, pattern_table), dtype=np.int64, count=len(pattern_table))
+    table_start = np.cumsum(pattern_len) - pattern_len
+    lengths = pattern_len[pattern_of]
+    offsets = _offsets(lengths)
+    pattern_codes = np.repeat(table_start[pattern_of] - offsets[:-1], lengths) + np.arange(offsets[-1])
+    results.arrays = {
+        "suspicious_accounts": {
+            "account_id":        account_ids,
+            "suspicion_score":   scores,
+            "detected_patterns": _Lists(offsets, _Coded(
+                pattern_codes, np.array(list(itertools.chain.from_iterable(pattern_table)), dtype=object),
+            )),
+            "ring_id":           _Coded(account_ring, ring_ids),
+        },
+        "fraud_rings": ring_arrays,
+    }
+    if ctx is not None:
+        ctx.add_time("scoring", end - scoring_start)
+        ctx.add_time("total", end - start)
+        results["timings"] = ctx.profile()
+    return results
+
+# =============================================================================
+# Sharded analysis — weakly connected components analysed independently
+# =============================================================================
+#
+# No detector pattern crosses a weakly connected component: a cycle, a shell
+# chain and an account's smurf windows all stay inside the component of the
+# accounts involved. A first pass interns accounts, spills compact rows to
+# disk and unions sender/receiver pairs; components are then packed into
+# shards under SHARD_MEMORY_MB, each shard's rows written to its own file and
+# analysed by a worker process. Only the merchant whitelist threshold and
+# the "no shell heads anywhere" fallback are global, and both are decided by
+# the parent before any shard runs.
+
+# First-pass spill: one record per input row, accounts as first-seen codes
+_SPILL_ROW = np.dtype([("src", "<i8"), ("dst", "<i8"), ("amount", "<f8"), ("ts", "<i8")])
+# Shard file: accounts as global ranks (sorted-label order), plus input row
+_SHARD_ROW = np.dtype([("src", "<i8"), ("dst", "<i8"), ("amount", "<f8"), ("ts", "<i8"), ("row", "<i8")])
+
+
+def _frame_chunks(df: pd.DataFrame) -> Iterator[pd.DataFrame]:
+    for lo in range(0, len(df), CFG.UPLOAD_CHUNK_ROWS):
+        yield df.iloc[lo:lo + CFG.UPLOAD_CHUNK_ROWS]
+
+
+def _roots(parent: np.ndarray, nodes: np.ndarray) -> np.ndarray:
+    """Union-find roots of `nodes`, halving their paths on the way."""
+    roots = parent[nodes]
+    while True:
+        up = parent[roots]
+        if np.array_equal(up, roots):
+            return roots
+        parent[nodes] = up
+        roots = up
+
+
+def _union(parent: np.ndarray, u: np.ndarray, v: np.ndarray) -> None:
+    """Merge the sets of every pair (u[i], v[i]); each root is its set's smallest node."""
+    while len(u):
+        ru, rv = _roots(parent, u), _roots(parent, v)
+        apart = ru != rv
+        if not apart.any():
+            return
+        u, v, ru, rv = u[apart], v[apart], ru[apart], rv[apart]
+        np.minimum.at(parent, np.maximum(ru, rv), np.minimum(ru, rv))
+
+
+def _pack_shards(sizes: np.ndarray, capacity: int) -> np.ndarray:
+    """
+    Shard index per component: largest components first, each into the
+    current shard while it fits (next-fit decreasing). A component larger
+    than `capacity` gets a shard of its own.
+    """
+    shard_of = np.empty(len(sizes), dtype=np.int64)
+    shard, used = 0, 0
+    for comp in np.argsort(-sizes, kind="stable").tolist():
+        size = int(sizes[comp])
+        if used and used + size > capacity:
+            shard, used = shard + 1, 0
+        shard_of[comp] = shard
+        used += size
+    return shard_of
+
+
+def _scan_chunks(chunks: Iterable[pd.DataFrame], spill: BinaryIO) -> Dict[str, Any]:
+    """
+    First pass: intern account IDs in first-seen order, write every row to
+    `spill` as a _SPILL_ROW and union each sender with its receiver. Returns
+    the labels, per-account tx/out-row counts and the union-find parents.
+    """
+    index: Dict[str, int] = {}
+    parent = np.empty(0, dtype=np.int64)
+    tx_count = np.empty(0, dtype=np.int64)
+    out_rows = np.empty(0, dtype=np.int64)
+    n_rows = 0
+    for chunk in chunks:
+        _validate(chunk)
+        n = len(chunk)
+        ids = pd.concat([chunk["sender_id"], chunk["receiver_id"]], ignore_index=True).astype(str)
+        codes, uniques = pd.factorize(ids)
+        codes = np.array([index.setdefault(u, len(index)) for u in uniques], dtype=np.int64)[codes]
+        src, dst = codes[:n], codes[n:]
+
+        grown = len(index) - len(parent)
+        parent = np.concatenate([parent, np.arange(len(parent), len(index), dtype=np.int64)])
+        tx_count = np.concatenate([tx_count, np.zeros(grown, dtype=np.int64)])
+        out_rows = np.concatenate([out_rows, np.zeros(grown, dtype=np.int64)])
+        tx_count += np.bincount(src, minlength=len(index)) + np.bincount(dst, minlength=len(index))
+        out_rows += np.bincount(src, minlength=len(index))
+        _union(parent, src, dst)
+
+        rows = np.empty(n, dtype=_SPILL_ROW)
+        rows["src"], rows["dst"] = src, dst
+        rows["amount"] = chunk["amount"].to_numpy(dtype=np.float64)
+        ts = pd.to_datetime(chunk["timestamp"], utc=True, errors="coerce")
+        rows["ts"] = ts.dt.as_unit("ns").to_numpy(dtype="datetime64[ns]").view(np.int64)
+        rows.tofile(spill)
+        n_rows += n
+    if not n_rows:
+        raise ValueError("CSV contains no data rows.")
+
+    _roots(parent, np.arange(len(parent)))
+    return {
+        "labels": np.array(list(index), dtype=object), "parent": parent,
+        "tx_count": tx_count, "out_rows": out_rows, "n_rows": n_rows,
+    }
+
+
+def _write_shards(
+    spill_path: str, shard_dir: str, shard_of: np.ndarray, rank: np.ndarray, candidate: np.ndarray,
+) -> Tuple[List[str], bool]:
+    """
+    Second pass: copy each spilled row into its shard's file (rows keep
+    input order, accounts become global ranks). Also reports whether any
+    account is a shell chain head, which _shell_heads decides per graph.
+    """
+    spilled = np.memmap(spill_path, dtype=_SPILL_ROW, mode="r")
+    n_shards = int(shard_of.max()) + 1
+    has_pred = np.zeros(len(rank), dtype=bool)
+    files: Dict[int, BinaryIO] = {}
+    try:
+        for lo in range(0, len(spilled), CFG.UPLOAD_CHUNK_ROWS):
+            chunk = np.asarray(spilled[lo:lo + CFG.UPLOAD_CHUNK_ROWS])
+            src, dst = chunk["src"], chunk["dst"]
+            live = candidate[src] & candidate[dst]
+            has_pred[dst[live]] = True
+
+            rows = np.empty(len(chunk), dtype=_SHARD_ROW)
+            rows["src"], rows["dst"] = rank[src], rank[dst]
+            rows["amount"], rows["ts"] = chunk["amount"], chunk["ts"]
+            rows["row"] = np.arange(lo, lo + len(chunk), dtype=np.int64)
+            shard = shard_of[src]
+            order = np.argsort(shard, kind="stable")
+            bounds = np.searchsorted(shard[order], np.arange(n_shards + 1))
+            for i in np.flatnonzero(np.diff(bounds)).tolist():
+                if i not in files:
+                    files[i] = open(os.path.join(shard_dir, f"shard_{i:05d}.bin"), "wb")
+                rows[order[bounds[i]:bounds[i + 1]]].tofile(files[i])
+    finally:
+        for f in files.values():
+            f.close()
+        del spilled
+    paths = [os.path.join(shard_dir, f"shard_{i:05d}.bin") for i in range(n_shards)]
+    return paths, bool((candidate & ~has_pred).any())
+
+
+def _shard_task(
+    path: str, cfg: Dict[str, Any], threshold: int, fallback: bool, shares: Dict[str, Tuple[float, int]],
+    log_level: int = logging.INFO,
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    Worker side: run the three detectors over one shard file. Accounts are
+    global ranks throughout — code order within the shard is rank order —
+    and the result carries the volume of every account it mentions.
+    Logs at the parent's `log_level`.
+    """
+    logger.setLevel(log_level)
+    _sync_config(cfg)
+    ctx = RunContext()
+    ctx.shares = shares
+    with ctx.timed("graph"):
+        rows = np.fromfile(path, dtype=_SHARD_ROW)
+        accounts = np.unique(np.concatenate([rows["src"], rows["dst"]]))
+        code = _code_dtype(len(accounts))
+        graph = CompactGraph(
+            labels=accounts,        # ranks stand in for labels; detectors only read codes
+            tx_src=np.searchsorted(accounts, rows["src"]).astype(code),
+            tx_dst=np.searchsorted(accounts, rows["dst"]).astype(code),
+            tx_amount=rows["amount"].copy(),
+            tx_ts=rows["ts"].copy(),
+            tx_row=rows["row"].copy(),
+        )
+        del rows
+    ctx.count({"nodes": graph.n_nodes, "edges": graph.n_edges, "transactions": len(graph.tx_src)})
+    whitelist = graph.tx_count >= threshold
+
+    cycles = detect_circular_routing(graph, ctx)
+    with ctx.timed("smurfing"):
+        stats: Dict[str, int] = {}
+        hits = _smurf_window_hits(graph, whitelist, stats=stats)
+        ctx.count(stats)
+    chains = detect_layered_shells(graph, whitelist, ctx, fallback)
+
+    cycle_len, cycle_flat = _flatten(cycles)
+    chain_len, chain_flat = _flatten(chains)
+    mentioned = np.unique(np.concatenate([cycle_flat, hits["account"], chain_flat]))
+    hits["account"] = accounts[hits["account"]]
+    result = {
+        "cycle_len": cycle_len, "cycle_flat": accounts[cycle_flat],
+        "chain_len": chain_len, "chain_flat": accounts[chain_flat],
+        "hits": hits, "accounts": accounts[mentioned], "volume": graph.volume[mentioned],
+    }
+    return result, {"timings": ctx.timings, "counters": ctx.counters, "truncated": sorted(ctx.truncated)}
+
+
+def _split_lists(lengths: np.ndarray, flat: np.ndarray) -> List[List[int]]:
+    bounds = np.concatenate([[0], np.cumsum(lengths)]).tolist()
+    values = flat.tolist()
+    return [values[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+
+def run_sharded_analysis(chunks: Iterable[pd.DataFrame], ctx: Any = None) -> Dict[str, Any]:
+    """
+    run_full_analysis over a stream of transaction frames (e.g.
+    read_csv_chunks) without ever holding the whole graph: components are
+    analysed shard by shard on the process pool and merged in global account
+    order, so the response — RING_xxx numbering included — equals
+    run_full_analysis on the concatenated frames. Peak memory is about one
+    chunk in the parent plus DETECTOR_WORKERS shards of SHARD_MEMORY_MB.
+    Work budgets are split evenly across shards.
+    """
+    start = time.perf_counter()
+    ctx = ctx if ctx is not None else RunContext()
+    workers = max(1, CFG.DETECTOR_WORKERS)
+
+    with tempfile.TemporaryDirectory(prefix="muling_shards_", dir=CFG.SHARD_SPILL_DIR) as tmp:
+        _report(ctx, "graph", 0)
+        spill_path = os.path.join(tmp, "rows.bin")
+        with ctx.timed("scan"), open(spill_path, "wb") as spill:
+            scan = _scan_chunks(chunks, spill)
+        labels, parent = scan["labels"], scan["parent"]
+        total_accounts = len(labels)
+        ctx.count({"nodes": total_accounts, "transactions": scan["n_rows"]})
+
+        with ctx.timed("partition"):
+            order = np.argsort(labels, kind="stable")
+            rank = np.empty(total_accounts, dtype=np.int64)
+            rank[order] = np.arange(total_accounts)
+            labels = labels[order]
+            threshold = _merchant_threshold(scan["tx_count"])
+            candidate = scan["tx_count"] < threshold
+
+            roots, comp = np.unique(parent, return_inverse=True)
+            comp_rows = np.bincount(comp, weights=scan["out_rows"], minlength=len(roots)).astype(np.int64)
+            capacity = max(1, CFG.SHARD_MEMORY_MB * (1 << 20) // max(1, CFG.SHARD_ROW_BYTES))
+            capacity = min(capacity, max(1, -(-scan["n_rows"] // workers)))    # keep every worker busy
+            shard_of = _pack_shards(comp_rows, capacity)[comp]
+            del scan, parent, comp
+            paths, has_heads = _write_shards(spill_path, tmp, shard_of, rank, candidate)
+            os.remove(spill_path)
+        logger.info(
+            "Sharded: %d accounts in %d components, %d shards (≤ %d rows each unless one component is larger)",
+            total_accounts, len(roots), len(paths), capacity,
+        )
+        ctx.count({"components": len(roots), "shards": len(paths)})
+        _report(ctx, "graph", 1)
+
+        cfg = _config_values(CFG)
+        shares = {d: _budget(ctx, d).share(len(paths)) for d in ("cycles", "shells")}
+        pool = _process_pool(workers)
+        futures = {
+            pool.submit(_shard_task, path, cfg, threshold, not has_heads, shares, logger.getEffectiveLevel()): i
+            for i, path in enumerate(paths)
+        }
+        results: Dict[int, Dict[str, Any]] = {}
+        try:
+            for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                results[futures[future]], profile = future.result()
+                for stage, seconds in profile["timings"].items():
+                    ctx.add_time(stage, seconds)
+                ctx.count({k: v for k, v in profile["counters"].items() if k not in ("nodes", "transactions")})
+                ctx.truncated.update(profile["truncated"])
+                for stage in ("cycles", "smurfing", "shells"):
+                    _report(ctx, stage, done, len(paths))
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    # ── Merge in global account (rank) order ─────────────────────────────────
+    parts = [results[i] for i in range(len(paths))]
+    volume = np.zeros(total_accounts, dtype=np.float64)
+    for part in parts:
+        volume[part["accounts"]] = part["volume"]
+    cycles = sorted(c for part in parts for c in _split_lists(part["cycle_len"], part["cycle_flat"]))
+    chains = [c for part in parts for c in _split_lists(part["chain_len"], part["chain_flat"])]
+    chains.sort(key=lambda chain: chain[0])     # stable: a head's chains keep their order
+    hits = {key: np.concatenate([part["hits"][key] for part in parts]) for key in parts[0]["hits"]}
+    smurf_map = _smurf_flags(hits)
+    ctx.count({"smurf_accounts_flagged": len(smurf_map)})
+    logger.info(
+        "Sharded: %d cycles, %d smurf accounts, %d shell chains", len(cycles), len(smurf_map), len(chains),
+    )
+
+    results = _assemble_results(labels, cycles, smurf_map, chains, volume, total_accounts, start, ctx)
+    _record_analysis("sharded", results["timings"])
+    return results
+
+# =============================================================================
+# Incremental analysis — append batches, re-analyse only what they touch
+# =============================================================================
+
+class IncrementalAnalysis:
+    """
+    Detector state for a dataset that grows by appended batches.
+
+    The first frame is kept as an immutable CompactGraph (`base`); appended
+    rows live in delta arrays plus a small adjacency of new distinct edges.
+    Accounts are addressed by a global id — the base code, or n_base + k for
+    the k-th account first seen in a batch. An append re-runs each detector
+    only where the batch can change its output:
+
+    * cycles    — a new cycle must use a new distinct edge u→v (in temporal
+                  mode, any edge of the batch), so only nodes within
+                  CYCLE_MAX_LEN hops of both ends are searched;
+    * smurfing  — windows are recomputed for the batch's accounts and for
+                  accounts whose merchant-whitelist status flipped;
+    * shells    — chains are re-walked from heads that reach a changed
+                  account through shell interiors within SHELL_MAX_DEPTH.
+
+    Each local search runs the regular kernels on a CompactGraph of just that
+    neighbourhood, and scoring goes through _assemble_results, so the result
+    equals run_full_analysis on the concatenated frame. Once appended rows
+    exceed APPEND_COMPACT_FRACTION of the base, the Config changes, the
+    shell search has no heads to start from, or a work budget truncated the
+    state, it is rebuilt in full.
+    """
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        self._lock = threading.Lock()
+        self._frames = [df]
+        self._build(df)
+
+    # ── Full (re)build ────────────────────────────────────────────────────────
+
+    def _build(self, df: pd.DataFrame, ctx: Any = None) -> None:
+        _validate(df)
+        self.fingerprint = _config_fingerprint(CFG)
+        graph = CompactGraph.from_frame(df)
+        self.base = graph
+        self.n_base_rows = len(graph.tx_src)
+        self.new_labels: List[str] = []
+        self.new_ids: Dict[str, int] = {}
+        self.delta: Dict[str, np.ndarray] = {
+            "src": np.empty(0, dtype=np.int64), "dst": np.empty(0, dtype=np.int64),
+            "amount": np.empty(0, dtype=np.float64), "ts": np.empty(0, dtype=np.int64),
+            "row": np.empty(0, dtype=np.int64),
+        }
+        self.delta_succ: Dict[int, List[int]] = {}
+        self.delta_pred: Dict[int, List[int]] = {}
+        self.delta_edges: Set[Tuple[int, int]] = set()
+
+        self.counts = graph.tx_count.astype(np.int64)
+        self.volume = graph.volume.copy()
+        self.whitelist = self._whitelist_mask()
+        # candidate (non-whitelisted) predecessors per account; heads have none
+        self.cand_in_deg = np.bincount(graph.indices[~self.whitelist[graph.edge_src]], minlength=graph.n_nodes)
+
+        ctx = ctx if ctx is not None else RunContext()
+        self.cycles: List[Tuple[str, ...]] = []
+        self._cycle_set: Set[Tuple[str, ...]] = set()
+        self._add_cycles(graph, graph.labels, detect_circular_routing(graph, ctx))
+        # Detectors stopped by their work budget; the state is partial
+        self.truncated: Set[str] = set(ctx.truncated)
+
+        self.smurf_hits: Dict[Tuple[int, int], Tuple[int, float, int, int, int]] = {}
+        self._store_smurf_hits(_smurf_window_hits(graph, self.whitelist), np.arange(graph.n_nodes), None)
+
+        self.shell_chains: Dict[int, List[List[int]]] = {}
+        # Without any head the detector falls back to every candidate; such a
+        # state is rebuilt on each append instead of patched.
+        self.shell_fallback = not self._has_shell_heads()
+        budget = _budget(ctx, "shells")
+        chains, _ = _shell_chains_from_heads(
+            graph, self.whitelist, _shell_heads(graph, self.whitelist), budget=budget,
+        )
+        self._check_budget(ctx, "shells", budget)
+        self._store_shell_chains(chains, np.arange(graph.n_nodes))
+        self._result: Optional[Dict[str, Any]] = None
+
+    # ── Public API ────────────────────────────────────────────────────────────
+
+    @property
+    def n_accounts(self) -> int:
+        return self.base.n_nodes + len(self.new_labels)
+
+    @property
+    def n_rows(self) -> int:
+        return self.n_base_rows + len(self.delta["row"])
+
+    def frame(self) -> pd.DataFrame:
+        """The full dataset — base plus every appended batch."""
+        with self._lock:
+            if len(self._frames) > 1:
+                self._frames = [_concat_frames(self._frames)]
+            return self._frames[0]
+
+    def result(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._result is None:
+                self._result = self._assemble(time.perf_counter())
+            return self._result
+
+    def append(self, batch: pd.DataFrame) -> Tuple[Dict[str, Any], int]:
+        """Add `batch` after the existing rows; returns (results, accounts re-analysed)."""
+        _validate(batch)
+        start = time.perf_counter()
+        ctx = RunContext()
+        with self._lock:
+            self._frames.append(batch)
+            pending = len(self.delta["row"]) + len(batch)
+            if (
+                self.fingerprint != _config_fingerprint(CFG)
+                or self.shell_fallback
+                or self.truncated
+                or pending > CFG.APPEND_COMPACT_FRACTION * self.n_base_rows
+                or not self._apply(batch, ctx)
+            ):
+                self._frames = [_concat_frames(self._frames)]
+                self._build(self._frames[0], ctx)
+                reanalysed = self.n_accounts
+                logger.info("Append: rebuilt state over %d rows", self.n_rows)
+            else:
+                reanalysed = self._reanalysed
+            ctx.add_time("append", time.perf_counter() - start)
+            ctx.count({"transactions_appended": len(batch), "accounts_reanalysed": reanalysed})
+            self._result = self._assemble(start, ctx)
+        _record_analysis("append", self._result["timings"])
+        return self._result, reanalysed
+
+    # ── Account ids ───────────────────────────────────────────────────────────
+
+    def _intern(self, labels: np.ndarray) -> np.ndarray:
+        """Global ids for account labels, registering unseen ones as new accounts."""
+        uniques, inverse = np.unique(labels, return_inverse=True)
+        for label in uniques.tolist():
+            if label not in self.new_ids and not self._in_base(label):
+                self.new_ids[label] = self.n_accounts
+                self.new_labels.append(label)
+        return self._lookup(uniques)[inverse]
+
+    def _in_base(self, label: str) -> bool:
+        i = int(self.base.labels.searchsorted(label))
+        return i < self.base.n_nodes and self.base.labels[i] == label
+
+    def _lookup(self, labels: np.ndarray) -> np.ndarray:
+        """Global ids of known account labels."""
+        base_labels = self.base.labels
+        pos = base_labels.searchsorted(labels)
+        found = pos < len(base_labels)
+        found[found] = base_labels[pos[found]] == labels[found]
+        ids = pos.astype(np.int64)
+        for i in np.flatnonzero(~found).tolist():
+            ids[i] = self.new_ids[labels[i]]
+        return ids
+
+    def _labels(self, gids: np.ndarray) -> np.ndarray:
+        n_base = self.base.n_nodes
+        out = np.empty(len(gids), dtype=object)
+        is_base = gids < n_base
+        out[is_base] = self.base.labels[gids[is_base]]
+        if not is_base.all():
+            out[~is_base] = np.array(self.new_labels, dtype=object)[gids[~is_base] - n_base]
+        return out
+
+    # ── Merged adjacency (base CSR + delta edges) ─────────────────────────────
+
+    def _successors(self, node: int) -> List[int]:
+        base = self.base.successors(node).tolist() if node < self.base.n_nodes else []
+        return base + self.delta_succ.get(node, [])
+
+    def _predecessors(self, node: int) -> List[int]:
+        base = self.base.predecessors(node).tolist() if node < self.base.n_nodes else []
+        return base + self.delta_pred.get(node, [])
+
+    def _has_edge(self, u: int, v: int) -> bool:
+        if (u, v) in self.delta_edges:
+            return True
+        n_base = self.base.n_nodes
+        if u >= n_base or v >= n_base:
+            return False
+        succ = self.base.successors(u)
+        i = int(np.searchsorted(succ, v))
+        return i < len(succ) and succ[i] == v
+
+    def _local_graph(
+        self,
+        src: np.ndarray,
+        dst: np.ndarray,
+        amount: np.ndarray,
+        ts: np.ndarray,
+        row: np.ndarray,
+        extra: Optional[np.ndarray] = None,
+    ) -> Tuple[CompactGraph, np.ndarray]:
+        """
+        CompactGraph over a subset of rows (plus `extra` isolated accounts),
+        coded in global label order; also returns local code → global id.
+        """
+        nodes = np.concatenate([src, dst] if extra is None else [src, dst, extra])
+        gids, inverse = np.unique(nodes, return_inverse=True)
+        labels = self._labels(gids)
+        order = np.argsort(labels, kind="stable")
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        codes = rank[inverse]
+        n = len(src)
+        graph = CompactGraph(labels[order], codes[:n], codes[n:2 * n], amount, ts, row)
+        return graph, gids[order]
+
+    def _rows_graph(self, accounts: np.ndarray, internal: bool = False) -> Tuple[CompactGraph, np.ndarray]:
+        """Local graph of every row touching `accounts` — only rows between them if `internal`."""
+        base = self.base
+        base_rows = base.rows_of(accounts[accounts < base.n_nodes])
+        d = self.delta
+        if internal:
+            inside = np.isin(base.tx_src[base_rows], accounts) & np.isin(base.tx_dst[base_rows], accounts)
+            base_rows = base_rows[inside]
+            in_delta = np.isin(d["src"], accounts) & np.isin(d["dst"], accounts)
+        else:
+            in_delta = np.isin(d["src"], accounts) | np.isin(d["dst"], accounts)
+        return self._local_graph(
+            np.concatenate([base.tx_src[base_rows].astype(np.int64), d["src"][in_delta]]),
+            np.concatenate([base.tx_dst[base_rows].astype(np.int64), d["dst"][in_delta]]),
+            np.concatenate([base.tx_amount[base_rows], d["amount"][in_delta]]),
+            np.concatenate([base.tx_ts[base_rows], d["ts"][in_delta]]),
+            np.concatenate([base.tx_row[base_rows], d["row"][in_delta]]),
+        )
+
+    def _edge_graph(
+        self, edges: List[Tuple[int, int]], extra: Optional[np.ndarray] = None,
+    ) -> Tuple[CompactGraph, np.ndarray]:
+        """Local graph with one placeholder transaction per distinct edge."""
+        pairs = np.array(edges, dtype=np.int64).reshape(-1, 2)
+        n = len(pairs)
+        zeros = np.zeros(n, dtype=np.int64)
+        return self._local_graph(
+            pairs[:, 0], pairs[:, 1], zeros.astype(np.float64), zeros, np.arange(n), extra,
+        )
+
+    def _whitelist_mask(self) -> np.ndarray:
+        return _merchant_mask(self.counts)
+
+    def _has_shell_heads(self) -> bool:
+        return bool(np.any(~self.whitelist & (self.cand_in_deg == 0)))
+
+    # ── Append ────────────────────────────────────────────────────────────────
+
+    def _apply(self, batch: pd.DataFrame, ctx: Any = None) -> bool:
+        """Fold `batch` into the state; False if a full rebuild is needed instead."""
+        n_batch = len(batch)
+        ids = self._intern(
+            pd.concat([batch["sender_id"], batch["receiver_id"]], ignore_index=True)
+            .astype(str).fillna("nan").to_numpy(dtype=object)
+        )
+        src, dst = ids[:n_batch], ids[n_batch:]
+        ts = pd.to_datetime(batch["timestamp"], utc=True, errors="coerce")
+        rows = {
+            "src": src, "dst": dst,
+            "amount": batch["amount"].to_numpy(dtype=np.float64),
+            "ts": ts.dt.as_unit("ns").to_numpy(dtype="datetime64[ns]").view(np.int64),
+            "row": np.arange(self.n_rows, self.n_rows + n_batch, dtype=np.int64),
+        }
+
+        grow = self.n_accounts - len(self.counts)
+        self.counts = np.concatenate([self.counts, np.zeros(grow, dtype=np.int64)])
+        self.volume = np.concatenate([self.volume, np.zeros(grow)])
+        self.whitelist = np.concatenate([self.whitelist, np.zeros(grow, dtype=bool)])
+        self.cand_in_deg = np.concatenate([self.cand_in_deg, np.zeros(grow, dtype=self.cand_in_deg.dtype)])
+        old_candidate = ~self.whitelist
+        old_interior = old_candidate & (self.counts <= CFG.SHELL_MAX_TX_PER_NODE)
+
+        self.delta = {key: np.concatenate([self.delta[key], rows[key]]) for key in self.delta}
+        np.add.at(self.counts, src, 1)
+        np.add.at(self.counts, dst, 1)
+
+        new_edges: List[Tuple[int, int]] = []
+        for u, v in sorted(set(zip(src.tolist(), dst.tolist()))):
+            if not self._has_edge(u, v):
+                self.delta_edges.add((u, v))
+                self.delta_succ.setdefault(u, []).append(v)
+                self.delta_pred.setdefault(v, []).append(u)
+                new_edges.append((u, v))
+                if old_candidate[u]:
+                    self.cand_in_deg[v] += 1
+
+        whitelist = self._whitelist_mask()
+        flipped = np.flatnonzero(whitelist != self.whitelist)
+        for x in flipped.tolist():
+            step = -1 if whitelist[x] else 1
+            for y in self._successors(x):
+                self.cand_in_deg[y] += step
+        self.whitelist = whitelist
+        if not self._has_shell_heads():
+            return False
+
+        changed = np.union1d(np.union1d(src, dst), flipped)
+        if CFG.CYCLE_MODE == "temporal":
+            new_edges = sorted(set(zip(src.tolist(), dst.tolist())))
+        self._update_cycles(new_edges, ctx)
+        self._update_rows(changed)
+        self._update_shells(changed, flipped, old_candidate, old_interior, ctx)
+        self._reanalysed = len(changed)
+        return True
+
+    def _ball(self, node: int, radius: int, neighbours: Callable[[int], List[int]]) -> Dict[int, int]:
+        dist = {node: 0}
+        frontier = [node]
+        for d in range(1, radius + 1):
+            nxt = []
+            for x in frontier:
+                for y in neighbours(x):
+                    if y not in dist:
+                        dist[y] = d
+                        nxt.append(y)
+            frontier = nxt
+        return dist
+
+    def _update_cycles(self, new_edges: List[Tuple[int, int]], ctx: Any = None) -> None:
+        """
+        Search the neighbourhood of every new distinct edge for new cycles. In
+        temporal mode `new_edges` is every edge the batch used — a transfer on
+        a known edge can complete a time-respecting loop — and the local graph
+        carries the real rows between those accounts.
+        """
+        hops = CFG.CYCLE_MAX_LEN - 1       # a cycle through u→v returns v→…→u in ≤ hops
+        nodes: Set[int] = set()
+        for u, v in new_edges:
+            if u == v:
+                continue
+            forward = self._ball(v, hops - 1, self._successors)
+            backward = self._ball(u, hops - 1, self._predecessors)
+            nodes.update(w for w, d in forward.items() if d + backward.get(w, hops) <= hops)
+            nodes.update((u, v))
+        if len(nodes) < CFG.CYCLE_MIN_LEN:
+            return
+        if CFG.CYCLE_MODE == "temporal":
+            graph, gids = self._rows_graph(np.array(sorted(nodes), dtype=np.int64), internal=True)
+        else:
+            graph, gids = self._edge_graph([(x, y) for x in nodes for y in self._successors(x) if y in nodes])
+        found: List[List[int]] = []
+        budget = _budget(ctx, "cycles")
+        for component in _cycle_components(graph):
+            found.extend(_cycles_in_component(graph, component, budget=budget))
+            if budget.exhausted:
+                break
+        self._check_budget(ctx, "cycles", budget)
+        self._add_cycles(graph, self._labels(gids), found)
+
+    def _check_budget(self, ctx: Any, detector: str, budget: WorkBudget) -> None:
+        if budget.exhausted:
+            self.truncated.add(detector)
+            _mark_truncated(ctx, detector)
+
+    def _add_cycles(self, graph: CompactGraph, labels: np.ndarray, found: List[List[int]]) -> None:
+        for cycle in found:
+            key = tuple(labels[cycle].tolist())
+            if key not in self._cycle_set:
+                self._cycle_set.add(key)
+                bisect.insort(self.cycles, key)
+
+    def _update_rows(self, changed: np.ndarray) -> None:
+        """Exact volumes and smurf windows for `changed`, from every row they touch."""
+        graph, gids = self._rows_graph(changed)
+        # Same row order and bincount as the full build, so volumes match bit for bit
+        is_changed = np.isin(gids, changed)
+        self.volume[gids[is_changed]] = graph.volume[is_changed]
+
+        for gid in changed.tolist():
+            self.smurf_hits.pop((0, gid), None)
+            self.smurf_hits.pop((1, gid), None)
+        self._store_smurf_hits(_smurf_window_hits(graph, self.whitelist[gids]), gids, changed)
+
+    def _store_smurf_hits(
+        self, hits: Dict[str, np.ndarray], gids: np.ndarray, only: Optional[np.ndarray],
+    ) -> None:
+        accounts = gids[hits["account"]]
+        keep = np.ones(len(accounts), dtype=bool) if only is None else np.isin(accounts, only)
+        for i in np.flatnonzero(keep).tolist():
+            self.smurf_hits[(int(hits["direction"][i]), int(accounts[i]))] = (
+                int(hits["fan_count"][i]), float(hits["amount"][i]), int(hits["window_start"][i]),
+                int(hits["first_ts"][i]), int(hits["first_row"][i]),
+            )
+
+    def _update_shells(
+        self,
+        changed: np.ndarray,
+        flipped: np.ndarray,
+        old_candidate: np.ndarray,
+        old_interior: np.ndarray,
+        ctx: Any = None,
+    ) -> None:
+        """Re-walk chains from every head whose search could see a changed account."""
+        candidate = ~self.whitelist
+        interior = (candidate & (self.counts <= CFG.SHELL_MAX_TX_PER_NODE)) | old_interior
+        # Reverse walk: a head reaches x only through shell interiors
+        seen = {x for x in changed.tolist() if candidate[x] or old_candidate[x]}
+        frontier = list(seen)
+        for _ in range(CFG.SHELL_MAX_DEPTH - 1):
+            nxt = []
+            for x in frontier:
+                for p in self._predecessors(x):
+                    if p not in seen:
+                        seen.add(p)
+                        if interior[p]:
+                            nxt.append(p)
+            frontier = nxt
+        for x in flipped.tolist():
+            seen.update(self._successors(x))    # their head status may have changed
+
+        for x in seen:
+            self.shell_chains.pop(x, None)
+        heads = sorted(x for x in seen if candidate[x] and self.cand_in_deg[x] == 0)
+        if not heads:
+            return
+
+        # Forward closure of the walk: every edge the DFS can expand
+        is_head = set(heads)
+        depth = {h: 0 for h in heads}
+        frontier = list(heads)
+        edges: List[Tuple[int, int]] = []
+        while frontier:
+            nxt = []
+            for x in frontier:
+                if depth[x] + 1 >= CFG.SHELL_MAX_DEPTH or not (x in is_head or interior[x]):
+                    continue
+                for y in self._successors(x):
+                    if candidate[y]:
+                        edges.append((x, y))
+                        if y not in depth:
+                            depth[y] = depth[x] + 1
+                            nxt.append(y)
+            frontier = nxt
+
+        graph, gids = self._edge_graph(edges, extra=np.array(heads, dtype=np.int64))
+        graph.tx_count = self.counts[gids]          # interior test needs the global totals
+        code = {g: c for c, g in enumerate(gids.tolist())}
+        budget = _budget(ctx, "shells")
+        chains, _ = _shell_chains_from_heads(
+            graph, self.whitelist[gids], sorted(code[h] for h in heads), budget=budget,
+        )
+        self._check_budget(ctx, "shells", budget)
+        self._store_shell_chains(chains, gids)
+
+    def _store_shell_chains(self, chains: List[List[int]], gids: np.ndarray) -> None:
+        for chain in chains:
+            self.shell_chains.setdefault(int(gids[chain[0]]), []).append(gids[chain].tolist())
+
+    # ── Results ───────────────────────────────────────────────────────────────
+
+    def _smurf_map(self) -> Dict[int, Dict[str, Any]]:
+        if not self.smurf_hits:
+            return {}
+        keys = np.array(list(self.smurf_hits), dtype=np.int64)
+        values = list(zip(*self.smurf_hits.values()))
+        return _smurf_flags({
+            "direction": keys[:, 0], "account": keys[:, 1],
+            "fan_count": np.array(values[0], dtype=np.int64),
+            "amount": np.array(values[1], dtype=np.float64),
+            "window_start": np.array(values[2], dtype=np.int64),
+            "first_ts": np.array(values[3], dtype=np.int64),
+            "first_row": np.array(values[4], dtype=np.int64),
+        })
+
+    def _assemble(self, start: float, ctx: Any = None) -> Dict[str, Any]:
+        ctx = ctx if ctx is not None else RunContext()
+        ctx.truncated |= self.truncated
+        smurf = self._smurf_map()
+        heads = np.array(sorted(self.shell_chains), dtype=np.int64)
+        head_order = heads[np.argsort(self._labels(heads), kind="stable")].tolist()
+        chains = [c for h in head_order for c in self.shell_chains[h]]
+
+        # Cycles are kept as label tuples; score them by global id
+        cycle_len = [len(c) for c in self.cycles]
+        cycle_ids = self._lookup(np.array([a for c in self.cycles for a in c], dtype=object)).tolist()
+        bounds = np.concatenate([[0], np.cumsum(cycle_len, dtype=np.int64)]).tolist()
+        cycles = [cycle_ids[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+        labels = np.concatenate([self.base.labels, np.array(self.new_labels, dtype=object)])
+        return _assemble_results(labels, cycles, smurf, chains, self.volume, self.n_accounts, start, ctx)
+
+# =============================================================================
+# Parameter sweep — many Config points over one graph and one cycle search
+# =============================================================================
+
+def _sweep_points(grid: Dict[str, List[Any]], base: Config) -> List[Dict[str, Any]]:
+    """
+    Every combination of `grid` (setting → values) as an override dict, the
+    last setting varying fastest. Values take the type of the setting in
+    `base`; only SWEEP_PARAMETERS may be swept, at most SWEEP_MAX_POINTS
+    combinations. Invalid grids raise ValueError.
+    """
+    for name, values in grid.items():
+        if name not in base.SWEEP_PARAMETERS:
+            raise ValueError(f"{name} cannot be swept — choose from {', '.join(base.SWEEP_PARAMETERS)}.")
+        if not values:
+            raise ValueError(f"No values given for {name}.")
+        if any(v < 0 for v in values) or (name == "MERCHANT_PERCENTILE" and any(v > 100 for v in values)):
+            raise ValueError(f"Out-of-range value for {name}.")
+        if isinstance(getattr(base, name), int) and any(v != int(v) for v in values):
+            raise ValueError(f"{name} takes whole numbers.")
+    size = math.prod(len(values) for values in grid.values())
+    if size > base.SWEEP_MAX_POINTS:
+        raise ValueError(f"Grid has {size} points; at most {base.SWEEP_MAX_POINTS} are evaluated per request.")
+    cast = {name: type(getattr(base, name)) for name in grid}
+    return [
+        {name: cast[name](value) for name, value in zip(grid, combo)}
+        for combo in itertools.product(*grid.values())
+    ]
+
+
+def _sweep_point(
+    labels: np.ndarray,
+    volume: np.ndarray,
+    cycle_len: np.ndarray,
+    cycle_flat: np.ndarray,
+    smurf_map: Dict[int, Dict[str, Any]],
+    chain_len: np.ndarray,
+    chain_flat: np.ndarray,
+    shell_flat: np.ndarray,
+) -> Dict[str, Any]:
+    """
+    Summary row of one grid point from its detector output, under the active
+    CFG — the counts, scores and ring numbering _assemble_results would give,
+    without building the records.
+    """
+    n = len(labels)
+    smurf_codes = np.fromiter(smurf_map, dtype=np.int64, count=len(smurf_map))
+    in_cycle = np.zeros(n, dtype=bool)
+    in_cycle[cycle_flat] = True
+    in_smurf = np.zeros(n, dtype=bool)
+    in_smurf[smurf_codes] = True
+    in_shell = np.zeros(n, dtype=bool)
+    in_shell[shell_flat] = True
+
+    if CFG.RING_MODE == "grouped":
+        n_rings = _ring_groups(cycle_len, cycle_flat, n)[1] + _ring_groups(chain_len, chain_flat, n)[1]
+    else:
+        n_rings = len(cycle_len) + len(chain_len)
+    n_rings += int(np.count_nonzero(~(in_cycle | in_shell)[smurf_codes]))
+
+    flagged = np.unique(np.concatenate([cycle_flat, smurf_codes, shell_flat]))
+    scores = _scores(in_cycle[flagged], in_smurf[flagged], in_shell[flagged], volume[flagged].astype(np.float64))
+    top = _score_order(labels[flagged], scores)[:CFG.SWEEP_TOP_ACCOUNTS]
+    return {
+        "suspicious_accounts_flagged": len(flagged),
+        "fraud_rings_detected": n_rings,
+        "pattern_accounts": {
+            "cycle": int(in_cycle.sum()), "smurfing": len(smurf_codes), "layered_shells": int(in_shell.sum()),
+        },
+        "score_mean": round(float(scores.mean()), 2) if len(scores) else 0.0,
+        "score_histogram": np.histogram(scores, bins=10, range=(0.0, 100.0))[0].tolist(),
+        "top_accounts": [
+            {"account_id": labels[flagged[i]], "suspicion_score": float(scores[i])} for i in top.tolist()
+        ],
+    }
+
+
+def run_parameter_sweep(graph: CompactGraph, points: List[Dict[str, Any]], ctx: Any = None) -> Dict[str, Any]:
+    """
+    One summary row per grid point (Config overrides on top of the run's
+    Config), sharing the expensive work between points:
+
+    * cycles are searched once, from the smallest CYCLE_MIN_LEN to the largest
+      CYCLE_MAX_LEN in the grid, and each point keeps the lengths in its range;
+    * smurf rows are sorted once and window counts taken once per distinct
+      SMURF_WINDOW_HOURS — each point thresholds them for its own whitelist;
+    * whitelists are built per distinct (MERCHANT_PERCENTILE, MERCHANT_MIN_TX)
+      and shell chains searched per distinct (whitelist, SHELL_MAX_TX_PER_NODE).
+
+    Only scoring runs per point. Each row's counts and top accounts are those
+    a full analysis under that point's Config reports.
+    """
+    start = time.perf_counter()
+    ctx = ctx if ctx is not None else RunContext()
+    base = ctx.config
+    configs = [base.replace(**point) for point in points]
+    ctx.count({"nodes": graph.n_nodes, "edges": graph.n_edges, "transactions": len(graph.tx_src)})
+    _report(ctx, "graph", 1)
+
+    widest = base.replace(
+        CYCLE_MIN_LEN=min(cfg.CYCLE_MIN_LEN for cfg in configs),
+        CYCLE_MAX_LEN=max(cfg.CYCLE_MAX_LEN for cfg in configs),
+    )
+    with use_config(widest):
+        cycle_len, cycle_flat = _flatten(detect_circular_routing(graph, ctx))
+
+    with ctx.timed("whitelist"):
+        whitelists: Dict[Tuple[float, int], np.ndarray] = {}
+        for cfg in configs:
+            key = (cfg.MERCHANT_PERCENTILE, cfg.MERCHANT_MIN_TX)
+            if key not in whitelists:
+                with use_config(cfg):
+                    whitelists[key] = _merchant_mask(graph.tx_count)
+
+    with ctx.timed("smurfing"):
+        group, counterpart, row = _smurf_rows(graph)
+        ts_sorted = graph.tx_ts[row]
+        windows = {
+            hours: _window_distinct_counts(group, counterpart, ts_sorted, int(pd.Timedelta(hours=hours).value))
+            for hours in sorted({cfg.SMURF_WINDOW_HOURS for cfg in configs})
+        }
+        ctx.count({"smurf_windows_scanned": len(group) * len(windows)})
+        smurfs: Dict[Tuple[Any, ...], Dict[int, Dict[str, Any]]] = {}
+        for cfg in configs:
+            wl = (cfg.MERCHANT_PERCENTILE, cfg.MERCHANT_MIN_TX)
+            key = (wl, cfg.SMURF_WINDOW_HOURS, cfg.SMURF_MIN_COUNTERPARTIES)
+            if key not in smurfs:
+                left, distinct = windows[cfg.SMURF_WINDOW_HOURS]
+                smurfs[key] = _smurf_flags(_smurf_hits(
+                    graph, group, row, left, distinct, cfg.SMURF_MIN_COUNTERPARTIES, whitelists[wl],
+                ))
+    _report(ctx, "smurfing", 1)
+
+    shells: Dict[Tuple[Any, ...], Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+    for cfg in configs:
+        wl = (cfg.MERCHANT_PERCENTILE, cfg.MERCHANT_MIN_TX)
+        key = (wl, cfg.SHELL_MAX_TX_PER_NODE)
+        if key not in shells:
+            with use_config(cfg):
+                chain_len, chain_flat = _flatten(detect_layered_shells(graph, whitelists[wl], ctx))
+            chain_pos = np.arange(len(chain_flat)) - np.repeat(np.cumsum(chain_len) - chain_len, chain_len)
+            interior = (chain_pos > 0) & (chain_pos < np.repeat(chain_len - 1, chain_len))
+            shells[key] = (chain_len, chain_flat, chain_flat[interior])
+
+    rows: List[Dict[str, Any]] = []
+    with ctx.timed("scoring"):
+        for i, (point, cfg) in enumerate(zip(points, configs)):
+            _report(ctx, "scoring", i, len(points))
+            wl = (cfg.MERCHANT_PERCENTILE, cfg.MERCHANT_MIN_TX)
+            in_range = (cycle_len >= cfg.CYCLE_MIN_LEN) & (cycle_len <= cfg.CYCLE_MAX_LEN)
+            with use_config(cfg):
+                summary = _sweep_point(
+                    graph.labels, graph.volume, cycle_len[in_range], cycle_flat[np.repeat(in_range, cycle_len)],
+                    smurfs[(wl, cfg.SMURF_WINDOW_HOURS, cfg.SMURF_MIN_COUNTERPARTIES)],
+                    *shells[(wl, cfg.SHELL_MAX_TX_PER_NODE)],
+                )
+            rows.append({"parameters": point, **summary})
+    _report(ctx, "scoring", 1)
+
+    elapsed = time.perf_counter() - start
+    ctx.add_time("total", elapsed)
+    logger.info("Sweep: %d points in %.4fs", len(points), elapsed)
+    _record_analysis("sweep", ctx.profile())
+    return {
+        "points": rows,
+        "summary": {
+            "total_accounts_analyzed": graph.n_nodes,
+            "grid_points": len(points),
+            "cycle_searches": 1,
+            "smurf_window_passes": len(windows),
+            "shell_searches": len(shells),
+            "processing_time_seconds": round(elapsed, 4),
+            "truncated_detectors": sorted(ctx.truncated),
+        },
+        "timings": ctx.profile(),
+    }
+
+# =============================================================================
+# CSV ingestion — streamed in chunks with compact dtypes
+# =============================================================================
+
+class _HashingReader(io.RawIOBase):
+    """Raw stream wrapper that feeds every byte read through SHA-256."""
+
+    def __init__(self, raw: BinaryIO) -> None:
+        self._raw = raw
+        self.sha256 = hashlib.sha256()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        data = self._raw.read(len(buffer))
+        n = len(data)
+        buffer[:n] = data
+        self.sha256.update(data)
+        return n
+
+
+def _peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:     # not available on Windows
+        return 0.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0   # KiB on Linux
+
+
+def read_header(raw: BinaryIO) -> List[str]:
+    """Column names from the first line; rewinds the stream afterwards."""
+    first = raw.readline()
+    raw.seek(0)
+    return next(csv.reader([first.decode("utf-8-sig", errors="replace")]), [])
+
+
+def ingest_csv(raw: BinaryIO) -> Tuple[pd.DataFrame, str]:
+    """
+    Parse a seekable CSV stream chunk by chunk into the engine's compact frame.
+
+    Only REQUIRED_COLUMNS are kept. IDs are stripped per chunk; sender and
+    receiver become categoricals over one shared category set (interned
+    account IDs), amounts float64 and timestamps datetime64[ns, UTC]
+    (unparseable → NaT). Returns (frame, sha256 of the raw bytes) — the hash is
+    computed on the same single pass over the stream. Each chunk is encoded
+    and dropped before the next is read, so peak memory stays near the size
+    of the compact result.
+    """
+    hashing = _HashingReader(raw)
+    builder = _FrameBuilder()
+    for chunk in read_csv_chunks(io.BufferedReader(hashing, buffer_size=CFG.UPLOAD_READ_BYTES)):
+        builder.add(chunk)
+    return builder.frame(), hashing.sha256.hexdigest()
+
+
+def read_csv_chunks(stream: BinaryIO) -> Iterator[pd.DataFrame]:
+    """The compact frames ingest_csv stacks, one per UPLOAD_CHUNK_ROWS rows."""
+    dtypes = {col: str for col in CFG.ID_COLUMNS}
+    dtypes.update(amount="float64", timestamp=str)
+    for chunk in pd.read_csv(
+        stream, usecols=sorted(CFG.REQUIRED_COLUMNS), dtype=dtypes, chunksize=CFG.UPLOAD_CHUNK_ROWS,
+    ):
+        yield _compact_chunk(chunk)
+
+
+def read_parquet_chunks(path: str) -> Iterator[pd.DataFrame]:
+    """
+    read_csv_chunks for a Parquet file: the same compact frames, one per
+    UPLOAD_CHUNK_ROWS rows. IDs of any type become strings; timestamps may be
+    stored as timestamps or as text.
+    """
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(path)
+    missing = CFG.REQUIRED_COLUMNS - set(parquet.schema_arrow.names)
+    if missing:
+        raise ValueError(f"Missing required columns: {sorted(missing)}")
+    for batch in parquet.iter_batches(batch_size=CFG.UPLOAD_CHUNK_ROWS, columns=sorted(CFG.REQUIRED_COLUMNS)):
+        chunk = batch.to_pandas()
+        for col in CFG.ID_COLUMNS:
+            chunk[col] = chunk[col].astype(str).where(chunk[col].notna())
+        chunk["amount"] = pd.to_numeric(chunk["amount"], errors="coerce").astype("float64")
+        yield _compact_chunk(chunk)
+
+
+def read_transaction_chunks(path: str) -> Iterator[pd.DataFrame]:
+    """Compact frames of a CSV or Parquet (.parquet / .pq) file on disk."""
+    if path.lower().endswith((".parquet", ".pq")):
+        yield from read_parquet_chunks(path)
+        return
+    with open(path, "rb") as raw:
+        missing = CFG.REQUIRED_COLUMNS - set(read_header(raw))
+        if missing:
+            raise ValueError(f"Missing required columns: {sorted(missing)}")
+        yield from read_csv_chunks(raw)
+
+
+def read_transactions(path: str) -> pd.DataFrame:
+    """The compact frame of a CSV or Parquet file on disk."""
+    builder = _FrameBuilder()
+    for chunk in read_transaction_chunks(path):
+        builder.add(chunk)
+    if not builder.n_chunks:
+        raise ValueError("File contains no data rows.")
+    return builder.frame()
+
+
+def _compact_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Stripped string IDs, categorical sender/receiver, UTC nanosecond timestamps."""
+    for col in CFG.ID_COLUMNS:
+        # Missing IDs become the literal "nan", as astype(str) always produced
+        chunk[col] = chunk[col].fillna("nan").str.strip()
+    chunk["sender_id"] = chunk["sender_id"].astype("category")
+    chunk["receiver_id"] = chunk["receiver_id"].astype("category")
+    chunk["timestamp"] = pd.to_datetime(chunk["timestamp"], utc=True, errors="coerce").dt.as_unit("ns")
+    return chunk
+
+
+def _concat_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Stack compact frames, re-interning sender/receiver over one shared category set."""
+    builder = _FrameBuilder()
+    for frame in frames:
+        builder.add(frame)
+    return builder.frame()
+
+
+class _FrameBuilder:
+    """
+    Accumulates compact frames as plain arrays: sender/receiver as codes into
+    one growing table of interned account IDs, the other columns as copies.
+    A frame can be dropped as soon as it is added. `frame()` stacks the
+    pieces with the accounts re-coded in sorted order.
+    """
+
+    def __init__(self) -> None:
+        self._accounts: Dict[str, int] = {}
+        self._ids: List[pd.Series] = []
+        self._parts: Dict[str, List[np.ndarray]] = {"sender_id": [], "receiver_id": [], "amount": [], "timestamp": []}
+
+    @property
+    def n_chunks(self) -> int:
+        return len(self._parts["amount"])
+
+    def add(self, frame: pd.DataFrame) -> None:
+        for col in ("sender_id", "receiver_id"):
+            self._parts[col].append(self._codes(frame[col]))
+        # Copies, so no block of the source frame outlives it
+        self._ids.append(frame["transaction_id"].reset_index(drop=True).copy())
+        self._parts["amount"].append(frame["amount"].to_numpy(dtype="float64", copy=True))
+        self._parts["timestamp"].append(frame["timestamp"].to_numpy(dtype="datetime64[ns]", copy=True))
+
+    def _codes(self, column: pd.Series) -> np.ndarray:
+        if not isinstance(column.dtype, pd.CategoricalDtype):
+            column = column.astype("category")
+        categories = column.cat.categories
+        lookup = np.fromiter(
+            (self._accounts.setdefault(label, len(self._accounts)) for label in categories),
+            dtype=np.int32, count=len(categories),
+        )
+        # Trailing -1 keeps missing values (code -1) missing
+        return np.append(lookup, -1).astype(np.int32)[column.cat.codes.to_numpy()]
+
+    def frame(self) -> pd.DataFrame:
+        labels = np.array(list(self._accounts), dtype=object)
+        order = np.argsort(labels, kind="stable")
+        rank = np.empty(len(labels) + 1, dtype=np.int32)
+        rank[order] = np.arange(len(labels), dtype=np.int32)
+        rank[-1] = -1
+        accounts = pd.Index(labels[order])
+
+        def stacked(col: str, dtype: Any) -> np.ndarray:
+            parts = self._parts[col]
+            return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+        return pd.DataFrame({
+            "transaction_id": pd.concat(self._ids, ignore_index=True) if self._ids else pd.Series([], dtype=object),
+            "sender_id": pd.Categorical.from_codes(rank[stacked("sender_id", np.int32)], categories=accounts),
+            "receiver_id": pd.Categorical.from_codes(rank[stacked("receiver_id", np.int32)], categories=accounts),
+            "amount": stacked("amount", "float64"),
+            "timestamp": pd.Series(stacked("timestamp", "datetime64[ns]")).dt.tz_localize("UTC"),
+        })
+
+# =============================================================================
+# Analysis cache — one result per (dataset content hash, Config fingerprint)
+# =============================================================================
+
+def _config_fingerprint(cfg: Config, overrides: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Stable hash of every tunable constant, so a Config change misses the
+    cache. Per-request `overrides` replace the matching constants.
+    """
+    blob = json.dumps({**_config_values(cfg), **(overrides or {})}, sort_keys=True, default=sorted)
+    return hashlib.sha256(blob.encode()).hexdigest()[:16]
+
+
+class AnalysisCache:
+    """
+    LRU of run_full_analysis results keyed by (dataset hash, config fingerprint).
+    Cached dicts are shared between requests and must be treated as read-only.
+    Also holds derived views, under longer keys that start with the same pair.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, ...], Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, ...]) -> Any:
+        with self._lock:
+            results = self._entries.get(key)
+            if results is not None:
+                self._entries.move_to_end(key)
+            return results
+
+    def put(self, key: Tuple[str, ...], results: Any) -> None:
+        with self._lock:
+            self._entries[key] = results
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, dataset_hash: str) -> None:
+        """Drop every cached result computed from `dataset_hash`."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == dataset_hash]:
+                del self._entries[key]
+
+
+def _filter_min_score(results: Dict[str, Any], min_score: float, timings: bool = False) -> Dict[str, Any]:
+    """
+    Shallow copy of `results` with suspicious_accounts below min_score dropped;
+    the `timings` block is kept only when asked for.
+    """
+    filtered = dict(results)
+    filtered["suspicious_accounts"] = [
+        a for a in results["suspicious_accounts"] if a["suspicion_score"] >= min_score
+    ]
+    if not timings:
+        filtered.pop("timings", None)
+    return filtered
+
+# =============================================================================
+# Account index — per-account drill-down without re-running detection
+# =============================================================================
+
+def _account_tx_arrays(graph: CompactGraph) -> Dict[str, np.ndarray]:
+    """
+    Every account's sent and received transaction rows sorted by (timestamp,
+    input row): account `a` owns account_tx[account_tx_indptr[a]:account_tx_indptr[a + 1]].
+    A self-transfer is listed once; undated rows sort first.
+    """
+    n_tx = len(graph.tx_src)
+    rows = np.arange(n_tx, dtype=np.int64)
+    inbound = graph.tx_dst != graph.tx_src
+    account = np.concatenate([graph.tx_src, graph.tx_dst[inbound]]).astype(np.int64)
+    rows = np.concatenate([rows, rows[inbound]])
+    order = np.lexsort((graph.tx_row[rows], graph.tx_ts[rows], account))
+    indptr = np.zeros(graph.n_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(account, minlength=graph.n_nodes), out=indptr[1:])
+    return {"account_tx_indptr": indptr, "account_tx": rows[order]}
+
+
+def _iso(ts: int) -> Optional[str]:
+    return None if ts == _NAT else pd.Timestamp(ts, tz="UTC").isoformat()
+
+
+class AccountIndex:
+    """
+    Lookups over one dataset version for GET /accounts: the graph's CSR/CSC
+    serve as per-account adjacency, ARRAYS (see _account_tx_arrays) as the
+    time-sorted transaction index, and `txid`/`txid_offsets` hold transaction
+    IDs by input row. Stored segments persist the arrays, so the index is
+    built once at upload and mapped like the graph.
+    """
+
+    ARRAYS = ("account_tx_indptr", "account_tx")
+
+    def __init__(
+        self, graph: CompactGraph, arrays: Dict[str, np.ndarray], txid: np.ndarray, txid_offsets: np.ndarray,
+    ) -> None:
+        self.graph = graph
+        self.tx_indptr = arrays["account_tx_indptr"]
+        self.tx = arrays["account_tx"]
+        self.txid = txid
+        self.txid_offsets = txid_offsets
+
+    def code(self, account_id: str) -> Optional[int]:
+        labels = self.graph.labels
+        i = int(labels.searchsorted(account_id))
+        return i if i < len(labels) and labels[i] == account_id else None
+
+    def transactions(self, code: int, start: Optional[int] = None, end: Optional[int] = None) -> np.ndarray:
+        """Rows of `code`'s transactions, oldest first; only start <= ts <= end (ns) if bounded."""
+        rows = self.tx[self.tx_indptr[code]:self.tx_indptr[code + 1]]
+        if start is None and end is None:
+            return rows
+        ts = self.graph.tx_ts[rows]
+        lo = int(np.searchsorted(ts, start, side="left")) if start is not None else 0
+        hi = int(np.searchsorted(ts, end, side="right")) if end is not None else len(rows)
+        return rows[lo:hi]
+
+    def counterparties(self, code: int) -> List[Dict[str, Any]]:
+        """One record per distinct edge of `code`, most transactions first."""
+        g = self.graph
+        out_edges = np.arange(g.indptr[code], g.indptr[code + 1])
+        in_edges = g.redge[g.rindptr[code]:g.rindptr[code + 1]]
+        edges = np.concatenate([out_edges, in_edges])
+        other = np.concatenate([g.indices[out_edges], g.edge_src[in_edges]])
+        outbound = np.arange(len(edges)) < len(out_edges)
+        order = np.lexsort((~outbound, other, -g.edge_count[edges]))
+        return [
+            {
+                "account_id": g.labels[o], "direction": "out" if out else "in",
+                "transactions": int(count), "total_amount": round(float(amount), 2),
+            }
+            for o, out, count, amount in zip(
+                other[order].tolist(), outbound[order].tolist(),
+                g.edge_count[edges[order]].tolist(), g.edge_amount[edges[order]].tolist(),
+            )
+        ]
+
+    def neighbourhood(self, code: int, hops: int, direction: str) -> Tuple[np.ndarray, np.ndarray, bool]:
+        """
+        (accounts, hop distances, truncated) of the accounts within `hops` of
+        `code` along "out", "in" or "both" edges, by distance then code. The
+        breadth-first expansion stops once ACCOUNT_MAX_NEIGHBOURS are reached.
+        """
+        g = self.graph
+        adjacency = []
+        if direction in ("out", "both"):
+            adjacency.append((g.indptr, g.indices))
+        if direction in ("in", "both"):
+            adjacency.append((g.rindptr, g.rindices))
+        seen = np.array([code], dtype=np.int64)
+        frontier = seen
+        found: List[np.ndarray] = []
+        dist: List[np.ndarray] = []
+        total = 0
+        for d in range(1, hops + 1):
+            nxt = np.unique(np.concatenate([
+                nbrs[_expand_ranges(indptr[frontier], indptr[frontier + 1] - indptr[frontier])]
+                for indptr, nbrs in adjacency
+            ]).astype(np.int64))
+            nxt = nxt[~np.isin(nxt, seen, assume_unique=True)]
+            if not len(nxt):
+                break
+            room = CFG.ACCOUNT_MAX_NEIGHBOURS - total
+            if len(nxt) > room:
+                found.append(nxt[:room])
+                dist.append(np.full(room, d))
+                return np.concatenate(found), np.concatenate(dist), True
+            found.append(nxt)
+            dist.append(np.full(len(nxt), d))
+            total += len(nxt)
+            seen = np.union1d(seen, nxt)
+            frontier = nxt
+        if not found:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), False
+        return np.concatenate(found), np.concatenate(dist), False
+
+    def records(self, rows: np.ndarray) -> List[Dict[str, Any]]:
+        """AccountTransaction dicts for transaction rows."""
+        g = self.graph
+        raw = self.txid
+        bounds = self.txid_offsets
+        labels = g.labels
+        return [
+            {
+                "transaction_id": bytes(raw[bounds[r]:bounds[r + 1]]).decode("utf-8"),
+                "sender_id": labels[src], "receiver_id": labels[dst],
+                "amount": amount, "timestamp": _iso(ts),
+            }
+            for r, src, dst, amount, ts in zip(
+                g.tx_row[rows].tolist(), g.tx_src[rows].tolist(), g.tx_dst[rows].tolist(),
+                g.tx_amount[rows].tolist(), g.tx_ts[rows].tolist(),
+            )
+        ]
+
+
+def _account_index(frame: pd.DataFrame) -> AccountIndex:
+    """AccountIndex of an in-memory frame (datasets with appended batches)."""
+    graph = CompactGraph.from_frame(frame)
+    txid, txid_offsets = _encode_strings(frame["transaction_id"].tolist())
+    return AccountIndex(graph, _account_tx_arrays(graph), txid, txid_offsets)
+
+
+def _ring_index(results: Dict[str, Any]) -> Dict[str, Tuple[Optional[int], List[int]]]:
+    """
+    Inverted index of one analysis: account ID → (position in
+    suspicious_accounts or None, positions in fraud_rings of every ring it is
+    a member of).
+    """
+    index: Dict[str, Tuple[Optional[int], List[int]]] = {}
+    for i, ring in enumerate(results["fraud_rings"]):
+        for account in ring["member_accounts"]:
+            index.setdefault(account, (None, []))[1].append(i)
+    for i, account in enumerate(results["suspicious_accounts"]):
+        index[account["account_id"]] = (i, index.get(account["account_id"], (None, []))[1])
+    return index
+
+# =============================================================================
+# Dataset store — uploaded datasets persisted as memory-mapped columns
+# =============================================================================
+#
+# DATASET_DIR/<dataset_id>/manifest.json names the dataset's current version
+# (the same content hash the analysis cache keys on) and its segments. A
+# segment is one ingested upload or appended batch stored as its built
+# CompactGraph: every array in CompactGraph.ARRAYS as an .npy file, plus the
+# account labels and transaction IDs as UTF-8 blobs with offsets. Workers map
+# the arrays read-only (np.load mmap_mode="r"), so every uvicorn worker
+# shares one page-cache copy and a restart costs no re-upload. Segments are
+# immutable and written under a temporary name first; manifests are replaced
+# atomically, so a reader always sees a complete version.
+
+_DATASET_ID = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+
+def _encode_strings(values: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """(UTF-8 bytes, offsets) — value i is bytes[offsets[i]:offsets[i + 1]]."""
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum(np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _decode_strings(data: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    raw = data.tobytes()
+    bounds = offsets.tolist()
+    return np.array([raw[lo:hi].decode("utf-8") for lo, hi in zip(bounds[:-1], bounds[1:])], dtype=object)
+
+
+class MappedLabels:
+    """
+    Sorted account IDs of a stored segment, left as mapped UTF-8 bytes plus
+    offsets (see _encode_strings) and decoded only when indexed. Indexing and
+    `searchsorted` behave as on the object array of labels; UTF-8 byte order
+    is code point order, so lookups binary-search the raw bytes. Anything
+    that needs every label (np.asarray) decodes them all.
+    """
+
+    def __init__(self, data: np.ndarray, offsets: np.ndarray) -> None:
+        self.data = data
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def _raw(self, i: int) -> bytes:
+        return self.data[self.offsets[i]:self.offsets[i + 1]].tobytes()
+
+    def __getitem__(self, key: Any) -> Any:
+        if isinstance(key, (int, np.integer)):
+            i = int(key)
+            return self._raw(i + len(self) if i < 0 else i).decode("utf-8")
+        codes = np.arange(len(self))[key] if isinstance(key, slice) else np.asarray(key)
+        if codes.dtype == bool:
+            codes = np.flatnonzero(codes)
+        return np.array([self._raw(i).decode("utf-8") for i in codes.tolist()], dtype=object)
+
+    def __array__(self, dtype: Any = None, copy: Any = None) -> np.ndarray:
+        labels = _decode_strings(self.data, self.offsets)
+        return labels if dtype is None else labels.astype(dtype)
+
+    def tolist(self) -> List[str]:
+        return np.asarray(self).tolist()
+
+    def searchsorted(self, value: Any) -> Any:
+        """Insertion point(s) of `value` (a label or an array of labels), side="left"."""
+        if not isinstance(value, str):
+            return np.array([self.searchsorted(v) for v in value], dtype=np.int64)
+        return bisect.bisect_left(range(len(self)), value.encode("utf-8"), key=self._raw)
+
+
+@contextlib.contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    """Exclusive advisory lock on `path` across processes (no-op without fcntl)."""
+    try:
+        import fcntl
+    except ImportError:     # not available on Windows
+        yield
+        return
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _write_atomic(path: str, text: str) -> None:
+    """Replace `path` with `text` so that readers see the old or the new file, never half of one."""
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+class StoredSegment:
+    """One immutable segment: a CompactGraph over memory-mapped arrays."""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        labels = MappedLabels(self._load("labels"), self._load("label_offsets"))
+        self.graph = CompactGraph.from_arrays({name: self._load(name) for name in CompactGraph.ARRAYS}, labels)
+        self._index: Optional[AccountIndex] = None
+
+    def _load(self, name: str) -> np.ndarray:
+        return np.load(os.path.join(self.directory, f"{name}.npy"), mmap_mode="r")
+
+    @staticmethod
+    def write(directory: str, graph: CompactGraph, transaction_ids: List[str]) -> None:
+        """Persist `graph` (transaction IDs in input-row order) unless the segment exists."""
+        if os.path.isdir(directory):
+            return      # segment names are content hashes — already stored
+        tmp = f"{directory}.{uuid.uuid4().hex}.tmp"
+        os.makedirs(tmp)
+        arrays = {name: getattr(graph, name) for name in CompactGraph.ARRAYS}
+        arrays.update(_account_tx_arrays(graph))
+        arrays["labels"], arrays["label_offsets"] = _encode_strings(graph.labels.tolist())
+        arrays["txid"], arrays["txid_offsets"] = _encode_strings(transaction_ids)
+        for name, arr in arrays.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(arr))
+        try:
+            os.rename(tmp, directory)
+        except OSError:     # another worker stored the same segment first
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    @property
+    def n_rows(self) -> int:
+        return len(self.graph.tx_src)
+
+    def index(self) -> AccountIndex:
+        if self._index is None:
+            try:
+                arrays = {name: self._load(name) for name in AccountIndex.ARRAYS}
+            except FileNotFoundError:       # stored before segments carried the index
+                arrays = _account_tx_arrays(self.graph)
+            self._index = AccountIndex(self.graph, arrays, self._load("txid"), self._load("txid_offsets"))
+        return self._index
+
+    def frame(self) -> pd.DataFrame:
+        """The compact frame ingest_csv produced for this segment, rows in input order."""
+        graph = self.graph
+        order = np.argsort(graph.tx_row, kind="stable")
+        accounts = pd.CategoricalDtype(pd.Index(np.asarray(graph.labels)))
+        return pd.DataFrame({
+            "transaction_id": _decode_strings(self._load("txid"), self._load("txid_offsets")),
+            "sender_id": pd.Categorical.from_codes(graph.tx_src[order], dtype=accounts),
+            "receiver_id": pd.Categorical.from_codes(graph.tx_dst[order], dtype=accounts),
+            "amount": graph.tx_amount[order],
+            "timestamp": pd.DatetimeIndex(graph.tx_ts[order].view("datetime64[ns]")).tz_localize("UTC"),
+        })
+
+
+class StoredDataset:
+    """One version of a named dataset: its base segment plus appended batches."""
+
+    def __init__(self, root: str, manifest: Dict[str, Any]) -> None:
+        self.manifest = manifest
+        self.dataset_id: str = manifest["dataset_id"]
+        self.version: str = manifest["version"]
+        self.segments = [StoredSegment(os.path.join(root, self.dataset_id, s)) for s in manifest["segments"]]
+        self._index: Optional[AccountIndex] = None
+        self._lock = threading.Lock()
+
+    @property
+    def n_rows(self) -> int:
+        return sum(s.n_rows for s in self.segments)
+
+    def graph(self) -> Optional[CompactGraph]:
+        """The memory-mapped graph of the whole dataset; None while it has batches."""
+        return self.segments[0].graph if len(self.segments) == 1 else None
+
+    def frame(self) -> pd.DataFrame:
+        frames = [s.frame() for s in self.segments]
+        return frames[0] if len(frames) == 1 else _concat_frames(frames)
+
+    def index(self) -> AccountIndex:
+        """The mapped segment index; built in memory once per version while it has batches."""
+        if len(self.segments) == 1:
+            return self.segments[0].index()
+        with self._lock:
+            if self._index is None:
+                self._index = _account_index(self.frame())
+            return self._index
+
+
+class DatasetStore:
+    """
+    Named datasets under `root`. `get` re-reads the (small) manifest on every
+    call, so a version written by another worker is picked up at once; opened
+    versions are kept per process and their arrays stay mapped.
+    """
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self._lock = threading.Lock()
+        self._open: Dict[str, StoredDataset] = {}
+
+    def _path(self, *parts: str) -> str:
+        return os.path.join(self.root, *parts)
+
+    def _manifest(self, dataset_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(dataset_id, "manifest.json")) as f:
+                return json.load(f)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+    def lock(self, dataset_id: str) -> ContextManager[None]:
+        """Serialise writers of one dataset across threads and processes."""
+        os.makedirs(self._path(dataset_id), exist_ok=True)
+        return _file_lock(self._path(dataset_id, ".lock"))
+
+    def current_id(self) -> Optional[str]:
+        """The most recently uploaded dataset — what requests without a dataset_id use."""
+        try:
+            with open(self._path(".current")) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def get(self, dataset_id: Optional[str] = None) -> Optional[StoredDataset]:
+        dataset_id = dataset_id or self.current_id()
+        if dataset_id is None or not _DATASET_ID.match(dataset_id):
+            return None
+        manifest = self._manifest(dataset_id)
+        if manifest is None:
+            return None
+        with self._lock:
+            dataset = self._open.get(dataset_id)
+            if dataset is None or dataset.version != manifest["version"]:
+                dataset = self._open[dataset_id] = StoredDataset(self.root, manifest)
+            return dataset
+
+    def _commit(self, dataset_id: str, version: str, segments: List[str], created_at: float) -> StoredDataset:
+        manifest = {
+            "dataset_id": dataset_id, "version": version, "segments": segments,
+            "created_at": created_at, "updated_at": time.time(),
+        }
+        _write_atomic(self._path(dataset_id, "manifest.json"), json.dumps(manifest))
+        self._prune(dataset_id, segments)
+        return self.get(dataset_id)
+
+    def _prune(self, dataset_id: str, keep: List[str]) -> None:
+        """Delete segments the manifest no longer names (mapped views stay valid on POSIX)."""
+        for name in os.listdir(self._path(dataset_id)):
+            path = self._path(dataset_id, name)
+            if name not in keep and os.path.isdir(path) and not name.endswith(".tmp"):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def save(self, dataset_id: str, df: pd.DataFrame, dataset_hash: str) -> StoredDataset:
+        """Store `df` as the whole of `dataset_id` (replacing it) and make it current."""
+        graph = CompactGraph.from_frame(df)
+        with self.lock(dataset_id):
+            StoredSegment.write(self._path(dataset_id, dataset_hash), graph, df["transaction_id"].tolist())
+            dataset = self._commit(dataset_id, dataset_hash, [dataset_hash], time.time())
+        _write_atomic(self._path(".current"), dataset_id)
+        return dataset
+
+    def append(
+        self, dataset: StoredDataset, batch: pd.DataFrame, version: str, state: "IncrementalAnalysis",
+    ) -> StoredDataset:
+        """
+        Record `batch` as a new segment of `dataset` at `version`. Once `state`
+        has folded its batches into a rebuilt base, the whole dataset is
+        rewritten as one segment from that base instead. Call under lock().
+        """
+        if state.n_rows == state.n_base_rows:
+            frame = state.frame()
+            StoredSegment.write(self._path(dataset.dataset_id, version), state.base, frame["transaction_id"].tolist())
+            segments = [version]
+        else:
+            StoredSegment.write(
+                self._path(dataset.dataset_id, version), CompactGraph.from_frame(batch),
+                batch["transaction_id"].tolist(),
+            )
+            segments = list(dataset.manifest["segments"]) + [version]
+        return self._commit(dataset.dataset_id, version, segments, dataset.manifest["created_at"])
+
+    def delete(self, dataset_id: str) -> bool:
+        if self.get(dataset_id) is None:
+            return False
+        with self._lock:
+            self._open.pop(dataset_id, None)
+        shutil.rmtree(self._path(dataset_id), ignore_errors=True)
+        if self.current_id() == dataset_id:
+            os.remove(self._path(".current"))
+        return True
+
+    def list(self) -> List[Dict[str, Any]]:
+        if not os.path.isdir(self.root):
+            return []
+        current = self.current_id()
+        datasets = []
+        for name in sorted(os.listdir(self.root)):
+            dataset = self.get(name) if _DATASET_ID.match(name) else None
+            if dataset is not None:
+                datasets.append(_dataset_info(dataset, current))
+        return datasets
+
+
+def _dataset_info(dataset: StoredDataset, current: Optional[str]) -> Dict[str, Any]:
+    return {
+        "dataset_id": dataset.dataset_id,
+        "version": dataset.version,
+        "transactions": dataset.n_rows,
+        "segments": len(dataset.segments),
+        "current": dataset.dataset_id == current,
+        "created_at": dataset.manifest["created_at"],
+        "updated_at": dataset.manifest["updated_at"],
+    }
+
+
+def _analyze_dataset(dataset: StoredDataset, ctx: Any = None) -> Dict[str, Any]:
+    """
+    run_full_analysis of a stored dataset — straight off the mapped graph when
+    it has one — under the run's own Config (`ctx.config`).
+    """
+    ctx = ctx if ctx is not None else RunContext()
+    with use_config(ctx.config):
+        graph = dataset.graph()
+        if graph is None or CFG.EXECUTION_MODE == "sharded":
+            return run_full_analysis(dataset.frame(), ctx)
+        return analyze_graph(graph, ctx)
+
+
+def _sweep_dataset(dataset: StoredDataset, points: List[Dict[str, Any]], ctx: RunContext) -> Dict[str, Any]:
+    """run_parameter_sweep over a stored dataset, its mapped graph when it has one."""
+    with use_config(ctx.config):
+        graph = dataset.graph()
+        if graph is None:
+            with ctx.timed("graph"):
+                graph = CompactGraph.from_frame(dataset.frame())
+        return run_parameter_sweep(graph, points, ctx)
+
+# =============================================================================
+# Result views — sorting, cursor pagination and NDJSON streaming
+# =============================================================================
+
+def _ring_key(ring_id: str) -> Tuple[int, str]:
+    """Numeric order for RING_001 … RING_1000 (plain string order breaks past 999)."""
+    return len(ring_id), ring_id
+
+
+# sort field → (key function, default order) per result section; the first
+# field is the default and, in its default order, is the result's own order
+_SORT_KEYS: Dict[str, Dict[str, Tuple[Callable[[Dict[str, Any]], Any], str]]] = {
+    "suspicious_accounts": {
+        "suspicion_score": (lambda a: a["suspicion_score"], "desc"),
+        "account_id":      (lambda a: a["account_id"], "asc"),
+        "ring_id":         (lambda a: _ring_key(a["ring_id"]), "asc"),
+    },
+    "fraud_rings": {
+        "ring_id":         (lambda r: _ring_key(r["ring_id"]), "asc"),
+        "risk_score":      (lambda r: r["risk_score"], "desc"),
+        "member_count":    (lambda r: len(r["member_accounts"]), "desc"),
+        "pattern_type":    (lambda r: r["pattern_type"], "asc"),
+    },
+}
+
+
+def _view_key(
+    key: Tuple[str, str], section: str, sort: str, order: str, min_score: float,
+) -> Tuple[str, ...]:
+    return (*key, section, sort, order, repr(min_score))
+
+
+def _sorted_records(
+    key: Tuple[str, str], results: Dict[str, Any], section: str, sort: str, order: str, min_score: float,
+) -> List[Dict[str, Any]]:
+    """
+    `section` records of a cached result, min_score-filtered and stably sorted
+    (ties keep result order). The list is cached next to the result, so
+    paging through it costs one sort.
+    """
+    view_key = _view_key(key, section, sort, order, min_score)
+    records = _view_cache.get(view_key)
+    if records is None:
+        records = results[section]
+        if section == "suspicious_accounts":
+            records = [a for a in records if a["suspicion_score"] >= min_score]
+        key_func, natural = _SORT_KEYS[section][sort]
+        if not (sort == next(iter(_SORT_KEYS[section])) and order == natural):
+            records = sorted(records, key=key_func, reverse=order == "desc")
+        _view_cache.put(view_key, records)
+    return records
+
+
+def _view_token(view_key: Tuple[Any, ...]) -> str:
+    return hashlib.sha256(repr(view_key).encode()).hexdigest()[:16]
+
+
+def _encode_cursor(view_key: Tuple[Any, ...], offset: int) -> str:
+    blob = json.dumps({"v": _view_token(view_key), "o": offset}).encode()
+    return base64.urlsafe_b64encode(blob).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, view_key: Tuple[Any, ...]) -> int:
+    """
+    Offset encoded in `cursor`. A cursor pins one dataset + config + query:
+    it fails with 409 once the dataset changed (upload/append) or the query
+    parameters differ, since the offset would then point elsewhere.
+    """
+    try:
+        blob = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        token, offset = blob["v"], int(blob["o"])
+    except (ValueError, KeyError, TypeError) as exc:
+        raise HTTPException(status_code=422, detail="Malformed cursor.") from exc
+    if token != _view_token(view_key) or offset < 0:
+        raise HTTPException(status_code=409, detail="Stale cursor — the dataset or query changed; restart paging.")
+    return offset
+
+
+def _page(
+    key: Tuple[str, str], results: Dict[str, Any], section: str, sort: Optional[str], order: Optional[str],
+    min_score: float, limit: Optional[int], cursor: Optional[str],
+) -> Dict[str, Any]:
+    """One page of `section`: {"items", "total", "next_cursor"}."""
+    sort, order = _check_sort(section, sort, order)
+    limit = CFG.PAGE_DEFAULT_LIMIT if limit is None else limit
+    if not (1 <= limit <= CFG.PAGE_MAX_LIMIT):
+        raise HTTPException(status_code=422, detail=f"limit must be 1–{CFG.PAGE_MAX_LIMIT}.")
+    records = _sorted_records(key, results, section, sort, order, min_score)
+    view_key = _view_key(key, section, sort, order, min_score)
+    offset = _decode_cursor(cursor, view_key) if cursor else 0
+    end = offset + limit
+    return {
+        "items": records[offset:end],
+        "total": len(records),
+        "next_cursor": _encode_cursor(view_key, end) if end < len(records) else None,
+    }
+
+
+def _check_sort(section: str, sort: Optional[str], order: Optional[str]) -> Tuple[str, str]:
+    """Validated (sort, order), defaulting to the section's natural order."""
+    fields = _SORT_KEYS[section]
+    sort = sort or next(iter(fields))
+    if sort not in fields:
+        raise HTTPException(status_code=422, detail=f"sort must be one of {sorted(fields)}.")
+    order = order or fields[sort][1]
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=422, detail="order must be 'asc' or 'desc'.")
+    return sort, order
+
+
+def _ndjson_records(results: Dict[str, Any], min_score: float, timings: bool) -> Iterator[bytes]:
+    """
+    The result as NDJSON, in response order: a summary line, then one line
+    per suspicious account and per fraud ring, each tagged with "record".
+    Records are serialised NDJSON_BATCH_RECORDS at a time, so the full
+    payload is never held in memory.
+    """
+    head = {"record": "summary", **results["summary"]}
+    if timings and "timings" in results:
+        head["timings"] = results["timings"]
+    yield (json.dumps(head) + "\n").encode()
+    for section, tag in (("suspicious_accounts", "suspicious_account"), ("fraud_rings", "fraud_ring")):
+        records = results[section]
+        if section == "suspicious_accounts":
+            records = [a for a in records if a["suspicion_score"] >= min_score]
+        for lo in range(0, len(records), CFG.NDJSON_BATCH_RECORDS):
+            batch = records[lo:lo + CFG.NDJSON_BATCH_RECORDS]
+            yield "".join(json.dumps({"record": tag, **r}) + "\n" for r in batch).encode()
+
+# =============================================================================
+# Columnar export — Arrow IPC / Parquet tables from the result columns
+# =============================================================================
+
+# binary /download format → (media type, file extension)
+_COLUMNAR_FORMATS: Dict[str, Tuple[str, str]] = {
+    "arrow":   ("application/vnd.apache.arrow.file", "arrow"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def _arrow_array(pa: Any, column: Any, encode: bool = True) -> Any:
+    """
+    pyarrow array over one `AnalysisResult.arrays` column. Numeric arrays are
+    wrapped without copying; strings are large_string, lists large_list
+    (int64 offsets), and _Coded columns dictionary arrays — or, with
+    `encode=False`, their decoded values.
+    """
+    if isinstance(column, _Coded):
+        values = _arrow_array(pa, column.values)
+        if not encode:
+            return values.take(pa.array(column.codes))
+        return pa.DictionaryArray.from_arrays(pa.array(column.codes), values)
+    if isinstance(column, _Lists):
+        return pa.LargeListArray.from_arrays(pa.array(column.offsets), _arrow_array(pa, column.values, encode=False))
+    if isinstance(column, list):        # representatives: lists of paths
+        return pa.array(column, type=pa.large_list(pa.large_list(pa.large_string())))
+    if column.dtype == object:
+        return pa.array(column, type=pa.large_string())
+    return pa.array(column)
+
+
+def _arrow_table(results: AnalysisResult, section: str, min_score: float) -> Any:
+    """
+    `section` of a result as a pyarrow Table over `results.arrays`;
+    detected_patterns / member_accounts are large_list<large_string>,
+    ring_id / pattern_type are dictionary-encoded and the summary rides along
+    as schema metadata.
+    """
+    import pyarrow as pa
+
+    arrays = results.arrays[section]
+    table = pa.table({name: _arrow_array(pa, column) for name, column in arrays.items()})
+    if section == "suspicious_accounts":
+        # records are sorted by score descending, so the filter keeps a prefix
+        table = table.slice(0, int(np.count_nonzero(arrays["suspicion_score"] >= min_score)))
+    return table.replace_schema_metadata({
+        "muling.table": section, "muling.summary": json.dumps(results["summary"]),
+    })
+
+
+def _columnar_bytes(results: AnalysisResult, section: str, min_score: float, fmt: str) -> bytes:
+    """`section` serialised as an Arrow IPC file or a Parquet file."""
+    import pyarrow as pa
+
+    table = _arrow_table(results, section, min_score)
+    sink = pa.BufferOutputStream()
+    if fmt == "arrow":
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        import pyarrow.parquet as pq
+        pq.write_table(table, sink, compression=CFG.PARQUET_COMPRESSION)
+    return sink.getvalue().to_pybytes()
+
+# =============================================================================
+# Analysis jobs — run the pipeline off the event loop, poll for progress
+# =============================================================================
+
+class AnalysisJob:
+    """One submitted analysis of a stored dataset version."""
+
+    def __init__(self, dataset: StoredDataset, overrides: Optional[Dict[str, Any]] = None) -> None:
+        self.job_id = uuid.uuid4().hex
+        self.dataset_id = dataset.dataset_id
+        self.dataset: Optional[StoredDataset] = dataset
+        self.cache_key = (dataset.version, _config_fingerprint(CFG, overrides))
+        self.ctx = RunContext(overrides)
+        self.status = "queued"
+        self.error: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.future: Optional[concurrent.futures.Future] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    def run(self) -> None:
+        if self.ctx.cancelled:
+            self.status = "cancelled"
+            return
+        self.status = "running"
+        try:
+            results = _analysis_cache.get(self.cache_key)
+            if results is None:
+                results = _analyze_dataset(self.dataset, self.ctx)
+                _analysis_cache.put(self.cache_key, results)
+            _last_analysis[self.dataset_id] = self.cache_key
+            self.result = results
+            self.ctx.progress = {stage: 1.0 for stage in RunContext.STAGES}
+            self.status = "done"
+        except AnalysisCancelled:
+            self.status = "cancelled"
+        except ValueError as exc:
+            self.status, self.error = "failed", str(exc)
+        except Exception as exc:    # surfaced through GET /jobs/{id}
+            logger.exception("Job %s failed", self.job_id)
+            self.status, self.error = "failed", f"{type(exc).__name__}: {exc}"
+        finally:
+            self.dataset = None     # the dataset version is no longer needed
+
+    def to_dict(self, min_score: float = 0.0, timings: bool = False) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "dataset_id": self.dataset_id,
+            "status": self.status,
+            "progress": dict(self.ctx.progress),
+            "error": self.error,
+            "result": _filter_min_score(self.result, min_score, timings) if self.result else None,
+        }
+
+
+class JobManager:
+    """
+    Bounded worker pool for AnalysisJobs. At most JOB_MAX_PENDING jobs may be
+    queued or running; the newest JOB_HISTORY finished jobs stay queryable.
+    """
+
+    def __init__(self, workers: int, max_pending: int, history: int) -> None:
+        self.max_pending = max_pending
+        self.history = history
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="analysis-job",
+        )
+        self._jobs: "OrderedDict[str, AnalysisJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, dataset: StoredDataset, overrides: Optional[Dict[str, Any]] = None) -> Optional[AnalysisJob]:
+        """Queue a job, or return None when the pending limit is reached."""
+        with self._lock:
+            if sum(not j.finished for j in self._jobs.values()) >= self.max_pending:
+                return None
+            job = AnalysisJob(dataset, overrides)
+            self._jobs[job.job_id] = job
+            self._prune()
+        job.future = self._pool.submit(job.run)
+        return job
+
+    def get(self, job_id: str) -> Optional[AnalysisJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[AnalysisJob]:
+        job = self.get(job_id)
+        if job is not None and not job.finished:
+            job.ctx.cancel()
+            if job.future is not None and job.future.cancel():
+                job.status = "cancelled"
+        return job
+
+    def _prune(self) -> None:
+        finished = [jid for jid, j in self._jobs.items() if j.finished]
+        for jid in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[jid]
+
+# =============================================================================
+# FastAPI
+# =============================================================================
+
+app = FastAPI(title="RIFT 2026 — Money Muling Detection Engine")
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next: Callable) -> Any:
+    """Observe every request in muling_http_request_seconds, labelled by route template."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        _metrics.observe(
+            "muling_http_request_seconds", time.perf_counter() - start,
+            method=request.method, route=getattr(route, "path", "unmatched"), status=str(status),
+        )
+
+
+_datasets = DatasetStore(CFG.DATASET_DIR)
+# Per process: dataset_id → (version, incremental state) for datasets appended to here
+_incremental: Dict[str, Tuple[str, IncrementalAnalysis]] = {}
+# Per process: dataset_id → cache key of its most recent analysis (GET /accounts)
+_last_analysis: Dict[str, Tuple[str, str]] = {}
+_append_lock = threading.Lock()
+_analysis_cache = AnalysisCache(CFG.ANALYSIS_CACHE_SIZE)
+_view_cache = AnalysisCache(CFG.VIEW_CACHE_SIZE)
+_jobs = JobManager(CFG.JOB_WORKERS, CFG.JOB_MAX_PENDING, CFG.JOB_HISTORY)
+
+
+def _check_dataset_id(dataset_id: Optional[str]) -> None:
+    if dataset_id is not None and not _DATASET_ID.match(dataset_id):
+        raise HTTPException(
+            status_code=422, detail="dataset_id must be 1–64 letters, digits, '_', '.' or '-', starting alphanumeric.",
+        )
+
+
+def _dataset(dataset_id: Optional[str] = None) -> StoredDataset:
+    """The dataset a request addresses: ?dataset_id=, else the most recent upload."""
+    _check_dataset_id(dataset_id)
+    dataset = _datasets.get(dataset_id)
+    if dataset is None:
+        if dataset_id is None:
+            raise HTTPException(status_code=400, detail="No data — POST a CSV to /upload first.")
+        raise HTTPException(status_code=404, detail=f"Unknown dataset '{dataset_id}'.")
+    return dataset
+
+
+def _forget(dataset_id: str, version: Optional[str]) -> None:
+    """Drop this process' cached results and incremental state of a dataset version."""
+    if version is not None:
+        _analysis_cache.invalidate(version)
+        _view_cache.invalidate(version)
+    _incremental.pop(dataset_id, None)
+    _last_analysis.pop(dataset_id, None)
+
+
+def _current_analysis(
+    dataset: StoredDataset, overrides: Optional[Dict[str, Any]] = None,
+) -> Tuple[Tuple[str, str], Dict[str, Any]]:
+    """
+    (cache key, analysis) of one dataset version under the active CFG (plus
+    per-request budget `overrides`), computed at most once per combination.
+    Blocking — call it through run_in_threadpool from async endpoints.
+    """
+    key = (dataset.version, _config_fingerprint(CFG, overrides))
+    results = _analysis_cache.get(key)
+    _metrics.inc("muling_analysis_cache_total", result="hit" if results is not None else "miss")
+    if results is not None:
+        logger.info("Analysis cache hit for dataset %s", key[0][:12])
+        _last_analysis[dataset.dataset_id] = key
+        return key, results
+    with _append_lock:
+        version, store = _incremental.get(dataset.dataset_id, (None, None))
+        if store is not None and store.fingerprint == key[1] and version == key[0]:
+            results = store.result()
+    if results is None:
+        try:
+            results = _analyze_dataset(dataset, RunContext(overrides))
+        except ValueError as exc:
+            raise HTTPException(status_code=422, detail=str(exc)) from exc
+    _analysis_cache.put(key, results)
+    _last_analysis[dataset.dataset_id] = key
+    return key, results
+
+
+def _latest_analysis(dataset: StoredDataset) -> Optional[Tuple[Tuple[str, str], Dict[str, Any]]]:
+    """
+    (cache key, analysis) of the most recent analysis of this dataset version
+    still cached here — else of the default Config — without running one.
+    """
+    for key in (_last_analysis.get(dataset.dataset_id), (dataset.version, _config_fingerprint(CFG))):
+        if key is not None and key[0] == dataset.version:
+            results = _analysis_cache.get(key)
+            if results is not None:
+                return key, results
+    return None
+
+
+def _budget_overrides(
+    cycle_max_seconds: Optional[float] = None,
+    cycle_max_expanded: Optional[int] = None,
+    shell_max_seconds: Optional[float] = None,
+    shell_max_expanded: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Per-request detector work budgets (query parameters) as Config overrides; 0 = unlimited."""
+    given = {
+        "CYCLE_MAX_SECONDS": cycle_max_seconds, "CYCLE_MAX_EXPANDED": cycle_max_expanded,
+        "SHELL_MAX_SECONDS": shell_max_seconds, "SHELL_MAX_EXPANDED": shell_max_expanded,
+    }
+    overrides = {k: v for k, v in given.items() if v is not None}
+    if any(v < 0 for v in overrides.values()):
+        raise HTTPException(status_code=422, detail="Work budgets must be ≥ 0.")
+    return overrides
+
+
+def _analysis_overrides(
+    budgets: Dict[str, Any] = Depends(_budget_overrides), rings: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Per-request Config overrides: the work budgets plus ?rings= (RING_MODE)."""
+    if rings is None:
+        return budgets
+    if rings not in ("paths", "grouped"):
+        raise HTTPException(status_code=422, detail="rings must be 'paths' or 'grouped'.")
+    return {**budgets, "RING_MODE": rings}
+
+
+@app.get("/")
+async def root() -> Dict[str, str]:
+    return {"message": "Welcome to the Money Muling Detection Engine! POST a CSV to /upload and then GET /analysis."}
+
+@app.get("/health")
+async def health() -> Dict[str, str]:
+    return {"status": "ok"}
+
+@app.get("/metrics")
+async def metrics() -> PlainTextResponse:
+    """Prometheus scrape endpoint: analysis/stage/HTTP latency histograms and work counters."""
+    return PlainTextResponse(_metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/upload", response_model=UploadResponse)
+async def upload(file: UploadFile = File(...), dataset_id: Optional[str] = None) -> UploadResponse:
+    """
+    Store a CSV as dataset `dataset_id` (default: derived from its content),
+    replacing any earlier upload under that ID, and make it the current one.
+    """
+    _check_dataset_id(dataset_id)
+    if not file.filename.lower().endswith(".csv"):
+        raise HTTPException(status_code=415, detail="Only CSV files accepted.")
+
+    missing = CFG.REQUIRED_COLUMNS - set(read_header(file.file))
+    if missing:
+        raise HTTPException(status_code=422, detail=f"Missing columns: {sorted(missing)}")
+
+    start = time.perf_counter()
+    try:
+        df, dataset_hash = await run_in_threadpool(ingest_csv, file.file)
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail=f"Cannot parse CSV: {exc}") from exc
+    elapsed = time.perf_counter() - start
+    rows_per_second = round(len(df) / elapsed, 1) if elapsed > 0 else 0.0
+    peak_rss_mb = round(_peak_rss_mb(), 1)
+
+    dataset_id = dataset_id or f"ds_{dataset_hash[:12]}"
+    try:
+        await run_in_threadpool(_store_upload, dataset_id, df, dataset_hash)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    logger.info(
+        "Loaded '%s' as dataset %s — %d rows in %.2fs (%.0f rows/s, peak RSS %.1f MB)",
+        file.filename, dataset_id, len(df), elapsed, rows_per_second, peak_rss_mb,
+    )
+    return UploadResponse(
+        status="ok", dataset_id=dataset_id, transactions_loaded=len(df),
+        rows_per_second=rows_per_second, peak_rss_mb=peak_rss_mb,
+    )
+
+
+def _store_upload(dataset_id: str, df: pd.DataFrame, dataset_hash: str) -> StoredDataset:
+    _validate(df)
+    with _append_lock:
+        old = _datasets.get(dataset_id)
+        _forget(dataset_id, old.version if old is not None else None)
+        return _datasets.save(dataset_id, df, dataset_hash)
+
+
+def _append_batch(dataset_id: str, batch: pd.DataFrame, batch_hash: str) -> Tuple[int, int]:
+    """
+    Fold `batch` into the dataset's incremental state (built from the stored
+    dataset unless this process holds it for the latest version), store it
+    as a new version and cache the result under the new dataset hash.
+    Returns (total rows, accounts re-analysed).
+    """
+    with _append_lock, _datasets.lock(dataset_id):
+        dataset = _datasets.get(dataset_id)
+        if dataset is None:
+            raise HTTPException(status_code=404, detail=f"Unknown dataset '{dataset_id}'.")
+        version, store = _incremental.get(dataset_id, (None, None))
+        if store is None or version != dataset.version:
+            store = IncrementalAnalysis(dataset.frame())
+        results, reanalysed = store.append(batch)
+        new_hash = hashlib.sha256(f"{dataset.version}+{batch_hash}".encode()).hexdigest()
+        _forget(dataset_id, dataset.version)
+        _datasets.append(dataset, batch, new_hash, store)
+        _incremental[dataset_id] = (new_hash, store)
+        _analysis_cache.put((new_hash, store.fingerprint), results)
+        _last_analysis[dataset_id] = (new_hash, store.fingerprint)
+        return store.n_rows, reanalysed
+
+
+@app.post("/append", response_model=AppendResponse)
+async def append(file: UploadFile = File(...), dataset: StoredDataset = Depends(_dataset)) -> AppendResponse:
+    """
+    Append a CSV batch to a stored dataset. Only the accounts the batch can
+    affect are re-analysed; GET /analysis then returns the updated result.
+    """
+    if not file.filename.lower().endswith(".csv"):
+        raise HTTPException(status_code=415, detail="Only CSV files accepted.")
+
+    missing = CFG.REQUIRED_COLUMNS - set(read_header(file.file))
+    if missing:
+        raise HTTPException(status_code=422, detail=f"Missing columns: {sorted(missing)}")
+
+    start = time.perf_counter()
+    try:
+        batch, batch_hash = await run_in_threadpool(ingest_csv, file.file)
+    except Exception as exc:
+        raise HTTPException(status_code=400, detail=f"Cannot parse CSV: {exc}") from exc
+    try:
+        total, reanalysed = await run_in_threadpool(_append_batch, dataset.dataset_id, batch, batch_hash)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    elapsed = round(time.perf_counter() - start, 4)
+    logger.info("Appended '%s' — %d rows, %d accounts re-analysed in %.3fs", file.filename, len(batch), reanalysed, elapsed)
+    return AppendResponse(
+        status="ok", dataset_id=dataset.dataset_id, transactions_appended=len(batch), transactions_total=total,
+        accounts_reanalysed=reanalysed, processing_time_seconds=elapsed,
+    )
+
+
+def _check_min_score(min_score: float) -> None:
+    if not (0.0 <= min_score <= 100.0):
+        raise HTTPException(status_code=422, detail="min_score must be 0–100.")
+
+
+def _check_format(fmt: str, allowed: Tuple[str, ...] = ("json", "ndjson")) -> None:
+    if fmt not in allowed:
+        raise HTTPException(status_code=422, detail=f"format must be one of {list(allowed)}.")
+
+
+@app.get("/analysis")
+async def analysis(
+    min_score: float = 0.0,
+    timings: bool = False,
+    fmt: str = Query("json", alias="format"),
+    overrides: Dict[str, Any] = Depends(_analysis_overrides),
+    dataset: StoredDataset = Depends(_dataset),
+) -> Response:
+    """
+    The AnalysisResponse; `timings=true` adds per-stage timers and work
+    counters, the budget parameters override Config work budgets and
+    `rings=grouped` merges overlapping rings (RING_MODE).
+    `format=ndjson` streams it record by record instead.
+    """
+    _check_min_score(min_score)
+    _check_format(fmt)
+    _, results = await run_in_threadpool(_current_analysis, dataset, overrides)
+    if fmt == "ndjson":
+        return StreamingResponse(_ndjson_records(results, min_score, timings), media_type="application/x-ndjson")
+    return JSONResponse(content=_filter_min_score(results, min_score, timings))
+
+
+@app.get("/analysis/suspicious_accounts", response_model=SuspiciousAccountPage)
+async def suspicious_accounts_page(
+    min_score: float = 0.0,
+    sort: Optional[str] = None,
+    order: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    overrides: Dict[str, Any] = Depends(_analysis_overrides),
+    dataset: StoredDataset = Depends(_dataset),
+) -> JSONResponse:
+    """
+    One page of suspicious accounts. `sort` is suspicion_score (default,
+    desc), account_id or ring_id; follow `next_cursor` for the next page.
+    """
+    _check_min_score(min_score)
+    key, results = await run_in_threadpool(_current_analysis, dataset, overrides)
+    page = await run_in_threadpool(
+        _page, key, results, "suspicious_accounts", sort, order, min_score, limit, cursor,
+    )
+    return JSONResponse(content=page)
+
+
+@app.get("/analysis/fraud_rings", response_model=FraudRingPage)
+async def fraud_rings_page(
+    sort: Optional[str] = None,
+    order: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    overrides: Dict[str, Any] = Depends(_analysis_overrides),
+    dataset: StoredDataset = Depends(_dataset),
+) -> JSONResponse:
+    """
+    One page of fraud rings. `sort` is ring_id (default, asc), risk_score,
+    member_count or pattern_type; follow `next_cursor` for the next page.
+    """
+    key, results = await run_in_threadpool(_current_analysis, dataset, overrides)
+    page = await run_in_threadpool(_page, key, results, "fraud_rings", sort, order, 0.0, limit, cursor)
+    return JSONResponse(content=page)
+
+
+@app.get("/download")
+async def download_json(
+    min_score: float = 0.0,
+    fmt: str = Query("json", alias="format"),
+    table: str = "suspicious_accounts",
+    overrides: Dict[str, Any] = Depends(_analysis_overrides),
+    dataset: StoredDataset = Depends(_dataset),
+) -> Response:
+    """
+    PDF mandates a Download JSON button on the UI — wire it to this endpoint.
+    Returns the analysis as a downloadable .json (or streamed .ndjson) file
+    attachment; format=arrow|parquet returns one `table` (suspicious_accounts
+    or fraud_rings) as an Arrow IPC / Parquet file.
+    """
+    _check_min_score(min_score)
+    _check_format(fmt, ("json", "ndjson", *_COLUMNAR_FORMATS))
+    if fmt in _COLUMNAR_FORMATS:
+        if table not in ("suspicious_accounts", "fraud_rings"):
+            raise HTTPException(status_code=422, detail="table must be 'suspicious_accounts' or 'fraud_rings'.")
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError as exc:
+            raise HTTPException(status_code=501, detail=f"{fmt} export needs pyarrow installed.") from exc
+    _, results = await run_in_threadpool(_current_analysis, dataset, overrides)
+    if fmt in _COLUMNAR_FORMATS:
+        media_type, ext = _COLUMNAR_FORMATS[fmt]
+        body = await run_in_threadpool(_columnar_bytes, results, table, min_score, fmt)
+        return Response(
+            content=body, media_type=media_type,
+            headers={"Content-Disposition": f"attachment; filename=muling_{table}.{ext}"},
+        )
+    headers = {"Content-Disposition": f"attachment; filename=muling_analysis.{fmt}"}
+    if fmt == "ndjson":
+        return StreamingResponse(
+            _ndjson_records(results, min_score, False), media_type="application/x-ndjson", headers=headers,
+        )
+    return JSONResponse(content=_filter_min_score(results, min_score), headers=headers)
+
+
+@app.post("/jobs", response_model=JobStatus, status_code=202)
+async def create_job(
+    overrides: Dict[str, Any] = Depends(_analysis_overrides),
+    dataset: StoredDataset = Depends(_dataset),
+) -> JobStatus:
+    """Start analysing a stored dataset in the background; poll GET /jobs/{job_id}."""
+    job = _jobs.submit(dataset, overrides)
+    if job is None:
+        raise HTTPException(status_code=429, detail="Too many analysis jobs pending — retry later.")
+    return JobStatus(**job.to_dict())
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, min_score: float = 0.0, timings: bool = False) -> JSONResponse:
+    """Status, per-stage progress and — once done — the AnalysisResponse."""
+    job = _jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job.")
+    if not (0.0 <= min_score <= 100.0):
+        raise HTTPException(status_code=422, detail="min_score must be 0–100.")
+    return JSONResponse(content=job.to_dict(min_score, timings))
+
+
+@app.delete("/jobs/{job_id}", response_model=JobStatus)
+async def cancel_job(job_id: str) -> JobStatus:
+    job = _jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job.")
+    return JobStatus(**job.to_dict())
+
+
+@app.post("/sweep", response_model=SweepResponse)
+async def sweep(
+    request: SweepRequest,
+    overrides: Dict[str, Any] = Depends(_analysis_overrides),
+    dataset: StoredDataset = Depends(_dataset),
+) -> SweepResponse:
+    """
+    Evaluate every combination of `grid` (Config thresholds and scoring
+    weights) over a stored dataset: flagged accounts, rings, per-pattern
+    counts and the score distribution per point. Graph, cycle search and
+    smurf windows are shared by all points (run_parameter_sweep); results
+    are not cached. Budget parameters and `rings` apply to every point.
+    """
+    ctx = RunContext(overrides)
+    try:
+        points = _sweep_points(request.grid, ctx.config)
+        result = await run_in_threadpool(_sweep_dataset, dataset, points, ctx)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+    return SweepResponse(**result)
+
+
+@app.get("/accounts/{account_id}", response_model=AccountDetail)
+async def account_detail(
+    account_id: str,
+    hops: int = 1,
+    direction: str = "both",
+    window_hours: Optional[float] = None,
+    at: Optional[str] = None,
+    limit: Optional[int] = None,
+    dataset: StoredDataset = Depends(_dataset),
+) -> JSONResponse:
+    """
+    Drill-down on one account from the stored indexes, without running
+    detection: its counterparties, its activity in the `window_hours`
+    (default SMURF_WINDOW_HOURS) ending `at` (default: its last transaction),
+    its rings and score from the latest analysis of the dataset, and the
+    accounts within `hops` along `direction` ("out", "in" or "both") edges.
+    """
+    if not (0 <= hops <= CFG.ACCOUNT_MAX_HOPS):
+        raise HTTPException(status_code=422, detail=f"hops must be 0–{CFG.ACCOUNT_MAX_HOPS}.")
+    if direction not in ("out", "in", "both"):
+        raise HTTPException(status_code=422, detail="direction must be 'out', 'in' or 'both'.")
+    limit = CFG.PAGE_DEFAULT_LIMIT if limit is None else limit
+    if not (1 <= limit <= CFG.PAGE_MAX_LIMIT):
+        raise HTTPException(status_code=422, detail=f"limit must be 1–{CFG.PAGE_MAX_LIMIT}.")
+    window_hours = CFG.SMURF_WINDOW_HOURS if window_hours is None else window_hours
+    if window_hours < 0:
+        raise HTTPException(status_code=422, detail="window_hours must be ≥ 0.")
+    end = None
+    if at is not None:
+        try:
+            end = pd.Timestamp(at)
+        except ValueError as exc:
+            raise HTTPException(status_code=422, detail=f"Cannot parse at='{at}'.") from exc
+        end = (end.tz_localize("UTC") if end.tzinfo is None else end.tz_convert("UTC")).value
+    window = int(pd.Timedelta(hours=window_hours).value)
+    detail = await run_in_threadpool(_account_detail, dataset, account_id, hops, direction, window, end, limit)
+    return JSONResponse(content=detail)
+
+
+def _account_detail(
+    dataset: StoredDataset, account_id: str, hops: int, direction: str, window: int, end: Optional[int], limit: int,
+) -> Dict[str, Any]:
+    index = dataset.index()
+    code = index.code(account_id)
+    if code is None:
+        raise HTTPException(status_code=404, detail=f"Unknown account '{account_id}'.")
+    g = index.graph
+    rows = index.transactions(code)
+    dated = g.tx_ts[rows]
+    dated = dated[dated != _NAT]
+    if end is None and len(dated):
+        end = int(dated[-1])
+
+    in_window = index.transactions(code, end - window, end) if end is not None else rows[:0]
+    sent = g.tx_src[in_window] == code
+    received = g.tx_dst[in_window] == code
+    amounts = g.tx_amount[in_window]
+    window_info = {
+        "start": _iso(end - window) if end is not None else None,
+        "end": _iso(end) if end is not None else None,
+        "sent": int(sent.sum()),
+        "received": int(received.sum()),
+        "amount_sent": round(float(amounts[sent].sum()), 2),
+        "amount_received": round(float(amounts[received].sum()), 2),
+        "distinct_receivers": len(np.unique(g.tx_dst[in_window][sent])),
+        "distinct_senders": len(np.unique(g.tx_src[in_window][received])),
+        "transactions": index.records(in_window[:limit]),
+    }
+
+    latest = _latest_analysis(dataset)
+    rings_by_account: Dict[str, Tuple[Optional[int], List[int]]] = {}
+    if latest is not None:
+        key, results = latest
+        view_key = (*key, "accounts")
+        rings_by_account = _view_cache.get(view_key)
+        if rings_by_account is None:
+            rings_by_account = _ring_index(results)
+            _view_cache.put(view_key, rings_by_account)
+    position, ring_positions = rings_by_account.get(account_id, (None, []))
+
+    def score(label: str) -> Optional[float]:
+        i = rings_by_account.get(label, (None, []))[0]
+        return results["suspicious_accounts"][i]["suspicion_score"] if i is not None else None
+
+    counterparties = index.counterparties(code)
+    accounts, dist, truncated = index.neighbourhood(code, hops, direction)
+    return {
+        "dataset_id": dataset.dataset_id,
+        "account_id": account_id,
+        "transactions": len(rows),
+        "first_seen": _iso(int(dated[0])) if len(dated) else None,
+        "last_seen": _iso(int(dated[-1])) if len(dated) else None,
+        "counterparties": counterparties[:limit],
+        "counterparties_total": len(counterparties),
+        "window": window_info,
+        "analysed": latest is not None,
+        "suspicion": results["suspicious_accounts"][position] if position is not None else None,
+        "rings": [results["fraud_rings"][i] for i in ring_positions],
+        "neighbourhood": [
+            {"account_id": label, "hops": d, "suspicion_score": score(label)}
+            for label, d in zip(g.labels[accounts[:limit]].tolist(), dist[:limit].tolist())
+        ],
+        "neighbourhood_total": len(accounts),
+        "neighbourhood_truncated": truncated,
+    }
+
+
+@app.get("/datasets", response_model=List[DatasetInfo])
+async def list_datasets() -> List[DatasetInfo]:
+    return [DatasetInfo(**info) for info in await run_in_threadpool(_datasets.list)]
+
+
+@app.get("/datasets/{dataset_id}", response_model=DatasetInfo)
+async def get_dataset(dataset_id: str) -> DatasetInfo:
+    dataset = await run_in_threadpool(_dataset, dataset_id)
+    return DatasetInfo(**_dataset_info(dataset, _datasets.current_id()))
+
+
+@app.delete("/datasets/{dataset_id}", response_model=DatasetInfo)
+async def delete_dataset(dataset_id: str) -> DatasetInfo:
+    """Remove a stored dataset and every cached result of it."""
+    dataset = await run_in_threadpool(_dataset, dataset_id)
+    info = _dataset_info(dataset, _datasets.current_id())
+    await run_in_threadpool(_delete_dataset, dataset)
+    return DatasetInfo(**info)
+
+
+def _delete_dataset(dataset: StoredDataset) -> None:
+    with _append_lock, _datasets.lock(dataset.dataset_id):
+        _forget(dataset.dataset_id, dataset.version)
+        _datasets.delete(dataset.dataset_id)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,92 @@
+"""
+Shared fixtures. The backend directory goes on sys.path and the dataset
+store points at a scratch directory before main is imported (Config reads
+MULING_DATASET_DIR at import time).
+"""
+
+import io
+import os
+import random
+import sys
+import tempfile
+from typing import Callable, Optional
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+os.environ["MULING_DATASET_DIR"] = tempfile.mkdtemp(prefix="muling-tests-")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+COLUMNS = ["transaction_id", "sender_id", "receiver_id", "amount", "timestamp"]
+
+
+@pytest.fixture
+def small_thresholds(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Thresholds small enough for every detector to fire on a few dozen rows."""
+    monkeypatch.setattr(main.CFG, "SMURF_MIN_COUNTERPARTIES", 3)
+    monkeypatch.setattr(main.CFG, "MERCHANT_MIN_TX", 6)
+
+
+@pytest.fixture
+def transactions() -> Callable[..., pd.DataFrame]:
+    """
+    Factory for random transaction frames as a CSV would give them: string
+    IDs and timestamps, one hour slot per row (no timestamp ties) and, for
+    every fifth seed, an unparseable timestamp on the last row.
+    """
+    def make(seed: int, accounts: Optional[int] = None, max_rows: int = 60) -> pd.DataFrame:
+        rng = random.Random(seed)
+        n = accounts or rng.randint(2, 14)
+        start = pd.Timestamp("2024-01-01", tz="UTC")
+        hours = rng.sample(range(400), rng.randint(1, max_rows))
+        df = pd.DataFrame(
+            [
+                (f"T{i}", f"a{rng.randrange(n)}", f"a{rng.randrange(n)}", round(rng.uniform(1, 400_000), 2),
+                 str(start + pd.Timedelta(hours=h)))
+                for i, h in enumerate(hours)
+            ],
+            columns=COLUMNS,
+        )
+        if seed % 5 == 0:
+            df.loc[len(df) - 1, "timestamp"] = "garbage"
+        return df
+
+    return make
+
+
+@pytest.fixture
+def client() -> TestClient:
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def csv_bytes() -> Callable[[pd.DataFrame], bytes]:
+    def encode(df: pd.DataFrame) -> bytes:
+        return df.to_csv(index=False).encode()
+
+    return encode
+
+
+@pytest.fixture
+def compact() -> Callable[[pd.DataFrame], pd.DataFrame]:
+    """The compact frame ingest_csv makes of a raw frame."""
+    def convert(df: pd.DataFrame) -> pd.DataFrame:
+        return main.ingest_csv(io.BytesIO(df.to_csv(index=False).encode()))[0]
+
+    return convert
+
+
+def comparable(result: dict) -> dict:
+    """A result without the fields that vary from run to run."""
+    result = {**result, "summary": dict(result["summary"])}
+    result["summary"].pop("processing_time_seconds", None)
+    result.pop("timings", None)
+    return result
+
+
+@pytest.fixture
+def strip() -> Callable[[dict], dict]:
+    return comparable
@@ -0,0 +1,79 @@
+"""batch.py: results, the journal, and resuming an interrupted batch."""
+
+import json
+import os
+
+import pytest
+
+import batch
+import main
+
+
+@pytest.fixture
+def inputs(tmp_path, transactions):
+    folder = tmp_path / "in"
+    folder.mkdir()
+    for seed in range(3):
+        transactions(seed + 1, accounts=10, max_rows=80).to_csv(folder / f"day{seed}.csv", index=False)
+    (folder / "broken.csv").write_text("transaction_id,sender_id\nT1,a\n")
+    return sorted(str(p) for p in folder.iterdir())
+
+
+def run(inputs, out_dir, cfg=None, **kwargs):
+    return batch.run_batch(inputs, str(out_dir), cfg or main.Config(), workers=1, budget_mb=1024, **kwargs)
+
+
+def test_results_and_journal(inputs, tmp_path, strip):
+    out = tmp_path / "out"
+    summary = run(inputs, out)
+    totals = summary["totals"]
+    assert (totals["files"], totals["done"], totals["failed"], totals["resumed"]) == (4, 3, 1, 0)
+    journal = batch.read_journal(str(out))
+    assert set(journal) == set(inputs)
+    for path, entry in journal.items():
+        if entry["status"] == "failed":
+            assert path.endswith("broken.csv") and "Missing required columns" in entry["error"]
+            continue
+        with open(entry["output"]) as f:
+            stored = json.load(f)
+        assert "timings" not in stored
+        assert strip(stored) == strip(json.loads(json.dumps(main.run_full_analysis(batch.read_transactions(path)))))
+    assert json.loads((out / batch.SUMMARY).read_text())["totals"] == summary["totals"]
+
+
+def test_rerun_resumes(inputs, tmp_path):
+    out = tmp_path / "out"
+    run(inputs, out)
+    outputs = {e["output"]: os.stat(e["output"]).st_mtime_ns for e in batch.read_journal(str(out)).values()
+               if e["status"] == "done"}
+    summary = run(inputs, out)
+    # the three finished files are skipped, the broken one is retried
+    assert summary["totals"]["resumed"] == 3
+    assert summary["totals"]["failed"] == 1
+    assert {path: os.stat(path).st_mtime_ns for path in outputs} == outputs
+
+
+def test_interrupted_batch_resumes_where_it_stopped(inputs, tmp_path):
+    out = tmp_path / "out"
+    run(inputs, out)
+    journal_path = out / batch.JOURNAL
+    lines = journal_path.read_text().splitlines()
+    done = [json.loads(line) for line in lines if json.loads(line)["status"] == "done"]
+    # keep the first finished file, then a line cut short by the interruption
+    journal_path.write_text(json.dumps(done[0]) + "\n" + lines[-1][:10])
+    os.remove(done[1]["output"])
+
+    summary = run(inputs, out)
+    assert summary["totals"]["resumed"] == 1
+    assert summary["totals"]["done"] == 3
+    assert os.path.exists(done[1]["output"])
+
+
+def test_changes_invalidate_the_journal(inputs, tmp_path):
+    out = tmp_path / "out"
+    run(inputs, out)
+    with open(next(p for p in inputs if p.endswith("day0.csv")), "a") as f:
+        f.write("TX,a1,a2,5.0,2024-01-02 00:00\n")
+    assert run(inputs, out)["totals"]["resumed"] == 2          # the edited file runs again
+    assert run(inputs, out, main.Config(SMURF_MIN_COUNTERPARTIES=2))["totals"]["resumed"] == 0
+    assert run(inputs, out, main.Config(SMURF_MIN_COUNTERPARTIES=2), force=True)["totals"]["resumed"] == 0
@@ -0,0 +1,75 @@
+"""Work budgets: limits, and partial results flagged as truncated."""
+
+import io
+import time
+
+import pandas as pd
+
+import main
+
+
+def clique(n: int) -> pd.DataFrame:
+    """Every account pays every other one — far more cycles than a small budget allows."""
+    pairs = [(i, j) for i in range(n) for j in range(n) if i != j]
+    return pd.DataFrame({
+        "transaction_id": [f"T{k}" for k in range(len(pairs))],
+        "sender_id": [f"m{i:03d}" for i, _ in pairs],
+        "receiver_id": [f"m{j:03d}" for _, j in pairs],
+        "amount": 100.0,
+        "timestamp": [f"2024-01-01 {k % 24:02d}:00:00" for k in range(len(pairs))],
+    })
+
+
+def cycles_of(result) -> set:
+    return {frozenset(r["member_accounts"]) for r in result["fraud_rings"] if r["pattern_type"] == "cycle"}
+
+
+def test_expansion_limit():
+    budget = main.WorkBudget(0, 5)
+    assert [budget.spend() for _ in range(6)] == [True] * 5 + [False]
+    assert budget.exhausted and budget.expired()
+
+
+def test_zero_means_unlimited():
+    budget = main.WorkBudget(0, 0)
+    assert all(budget.spend() for _ in range(10_000))
+    assert not budget.expired()
+
+
+def test_deadline():
+    budget = main.WorkBudget(0, 0, deadline=time.time() - 1)
+    assert budget.expired() and budget.exhausted
+
+
+def test_default_budget_reads_the_active_config():
+    with main.use_config(main.CFG.replace(CYCLE_MAX_SECONDS=0, CYCLE_MAX_EXPANDED=7, SHELL_MAX_EXPANDED=0)):
+        assert main._budget(None, "cycles").max_expanded == 7
+        assert main._budget(None, "shells").expired() is False
+        assert main._budget(main.RunContext({"CYCLE_MAX_EXPANDED": 3}), "cycles").max_expanded == 3
+
+
+def test_truncated_cycles_are_a_subset():
+    df = clique(12)
+    full = main.run_full_analysis(df)
+    assert full["summary"]["truncated_detectors"] == []
+    partial = main.run_full_analysis(df, main.RunContext({"CYCLE_MAX_EXPANDED": 500}))
+    assert partial["summary"]["truncated_detectors"] == ["cycles"]
+    assert cycles_of(partial) < cycles_of(full)
+
+
+def test_truncated_shells_are_flagged(transactions, small_thresholds):
+    df = transactions(7, accounts=11, max_rows=30)
+    graph = main.CompactGraph.from_frame(df)
+    assert main.detect_layered_shells(graph, main._merchant_mask(graph.tx_count))
+    partial = main.run_full_analysis(df, main.RunContext({"SHELL_MAX_EXPANDED": 1}))
+    assert "shells" in partial["summary"]["truncated_detectors"]
+
+
+def test_budget_query_parameters(client):
+    buffer = io.BytesIO(clique(12).to_csv(index=False).encode())
+    client.post("/upload", params={"dataset_id": "budget-test"}, files={"file": ("c.csv", buffer, "text/csv")})
+    truncated = client.get("/analysis", params={"dataset_id": "budget-test", "cycle_max_expanded": 500}).json()
+    assert truncated["summary"]["truncated_detectors"] == ["cycles"]
+    full = client.get("/analysis", params={"dataset_id": "budget-test"}).json()
+    assert full["summary"]["truncated_detectors"] == []
+    assert client.get("/analysis", params={"dataset_id": "budget-test", "cycle_max_seconds": -1}).status_code == 422
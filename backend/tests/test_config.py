@@ -0,0 +1,86 @@
+"""Per-request Config objects: runs with different settings never mix."""
+
+import concurrent.futures
+import threading
+
+import numpy as np
+import pytest
+
+import main
+
+
+def analysed(df, overrides):
+    """A run with `overrides`, activated for the whole run as the API does."""
+    ctx = main.RunContext(overrides)
+    with main.use_config(ctx.config):
+        return main.run_full_analysis(df, ctx)
+
+
+def test_unknown_setting():
+    with pytest.raises(ValueError):
+        main.Config(NOT_A_SETTING=1)
+    with pytest.raises(ValueError):
+        main.CFG.replace(lower_case=1)
+
+
+def test_replace_leaves_the_original_alone():
+    base = main.Config()
+    changed = base.replace(SMURF_MIN_COUNTERPARTIES=2)
+    assert changed.SMURF_MIN_COUNTERPARTIES == 2
+    assert base.SMURF_MIN_COUNTERPARTIES == main.Config.SMURF_MIN_COUNTERPARTIES
+
+
+def test_use_config_is_scoped_to_the_context():
+    default = main.CFG.SMURF_MIN_COUNTERPARTIES
+    with main.use_config(main.CFG.replace(SMURF_MIN_COUNTERPARTIES=2)):
+        assert main.CFG.SMURF_MIN_COUNTERPARTIES == 2
+        seen = []
+        thread = threading.Thread(target=lambda: seen.append(main.CFG.SMURF_MIN_COUNTERPARTIES))
+        thread.start()
+        thread.join()
+        assert seen == [default]       # a plain new thread starts from the default
+    assert main.CFG.SMURF_MIN_COUNTERPARTIES == default
+
+
+def test_run_context_overrides():
+    ctx = main.RunContext({"SMURF_MIN_COUNTERPARTIES": 2})
+    assert ctx.setting("SMURF_MIN_COUNTERPARTIES") == 2
+    assert ctx.config.MERCHANT_MIN_TX == main.CFG.MERCHANT_MIN_TX
+    assert main.CFG.SMURF_MIN_COUNTERPARTIES != 2
+
+
+def test_concurrent_runs_keep_their_settings(transactions, strip):
+    frames = [transactions(3, accounts=8, max_rows=150)] * 6
+    settings = [{"SMURF_MIN_COUNTERPARTIES": 2 + i % 3, "RING_MODE": ("paths", "grouped")[i % 2]} for i in range(6)]
+    expected = [strip(analysed(df, s)) for df, s in zip(frames, settings)]
+    assert len({str(e["suspicious_accounts"]) for e in expected}) > 1
+
+    barrier = threading.Barrier(len(frames))
+
+    def run(i: int):
+        barrier.wait()
+        return strip(analysed(frames[i], settings[i]))
+
+    with concurrent.futures.ThreadPoolExecutor(len(frames)) as pool:
+        assert list(pool.map(run, range(len(frames)))) == expected
+
+
+def test_sweep_points_match_single_runs(transactions):
+    df = transactions(12, accounts=12, max_rows=150)
+    graph = main.CompactGraph.from_frame(df)
+    grid = {"SMURF_MIN_COUNTERPARTIES": [2, 3], "SMURF_WINDOW_HOURS": [24, 72], "CYCLE_MAX_LEN": [4, 5]}
+    ctx = main.RunContext()
+    points = main._sweep_points(grid, ctx.config)
+    rows = main.run_parameter_sweep(graph, points, ctx)["points"]
+    assert len(rows) == 8
+    for point, row in zip(points, rows):
+        result = analysed(df, point)
+        scores = [a["suspicion_score"] for a in result["suspicious_accounts"]]
+        assert row["parameters"] == point
+        assert row["suspicious_accounts_flagged"] == result["summary"]["suspicious_accounts_flagged"]
+        assert row["fraud_rings_detected"] == result["summary"]["fraud_rings_detected"]
+        assert row["score_histogram"] == np.histogram(scores, bins=10, range=(0.0, 100.0))[0].tolist()
+        assert row["top_accounts"] == [
+            {"account_id": a["account_id"], "suspicion_score": a["suspicion_score"]}
+            for a in result["suspicious_accounts"][:main.CFG.SWEEP_TOP_ACCOUNTS]
+        ]
@@ -0,0 +1,59 @@
+"""detect_circular_routing against networkx simple-cycle enumeration."""
+
+from typing import List, Set, Tuple
+
+import pytest
+
+import main
+
+nx = pytest.importorskip("networkx")
+
+
+def reference_cycles(df) -> Set[Tuple[str, ...]]:
+    """The original detector: prune degree < 2, enumerate every simple cycle, keep 3–5."""
+    graph = nx.DiGraph(nx.MultiDiGraph(list(zip(df["sender_id"], df["receiver_id"]))))
+    changed = True
+    while changed:
+        low = [n for n in graph if graph.degree(n) < 2]
+        graph.remove_nodes_from(low)
+        changed = bool(low)
+    return {
+        main._canonical_cycle(cycle) for cycle in nx.simple_cycles(graph)
+        if main.CFG.CYCLE_MIN_LEN <= len(cycle) <= main.CFG.CYCLE_MAX_LEN
+    }
+
+
+def labelled(graph: main.CompactGraph, cycles: List[List[int]]) -> List[Tuple[str, ...]]:
+    return [tuple(graph.labels[cycle].tolist()) for cycle in cycles]
+
+
+@pytest.mark.parametrize("seed", range(60))
+def test_cycles_match_reference(transactions, seed):
+    df = transactions(seed, max_rows=40)
+    graph = main.CompactGraph.from_frame(df)
+    found = labelled(graph, main.detect_circular_routing(graph))
+    assert len(found) == len(set(found))
+    assert set(found) == reference_cycles(df)
+    # canonical rotation (smallest account first), sorted
+    assert all(cycle == main._canonical_cycle(list(cycle)) for cycle in found)
+    assert found == sorted(found)
+
+
+def test_cycle_length_bounds(transactions):
+    df = transactions(3, accounts=6, max_rows=60)
+    with main.use_config(main.CFG.replace(CYCLE_MIN_LEN=2, CYCLE_MAX_LEN=3)):
+        graph = main.CompactGraph.from_frame(df)
+        found = labelled(graph, main.detect_circular_routing(graph))
+        expected = reference_cycles(df)
+    assert set(found) == expected
+    assert all(2 <= len(cycle) <= 3 for cycle in found)
+
+
+def test_temporal_cycles_are_structural_cycles(transactions):
+    for seed in range(20):
+        df = transactions(seed, max_rows=50)
+        graph = main.CompactGraph.from_frame(df)
+        structural = set(labelled(graph, main.detect_circular_routing(graph)))
+        with main.use_config(main.CFG.replace(CYCLE_MODE="temporal")):
+            temporal = labelled(graph, main.detect_circular_routing(graph))
+        assert set(temporal) <= structural
@@ -0,0 +1,65 @@
+"""Appending batches gives the same result as analysing everything again."""
+
+import io
+import random
+
+import pandas as pd
+import pytest
+
+import main
+
+
+def batches(df: pd.DataFrame, seed: int):
+    rng = random.Random(seed)
+    pos = rng.randint(1, len(df) - 1)
+    yield df.iloc[:pos]
+    while pos < len(df):
+        step = rng.randint(1, 8)
+        yield df.iloc[pos:pos + step]
+        pos += step
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_append_matches_full_recompute(transactions, compact, strip, small_thresholds, monkeypatch, seed):
+    monkeypatch.setattr(main.CFG, "APPEND_COMPACT_FRACTION", 100.0)     # never fold into a rebuild
+    df = transactions(seed, accounts=random.Random(seed).randint(3, 25), max_rows=120)
+    if len(df) < 2:
+        pytest.skip("needs two rows")
+    parts = batches(df, seed)
+    state = main.IncrementalAnalysis(compact(next(parts)))
+    for batch in parts:
+        result, reanalysed = state.append(compact(batch))
+        assert reanalysed <= state.n_accounts
+        assert strip(result) == strip(main.run_full_analysis(state.frame()))
+    assert state.n_rows == len(df)
+
+
+def test_append_rebuilds_past_the_compact_fraction(transactions, compact, strip, small_thresholds, monkeypatch):
+    monkeypatch.setattr(main.CFG, "APPEND_COMPACT_FRACTION", 0.0)
+    df = transactions(7, accounts=12, max_rows=120)
+    cut = len(df) // 2
+    state = main.IncrementalAnalysis(compact(df.iloc[:cut]))
+    result, reanalysed = state.append(compact(df.iloc[cut:]))
+    assert reanalysed == state.n_accounts
+    assert strip(result) == strip(main.run_full_analysis(compact(df)))
+
+
+def test_append_endpoint(client, transactions, csv_bytes, compact, strip, small_thresholds):
+    df = transactions(21, accounts=15, max_rows=150)
+    cut = len(df) * 2 // 3
+    upload = client.post(
+        "/upload", params={"dataset_id": "append-test"},
+        files={"file": ("base.csv", io.BytesIO(csv_bytes(df.iloc[:cut])), "text/csv")},
+    )
+    assert upload.status_code == 200
+    appended = client.post(
+        "/append", params={"dataset_id": "append-test"},
+        files={"file": ("batch.csv", io.BytesIO(csv_bytes(df.iloc[cut:])), "text/csv")},
+    )
+    assert appended.status_code == 200
+    body = appended.json()
+    assert (body["transactions_appended"], body["transactions_total"]) == (len(df) - cut, len(df))
+
+    analysis = client.get("/analysis", params={"dataset_id": "append-test"}).json()
+    expected = main.run_full_analysis(compact(df))
+    assert strip(analysis) == strip(expected)
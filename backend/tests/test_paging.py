@@ -0,0 +1,103 @@
+"""Cursor paging and NDJSON streaming of /analysis."""
+
+import io
+import json
+from typing import Any, Dict, List
+
+import pytest
+
+import main
+
+DATASET = "paging-test"
+
+
+@pytest.fixture
+def uploaded(client, transactions, csv_bytes, small_thresholds):
+    df = transactions(5, accounts=40, max_rows=300)
+    response = client.post(
+        "/upload", params={"dataset_id": DATASET},
+        files={"file": ("paging.csv", io.BytesIO(csv_bytes(df)), "text/csv")},
+    )
+    assert response.status_code == 200
+    return df
+
+
+def all_pages(client, table: str, **params: Any) -> List[Dict[str, Any]]:
+    items: List[Dict[str, Any]] = []
+    cursor = None
+    while True:
+        page = client.get(
+            f"/analysis/{table}", params={"dataset_id": DATASET, **params, **({"cursor": cursor} if cursor else {})},
+        )
+        assert page.status_code == 200
+        body = page.json()
+        assert len(body["items"]) <= params.get("limit", main.CFG.PAGE_DEFAULT_LIMIT)
+        items += body["items"]
+        cursor = body["next_cursor"]
+        if not cursor:
+            assert body["total"] == len(items)
+            return items
+
+
+def test_pages_concatenate_to_the_full_result(client, uploaded):
+    full = client.get("/analysis", params={"dataset_id": DATASET, "min_score": 20}).json()
+    assert len(full["suspicious_accounts"]) > 7
+    assert all_pages(client, "suspicious_accounts", limit=7, min_score=20) == full["suspicious_accounts"]
+    assert all_pages(client, "fraud_rings", limit=3) == full["fraud_rings"]
+
+
+def test_sorted_pages(client, uploaded):
+    accounts = all_pages(client, "suspicious_accounts", limit=5, sort="account_id")
+    assert [a["account_id"] for a in accounts] == sorted(a["account_id"] for a in accounts)
+    rings = all_pages(client, "fraud_rings", limit=4, sort="risk_score", order="asc")
+    assert [r["risk_score"] for r in rings] == sorted(r["risk_score"] for r in rings)
+
+
+def test_bad_cursor_and_parameters(client, uploaded):
+    first = client.get(
+        "/analysis/suspicious_accounts", params={"dataset_id": DATASET, "limit": 2, "sort": "account_id"},
+    ).json()
+    # a cursor only continues the view it was issued for
+    mismatched = client.get(
+        "/analysis/suspicious_accounts",
+        params={"dataset_id": DATASET, "sort": "ring_id", "cursor": first["next_cursor"]},
+    )
+    assert mismatched.status_code == 409
+    for params in ({"cursor": "zzz"}, {"sort": "nope"}, {"limit": 0}):
+        response = client.get("/analysis/suspicious_accounts", params={"dataset_id": DATASET, **params})
+        assert response.status_code == 422
+
+
+def test_cursor_goes_stale_after_append(client, uploaded, transactions, csv_bytes):
+    first = client.get("/analysis/suspicious_accounts", params={"dataset_id": DATASET, "limit": 2}).json()
+    batch = transactions(6, accounts=40, max_rows=20)
+    batch["transaction_id"] = "B" + batch["transaction_id"]
+    appended = client.post(
+        "/append", params={"dataset_id": DATASET},
+        files={"file": ("batch.csv", io.BytesIO(csv_bytes(batch)), "text/csv")},
+    )
+    assert appended.status_code == 200
+    stale = client.get(
+        "/analysis/suspicious_accounts", params={"dataset_id": DATASET, "cursor": first["next_cursor"]},
+    )
+    assert stale.status_code == 409
+
+
+def test_ndjson_stream(client, uploaded):
+    full = client.get("/analysis", params={"dataset_id": DATASET, "min_score": 20}).json()
+    response = client.get("/analysis", params={"dataset_id": DATASET, "min_score": 20, "format": "ndjson"})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["record"] == "summary"
+    kinds = [line.pop("record") for line in lines[1:]]
+    n_accounts = len(full["suspicious_accounts"])
+    assert kinds == ["suspicious_account"] * n_accounts + ["fraud_ring"] * len(full["fraud_rings"])
+    assert lines[1:1 + n_accounts] == full["suspicious_accounts"]
+    assert lines[1 + n_accounts:] == full["fraud_rings"]
+
+
+def test_ndjson_download(client, uploaded):
+    response = client.get("/download", params={"dataset_id": DATASET, "format": "ndjson"})
+    assert response.status_code == 200
+    assert "muling_analysis.ndjson" in response.headers["content-disposition"]
+    assert json.loads(response.text.splitlines()[0])["record"] == "summary"
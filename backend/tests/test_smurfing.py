@@ -0,0 +1,97 @@
+"""detect_smurfing against the original per-account two-pointer window scan."""
+
+from typing import Any, Dict, Set, Tuple
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import main
+
+
+def _window(grp: pd.DataFrame, counterpart: str, hours: int, threshold: int) -> Tuple[bool, int, float, str]:
+    grp = grp.reset_index(drop=True)
+    left = 0
+    counts: Dict[str, int] = {}
+    amount = 0.0
+    for right in range(len(grp)):
+        cp = grp.at[right, counterpart]
+        counts[cp] = counts.get(cp, 0) + 1
+        amount += grp.at[right, "amount"]
+        cutoff = grp.at[right, "timestamp"] - pd.Timedelta(hours=hours)
+        while grp.at[left, "timestamp"] < cutoff:
+            old = grp.at[left, counterpart]
+            counts[old] -= 1
+            if not counts[old]:
+                del counts[old]
+            amount -= grp.at[left, "amount"]
+            left += 1
+        if len(counts) >= threshold:
+            return True, len(counts), round(amount, 2), str(grp.at[left, "timestamp"])
+    return False, 0, 0.0, ""
+
+
+def reference_smurfing(df: pd.DataFrame, whitelist: Set[str]) -> Dict[str, Dict[str, Any]]:
+    """The original detector: fan-in first, then fan-out for accounts not yet flagged."""
+    rows = df[["receiver_id", "sender_id", "amount", "timestamp"]].copy()
+    rows["timestamp"] = pd.to_datetime(rows["timestamp"], utc=True, errors="coerce")
+    rows = rows.dropna(subset=["timestamp"]).sort_values("timestamp", kind="stable").reset_index(drop=True)
+    hours, threshold = main.CFG.SMURF_WINDOW_HOURS, main.CFG.SMURF_MIN_COUNTERPARTIES
+    flagged: Dict[str, Dict[str, Any]] = {}
+    for focal, counterpart, pattern in (("receiver_id", "sender_id", "fan_in"), ("sender_id", "receiver_id", "fan_out")):
+        for account, grp in rows.groupby(focal, sort=False):
+            if account in whitelist or account in flagged:
+                continue
+            found, count, amount, start = _window(grp, counterpart, hours, threshold)
+            if found:
+                flagged[account] = {"pattern": pattern, "fan_count": count, "amount": amount, "window_start": start}
+    return flagged
+
+
+def detected(df: pd.DataFrame, whitelist: np.ndarray = None) -> Tuple[main.CompactGraph, Dict[str, Dict[str, Any]]]:
+    graph = main.CompactGraph.from_frame(df)
+    if whitelist is None:
+        whitelist = main._merchant_mask(graph.tx_count)
+    flagged = main.detect_smurfing(graph, whitelist)
+    return graph, {graph.labels[code]: info for code, info in flagged.items()}
+
+
+@pytest.mark.parametrize("seed", range(60))
+@pytest.mark.parametrize("threshold", [2, 3])
+def test_smurfing_matches_reference(transactions, seed, threshold):
+    df = transactions(seed, max_rows=80)
+    with main.use_config(main.CFG.replace(SMURF_MIN_COUNTERPARTIES=threshold, MERCHANT_MIN_TX=6)):
+        graph, found = detected(df)
+        whitelist = set(graph.labels[main._merchant_mask(graph.tx_count)].tolist())
+        assert found == reference_smurfing(df, whitelist)
+
+
+def test_whitelisted_accounts_are_skipped(transactions):
+    df = transactions(11, accounts=5, max_rows=120)
+    with main.use_config(main.CFG.replace(SMURF_MIN_COUNTERPARTIES=2)):
+        graph, found = detected(df, np.zeros(5, dtype=bool))
+        assert found
+        whitelist = np.isin(graph.labels, list(found))
+        _, again = detected(df, whitelist)
+        assert again == reference_smurfing(df, set(found))
+        assert not set(again) & set(found)
+
+
+@pytest.mark.parametrize("hours", [1, 24, 72])
+def test_window_length(transactions, hours):
+    for seed in range(20):
+        df = transactions(seed, max_rows=80)
+        with main.use_config(main.CFG.replace(SMURF_MIN_COUNTERPARTIES=2, SMURF_WINDOW_HOURS=hours)):
+            graph, found = detected(df)
+            whitelist = set(graph.labels[main._merchant_mask(graph.tx_count)].tolist())
+            assert found == reference_smurfing(df, whitelist)
+
+
+def test_blank_amounts_add_nothing_to_window_amounts(transactions):
+    for seed in range(20):
+        df = transactions(seed, max_rows=80)
+        df.loc[df.index[::3], "amount"] = np.nan
+        with main.use_config(main.CFG.replace(SMURF_MIN_COUNTERPARTIES=2)):
+            graph, found = detected(df)
+            whitelist = set(graph.labels[main._merchant_mask(graph.tx_count)].tolist())
+            assert found == reference_smurfing(df.fillna({"amount": 0.0}), whitelist)
@@ -0,0 +1,94 @@
+"""DatasetStore: stored datasets read back as they were written, and deletes."""
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import main
+
+
+def content_hash(df: pd.DataFrame) -> str:
+    return hashlib.sha256(df.to_csv(index=False).encode()).hexdigest()
+
+
+@pytest.fixture
+def frame(transactions, compact):
+    return compact(transactions(4, accounts=30, max_rows=200))
+
+
+def test_round_trip(tmp_path, frame, strip, small_thresholds):
+    store = main.DatasetStore(str(tmp_path))
+    store.save("bank", frame, content_hash(frame))
+
+    reopened = main.DatasetStore(str(tmp_path)).get()     # a fresh process would do the same
+    assert reopened.dataset_id == "bank"
+    assert reopened.n_rows == len(frame)
+    pd.testing.assert_frame_equal(reopened.frame(), frame)
+
+    graph = reopened.graph()
+    assert isinstance(graph.tx_src, np.memmap)
+    assert isinstance(graph.labels, main.MappedLabels)
+    expected = main.run_full_analysis(frame)
+    assert strip(main.analyze_graph(graph)) == strip(expected)
+
+
+def test_labels_are_looked_up_without_decoding_all(tmp_path, frame):
+    store = main.DatasetStore(str(tmp_path))
+    dataset = store.save("bank", frame, content_hash(frame))
+    labels = np.asarray(main.CompactGraph.from_frame(frame).labels)
+    index = dataset.index()
+    assert [index.code(label) for label in labels.tolist()] == list(range(len(labels)))
+    assert index.code("not-an-account") is None
+    assert index.code("") is None
+    mapped = dataset.graph().labels
+    assert mapped[3] == labels[3] and mapped[-1] == labels[-1]
+    assert mapped[np.array([5, 0, 5])].tolist() == labels[[5, 0, 5]].tolist()
+    probes = np.array(["a", "a1", "a10x", "zz", ""], dtype=object)
+    assert mapped.searchsorted(probes).tolist() == np.searchsorted(labels, probes).tolist()
+
+
+@pytest.mark.parametrize("fraction, segments", [(100.0, 2), (0.0, 1)])
+def test_appended_batches_are_stored_as_segments(tmp_path, frame, compact, monkeypatch, fraction, segments):
+    """A batch becomes a segment of its own until the state is rebuilt, then one segment is written."""
+    monkeypatch.setattr(main.CFG, "APPEND_COMPACT_FRACTION", fraction)
+    store = main.DatasetStore(str(tmp_path))
+    cut = len(frame) // 2
+    base, batch = compact(frame.iloc[:cut]), compact(frame.iloc[cut:])
+    dataset = store.save("bank", base, content_hash(base))
+    state = main.IncrementalAnalysis(base)
+    state.append(batch)
+    with store.lock("bank"):
+        dataset = store.append(dataset, batch, "v2", state)
+    assert len(dataset.segments) == segments
+    reopened = main.DatasetStore(str(tmp_path)).get("bank")
+    assert reopened.version == "v2"
+    pd.testing.assert_frame_equal(reopened.frame(), main._concat_frames([base, batch]))
+
+
+def test_delete(tmp_path, frame):
+    store = main.DatasetStore(str(tmp_path))
+    store.save("keep", frame, content_hash(frame))
+    store.save("gone", frame, content_hash(frame))
+    assert store.current_id() == "gone"
+    assert [d["dataset_id"] for d in store.list()] == ["gone", "keep"]
+
+    assert store.delete("gone")
+    assert store.get("gone") is None
+    assert not os.path.exists(tmp_path / "gone")
+    assert store.current_id() is None
+    assert [d["dataset_id"] for d in store.list()] == ["keep"]
+    assert not store.delete("gone")
+    assert store.get("../keep") is None
+
+
+def test_delete_endpoint(client, transactions, csv_bytes):
+    df = transactions(8, accounts=10, max_rows=50)
+    client.post("/upload", params={"dataset_id": "to-delete"}, files={"file": ("d.csv", csv_bytes(df), "text/csv")})
+    assert client.get("/datasets/to-delete").status_code == 200
+    assert client.delete("/datasets/to-delete").status_code == 200
+    assert client.get("/datasets/to-delete").status_code == 404
+    assert client.get("/analysis", params={"dataset_id": "to-delete"}).status_code == 404
+    assert client.delete("/datasets/to-delete").status_code == 404